@@ -0,0 +1,316 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from threading import Thread, Lock
+import asyncio
+import logging
+import time
+
+
+class GpioAsyncEngine(Thread):
+    """
+    Class that runs all gpios tasks as coroutines of a single asyncio event loop thread
+    Inputs are watched by coroutines (polling) or loop readers (edge events), debounce deadlines are
+    loop timers and timed outputs can be scheduled with call_later.
+
+    All public functions are thread safe, coroutines must be executed on engine loop using submit.
+
+    Note:
+        This object doesn't configure pins!
+    """
+
+    def __init__(self, outputs, source=None):
+        """
+        Constructor
+
+        Args:
+            outputs (object): object with turn_on(device_uuid) and turn_off(device_uuid) functions
+            source (object): edge events source (see GpioEdgeScanner) whose file descriptors are readable
+                             on edge (optional, inputs are polled if not specified)
+        """
+        # init
+        Thread.__init__(self, daemon=True)
+        self.logger = logging.getLogger("Gpios")
+        # self.logger.setLevel(logging.DEBUG)
+
+        # members
+        self.outputs = outputs
+        self.source = source
+        self.loop = asyncio.new_event_loop()
+        self.__watchers = {}
+        self.__lock = Lock()
+        # following members are only accessed from loop thread
+        self.__tasks = {}
+        self.__fds = {}
+        self.__timers = {}
+
+    def __call_soon(self, callback, *args):
+        """
+        Schedule callback on loop thread
+        """
+        try:
+            self.loop.call_soon_threadsafe(callback, *args)
+        except RuntimeError:
+            self.logger.debug("Engine loop is closed")
+
+    def submit(self, coroutine):
+        """
+        Execute coroutine on engine loop
+
+        Args:
+            coroutine (coroutine): coroutine to execute
+
+        Returns:
+            concurrent.futures.Future: coroutine future (cancelling it cancels coroutine)
+        """
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+    def call_later(self, delay, callback, *args):
+        """
+        Execute callback after specified delay on engine loop
+
+        Args:
+            delay (float): delay in seconds
+            callback (function): function to call
+            args: callback arguments
+
+        Returns:
+            concurrent.futures.Future: future that can be cancelled
+        """
+        return self.submit(self.__call_later(delay, callback, *args))
+
+    async def __call_later(self, delay, callback, *args):
+        """
+        Wait and call callback
+        """
+        await asyncio.sleep(delay)
+        return callback(*args)
+
+    async def turn_on(self, device_uuid):
+        """
+        Turn on specified output gpio
+
+        Args:
+            device_uuid (str): device identifier
+
+        Returns:
+            bool: True if command executed successfully
+        """
+        return await self.loop.run_in_executor(
+            None, self.outputs.turn_on, device_uuid
+        )
+
+    async def turn_off(self, device_uuid):
+        """
+        Turn off specified output gpio
+
+        Args:
+            device_uuid (str): device identifier
+
+        Returns:
+            bool: True if command executed successfully
+        """
+        return await self.loop.run_in_executor(
+            None, self.outputs.turn_off, device_uuid
+        )
+
+    def register(self, watcher):
+        """
+        Register input watcher
+
+        Args:
+            watcher (GpioInputWatcher): input watcher (not started)
+        """
+        self.logger.debug(
+            "Register input %s for device %s", watcher.pin, watcher.device_uuid
+        )
+        with self.__lock:
+            self.__watchers[watcher.device_uuid] = watcher
+        self.__call_soon(self.__watch, watcher)
+
+    def unregister(self, device_uuid):
+        """
+        Unregister input watcher
+
+        Args:
+            device_uuid (str): device uuid
+
+        Returns:
+            GpioInputWatcher: unregistered watcher or None if device was not registered
+        """
+        with self.__lock:
+            watcher = self.__watchers.pop(device_uuid, None)
+        if watcher is not None:
+            self.logger.debug("Unregister input for device %s", device_uuid)
+            self.__call_soon(self.__unwatch, device_uuid)
+
+        return watcher
+
+    def reschedule(self, device_uuid):
+        """
+        Reschedule input watching, to apply new watcher settings
+
+        Args:
+            device_uuid (str): device uuid
+        """
+        self.__call_soon(self.__reschedule, device_uuid)
+
+    def get_watchers(self):
+        """
+        Return registered watchers
+
+        Returns:
+            dict: registered watchers indexed by device uuid
+        """
+        with self.__lock:
+            return self.__watchers.copy()
+
+    def stop(self):
+        """
+        Stop process
+        """
+        self.__call_soon(self.loop.stop)
+
+    def __is_registered(self, watcher):
+        """
+        Return True if watcher is still registered
+        """
+        with self.__lock:
+            return self.__watchers.get(watcher.device_uuid) is watcher
+
+    def __watch(self, watcher):
+        """
+        Start watching input, using edge events if available
+        """
+        if not self.__is_registered(watcher):
+            return
+
+        fd = None
+        if self.source is not None and watcher.line is not None:
+            try:
+                fd = self.source.open(watcher.line)
+            except Exception as error:
+                self.logger.warning(
+                    "Edge events unavailable for gpio line %s: %s", watcher.line, error
+                )
+
+        if fd is None:
+            self.__tasks[watcher.device_uuid] = self.loop.create_task(
+                self.__poll(watcher)
+            )
+            return
+
+        self.__fds[watcher.device_uuid] = fd
+        self.loop.add_reader(fd, self.__on_edge, watcher, fd)
+        # send initial value
+        watcher.process(self.source.read_level(fd), time.monotonic())
+        self.__schedule_deadline(watcher, fd)
+
+    def __unwatch(self, device_uuid):
+        """
+        Stop watching input
+        """
+        task = self.__tasks.pop(device_uuid, None)
+        if task:
+            task.cancel()
+        timer = self.__timers.pop(device_uuid, None)
+        if timer:
+            timer.cancel()
+        fd = self.__fds.pop(device_uuid, None)
+        if fd is not None:
+            self.loop.remove_reader(fd)
+            self.source.close(fd)
+
+    def __reschedule(self, device_uuid):
+        """
+        Restart polling coroutine or debounce deadline timer of input
+        """
+        with self.__lock:
+            watcher = self.__watchers.get(device_uuid)
+        if watcher is None:
+            return
+
+        task = self.__tasks.get(device_uuid)
+        if task:
+            task.cancel()
+            self.__tasks[device_uuid] = self.loop.create_task(self.__poll(watcher))
+        fd = self.__fds.get(device_uuid)
+        if fd is not None:
+            self.__schedule_deadline(watcher, fd)
+
+    async def __poll(self, watcher):
+        """
+        Input polling coroutine
+        """
+        while True:
+            try:
+                watcher.check()
+            except Exception:  # pragma: no cover
+                self.logger.exception(
+                    "Exception polling input of device %s:", watcher.device_uuid
+                )
+            delay = watcher.current_period
+            deadline = watcher.deadline()
+            if deadline is not None:
+                delay = min(delay, max(0, deadline - time.monotonic()))
+            await asyncio.sleep(delay)
+
+    def __on_edge(self, watcher, fd):
+        """
+        Edge event callback
+        """
+        try:
+            edge = self.source.read_event(fd)
+            if edge is not None:
+                watcher.process(*edge)
+        except Exception:  # pragma: no cover
+            self.logger.exception(
+                "Exception processing edge of device %s:", watcher.device_uuid
+            )
+        self.__schedule_deadline(watcher, fd)
+
+    def __on_deadline(self, watcher, fd):
+        """
+        Debounce deadline callback
+        """
+        self.__timers.pop(watcher.device_uuid, None)
+        try:
+            watcher.process(self.source.read_level(fd), time.monotonic())
+        except Exception:  # pragma: no cover
+            self.logger.exception(
+                "Exception processing input of device %s:", watcher.device_uuid
+            )
+        self.__schedule_deadline(watcher, fd)
+
+    def __schedule_deadline(self, watcher, fd):
+        """
+        Schedule debounce deadline timer (loop clock is monotonic)
+        """
+        timer = self.__timers.pop(watcher.device_uuid, None)
+        if timer:
+            timer.cancel()
+
+        deadline = watcher.deadline()
+        if deadline is not None:
+            self.__timers[watcher.device_uuid] = self.loop.call_at(
+                deadline, self.__on_deadline, watcher, fd
+            )
+
+    def run(self):
+        """
+        Run engine loop
+        """
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_forever()
+
+        finally:
+            for device_uuid in list(self.__tasks.keys()) + list(self.__fds.keys()):
+                self.__unwatch(device_uuid)
+            pendings = asyncio.all_tasks(self.loop)
+            for task in pendings:
+                task.cancel()
+            self.loop.run_until_complete(
+                asyncio.gather(*pendings, return_exceptions=True)
+            )
+            self.loop.close()
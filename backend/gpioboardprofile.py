@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from collections import namedtuple
+
+
+class FrozenDict(dict):
+    """
+    Read-only dict. It can be shared between callers without being copied and it remains a real dict
+    (json serializable, dict comparisons...)
+    """
+
+    def __readonly(self, *args, **kwargs):
+        raise TypeError("%s is read-only" % type(self).__name__)
+
+    __setitem__ = __readonly
+    __delitem__ = __readonly
+    __ior__ = __readonly
+    clear = __readonly
+    pop = __readonly
+    popitem = __readonly
+    setdefault = __readonly
+    update = __readonly
+
+    def __reduce__(self):
+        # copy and pickle can't fill dict using __setitem__
+        return (type(self), (dict(self),))
+
+
+class GpioBoardProfile(
+    namedtuple(
+        "GpioBoardProfile",
+        [
+            "revision",
+            "gpios",
+            "pins",
+            "pins_number",
+            "pwm_pins",
+            "reservable_pins",
+            "lines",
+        ],
+    )
+):
+    """
+    Immutable raspberry pi board description
+
+    Attributes:
+        revision (int): board revision
+        gpios (FrozenDict): gpio name => pin number
+        pins (FrozenDict): pin number => pin label ("GPIOX"|"5V"|"3.3V"|"GND"|"DNC")
+        pins_number (int): number of board pins
+        pwm_pins (frozenset): pins with hardware PWM capability
+        reservable_pins (frozenset): pins that can be assigned or reserved (gpios)
+        lines (FrozenDict): gpio pin number => gpio line number (BCM numbering)
+    """
+
+    __slots__ = ()
+
+    # gpios with hardware PWM channel
+    PWM_GPIOS = ("GPIO12", "GPIO13", "GPIO18", "GPIO19")
+
+    @classmethod
+    def build(cls, revision, gpios, pins, pins_number):
+        """
+        Build board profile
+
+        Args:
+            revision (int): board revision
+            gpios (dict): gpio name => pin number
+            pins (dict): pin number => pin label
+            pins_number (int): number of board pins
+
+        Returns:
+            GpioBoardProfile: board profile
+        """
+        return cls(
+            revision=revision,
+            gpios=FrozenDict(gpios),
+            pins=FrozenDict(pins),
+            pins_number=pins_number,
+            pwm_pins=frozenset(
+                pin for gpio, pin in gpios.items() if gpio in cls.PWM_GPIOS
+            ),
+            reservable_pins=frozenset(gpios.values()),
+            lines=FrozenDict(
+                {pin: int(gpio.replace("GPIO", "")) for gpio, pin in gpios.items()}
+            ),
+        )
@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from threading import RLock
+from contextlib import contextmanager
+
+
+class GpioDeviceLocks:
+    """
+    Class that provides per-device locks using lock striping
+    Each device uuid is mapped to one of a fixed set of locks, so operations on the same device are
+    serialized while operations on other devices (most likely mapped to other locks) run concurrently.
+    Locks are reentrant so a locked operation can call another one on the same device.
+    """
+
+    STRIPES = 32
+
+    def __init__(self, stripes=STRIPES):
+        """
+        Constructor
+
+        Args:
+            stripes (int): number of locks
+        """
+        self.__locks = tuple(RLock() for _ in range(stripes))
+
+    def get(self, device_uuid):
+        """
+        Return lock of specified device
+
+        Args:
+            device_uuid (str): device uuid
+
+        Returns:
+            RLock: device lock
+        """
+        return self.__locks[hash(device_uuid) % len(self.__locks)]
+
+    @contextmanager
+    def hold(self, device_uuids):
+        """
+        Context manager that holds locks of several devices. Locks are always acquired in the same
+        order so concurrent callers can't deadlock.
+
+        Args:
+            device_uuids (iterable): devices uuids
+        """
+        locks = [
+            self.__locks[index]
+            for index in sorted(
+                {hash(device_uuid) % len(self.__locks) for device_uuid in device_uuids}
+            )
+        ]
+        for lock in locks:
+            lock.acquire()
+        try:
+            yield
+        finally:
+            for lock in reversed(locks):
+                lock.release()
+
+    def __len__(self):
+        return len(self.__locks)
@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from threading import Lock
+
+
+class GpioDevicesIndex:
+    """
+    Class that indexes devices uuids by some of their fields, so devices can be searched without
+    iterating over all of them
+    """
+
+    KEYS = ("gpio", "name", "pin", "subtype", "owner")
+
+    def __init__(self, keys=KEYS):
+        """
+        Constructor
+
+        Args:
+            keys (tuple): indexed device fields
+        """
+        self.keys = keys
+        # key => value => uuids (dict is used as ordered set)
+        self.__indexes = {key: {} for key in keys}
+        # uuid => indexed values
+        self.__values = {}
+        self.__lock = Lock()
+
+    def __add(self, device):
+        """
+        Index device (must be called with lock acquired)
+        """
+        values = tuple(device.get(key) for key in self.keys)
+        self.__values[device["uuid"]] = values
+        for key, value in zip(self.keys, values):
+            self.__indexes[key].setdefault(value, {})[device["uuid"]] = None
+
+    def __remove(self, device_uuid):
+        """
+        Unindex device (must be called with lock acquired)
+        """
+        values = self.__values.pop(device_uuid, None)
+        if values is None:
+            return
+        for key, value in zip(self.keys, values):
+            uuids = self.__indexes[key].get(value)
+            if uuids is None:
+                continue
+            uuids.pop(device_uuid, None)
+            if not uuids:
+                del self.__indexes[key][value]
+
+    def rebuild(self, devices):
+        """
+        Index all specified devices, previous index content is dropped
+
+        Args:
+            devices (dict): devices indexed by uuid
+        """
+        with self.__lock:
+            self.__indexes = {key: {} for key in self.keys}
+            self.__values = {}
+            for device in devices.values():
+                self.__add(device)
+
+    def add(self, device):
+        """
+        Add or update device in index
+
+        Args:
+            device (dict): device data (with uuid)
+        """
+        with self.__lock:
+            self.__remove(device["uuid"])
+            self.__add(device)
+
+    def remove(self, device_uuid):
+        """
+        Remove device from index
+
+        Args:
+            device_uuid (str): device uuid
+        """
+        with self.__lock:
+            self.__remove(device_uuid)
+
+    def is_indexed(self, key):
+        """
+        Return True if device field is indexed
+
+        Args:
+            key (str): device field
+
+        Returns:
+            bool: True if field is indexed
+        """
+        return key in self.__indexes
+
+    def get_values(self, device_uuid):
+        """
+        Return indexed values of specified device
+
+        Args:
+            device_uuid (str): device uuid
+
+        Returns:
+            dict: indexed fields values or None if device is not indexed
+        """
+        with self.__lock:
+            values = self.__values.get(device_uuid)
+        return dict(zip(self.keys, values)) if values is not None else None
+
+    def get(self, key, value):
+        """
+        Return uuids of devices whose field has specified value
+
+        Args:
+            key (str): indexed device field
+            value (any): field value
+
+        Returns:
+            list: list of devices uuids (in indexation order)
+        """
+        with self.__lock:
+            return list(self.__indexes[key].get(value, {}).keys())
@@ -0,0 +1,24 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from .gpioboardprofile import FrozenDict
+
+
+class GpioDevicesSnapshot(FrozenDict):
+    """
+    Read-only devices indexed by uuid, stamped with the version of devices it was built from
+    """
+
+    def __init__(self, devices, version):
+        """
+        Constructor
+
+        Args:
+            devices (dict): devices indexed by uuid
+            version (int): devices version
+        """
+        super().__init__(devices)
+        self.version = version
+
+    def __reduce__(self):
+        return (type(self), (dict(self), self.version))
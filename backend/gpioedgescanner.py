@@ -0,0 +1,456 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from threading import Thread, Lock
+import logging
+import os
+import select
+import struct
+import time
+import fcntl
+
+
+class GpioChardevEdgeSource:
+    """
+    Edge events source using Linux gpio character device (line events ABI v1)
+    Kernel timestamps each edge, so event timestamps are accurate whatever the scanner load.
+    """
+
+    CHIP_PATH = "/dev/gpiochip0"
+    CONSUMER = b"cleep-gpios"
+    POLL_EVENTS = select.POLLIN | select.POLLPRI
+
+    # linux/gpio.h
+    GPIO_GET_LINEEVENT_IOCTL = 0xC030B404
+    GPIOHANDLE_GET_LINE_VALUES_IOCTL = 0xC040B408
+    GPIOHANDLE_REQUEST_INPUT = 0x01
+    GPIOEVENT_REQUEST_BOTH_EDGES = 0x03
+    GPIOEVENT_EVENT_RISING_EDGE = 0x01
+    GPIOEVENT_REQUEST_FORMAT = "<III32si"
+    GPIOEVENT_DATA_FORMAT = "<QI4x"
+    GPIOEVENT_DATA_SIZE = struct.calcsize(GPIOEVENT_DATA_FORMAT)
+
+    def __init__(self, chip_path=CHIP_PATH):
+        """
+        Constructor
+
+        Args:
+            chip_path (str): gpio character device path
+        """
+        self.chip_path = chip_path
+
+    def is_available(self):
+        """
+        Return True if source can be used on this system
+
+        Returns:
+            bool: True if gpio character device exists
+        """
+        return os.path.exists(self.chip_path)
+
+    def open(self, line):
+        """
+        Request edge events for specified line
+
+        Args:
+            line (int): gpio line number (BCM numbering)
+
+        Returns:
+            int: line events file descriptor
+        """
+        request = bytearray(
+            struct.pack(
+                self.GPIOEVENT_REQUEST_FORMAT,
+                line,
+                self.GPIOHANDLE_REQUEST_INPUT,
+                self.GPIOEVENT_REQUEST_BOTH_EDGES,
+                self.CONSUMER,
+                0,
+            )
+        )
+        chip_fd = os.open(self.chip_path, os.O_RDONLY)
+        try:
+            fcntl.ioctl(chip_fd, self.GPIO_GET_LINEEVENT_IOCTL, request, True)
+        finally:
+            os.close(chip_fd)
+
+        return struct.unpack(self.GPIOEVENT_REQUEST_FORMAT, request)[4]
+
+    def read_level(self, fd):
+        """
+        Read current line level
+
+        Args:
+            fd (int): line events file descriptor
+
+        Returns:
+            int: 1 if line is high, 0 otherwise
+        """
+        values = bytearray(64)
+        fcntl.ioctl(fd, self.GPIOHANDLE_GET_LINE_VALUES_IOCTL, values, True)
+        return 1 if values[0] else 0
+
+    def read_event(self, fd):
+        """
+        Read pending edge event
+
+        Args:
+            fd (int): line events file descriptor
+
+        Returns:
+            tuple: level (int) and monotonic timestamp (float) of edge, or None if no event available
+        """
+        data = os.read(fd, self.GPIOEVENT_DATA_SIZE)
+        if len(data) < self.GPIOEVENT_DATA_SIZE:
+            return None
+
+        timestamp, event_id = struct.unpack(self.GPIOEVENT_DATA_FORMAT, data)
+        level = 1 if event_id == self.GPIOEVENT_EVENT_RISING_EDGE else 0
+        return level, self._to_monotonic(timestamp / 1000000000.0)
+
+    def _to_monotonic(self, timestamp):
+        """
+        Convert kernel event timestamp to monotonic clock. Kernels older than 5.7 timestamp
+        events with realtime clock.
+
+        Args:
+            timestamp (float): kernel event timestamp (in seconds)
+
+        Returns:
+            float: monotonic timestamp
+        """
+        now = time.monotonic()
+        if timestamp > now + 86400:
+            return timestamp - (time.time() - now)
+        return timestamp
+
+    def close(self, fd):
+        """
+        Release line
+
+        Args:
+            fd (int): line events file descriptor
+        """
+        os.close(fd)
+
+
+class GpioSysfsEdgeSource:
+    """
+    Edge events source using deprecated sysfs gpio interface
+    Sysfs doesn't provide event timestamp, it is set when scanner wakes up.
+    """
+
+    SYSFS_PATH = "/sys/class/gpio"
+    POLL_EVENTS = select.POLLPRI | select.POLLERR
+
+    def __init__(self, sysfs_path=SYSFS_PATH):
+        """
+        Constructor
+
+        Args:
+            sysfs_path (str): sysfs gpio path
+        """
+        self.sysfs_path = sysfs_path
+
+    def is_available(self):
+        """
+        Return True if source can be used on this system
+
+        Returns:
+            bool: True if sysfs gpio interface exists
+        """
+        return os.path.exists(os.path.join(self.sysfs_path, "export"))
+
+    def __write(self, path, value):
+        """
+        Write value to sysfs file
+        """
+        with open(path, "w", encoding="utf-8") as sysfs_file:
+            sysfs_file.write(value)
+
+    def open(self, line):
+        """
+        Export specified line and enable edge events on it
+
+        Args:
+            line (int): gpio line number (BCM numbering)
+
+        Returns:
+            int: line value file descriptor
+        """
+        gpio_path = os.path.join(self.sysfs_path, "gpio%d" % line)
+        if not os.path.exists(gpio_path):
+            self.__write(os.path.join(self.sysfs_path, "export"), str(line))
+        self.__write(os.path.join(gpio_path, "edge"), "both")
+
+        fd = os.open(os.path.join(gpio_path, "value"), os.O_RDONLY)
+        # consume current value to clear pending event
+        os.read(fd, 8)
+        return fd
+
+    def read_level(self, fd):
+        """
+        Read current line level
+
+        Args:
+            fd (int): line value file descriptor
+
+        Returns:
+            int: 1 if line is high, 0 otherwise
+        """
+        os.lseek(fd, 0, os.SEEK_SET)
+        return 1 if os.read(fd, 8)[:1] == b"1" else 0
+
+    def read_event(self, fd):
+        """
+        Read edge event
+
+        Args:
+            fd (int): line value file descriptor
+
+        Returns:
+            tuple: level (int) and monotonic timestamp (float) of edge
+        """
+        return self.read_level(fd), time.monotonic()
+
+    def close(self, fd):
+        """
+        Close line value file
+
+        Args:
+            fd (int): line value file descriptor
+        """
+        os.close(fd)
+
+
+class GpioEdgeScanner(Thread):
+    """
+    Class that waits for kernel edge events of all registered input pins within a single thread
+    Thread sleeps until an edge occurs (or a debounce deadline is reached), so it doesn't consume
+    CPU when inputs don't change and it catches pulses shorter than sampling period.
+
+    Events are read from a pluggable source (see GpioChardevEdgeSource) that must implement:
+        - POLL_EVENTS: poll events mask to wait for
+        - open(line): return file descriptor to poll for specified gpio line
+        - read_level(fd): return current level
+        - read_event(fd): return (level, monotonic timestamp) tuple or None
+        - close(fd): release file descriptor
+
+    Note:
+        This object doesn't configure pins!
+    """
+
+    def __init__(self, source):
+        """
+        Constructor
+
+        Args:
+            source (object): edge events source
+        """
+        # init
+        Thread.__init__(self, daemon=True)
+        self.logger = logging.getLogger("Gpios")
+        # self.logger.setLevel(logging.DEBUG)
+
+        # members
+        self.continu = True
+        self.source = source
+        self.__watchers = {}
+        self.__fds = {}
+        self.__pendings = []
+        self.__lock = Lock()
+        self.__polled = {}
+        self.__closed = False
+        self.__poller = select.poll()
+        self.__wakeup_read, self.__wakeup_write = os.pipe()
+        self.__poller.register(self.__wakeup_read, select.POLLIN)
+
+    def __wakeup(self):
+        """
+        Wake up scanner thread
+        """
+        if self.__closed:
+            return
+        try:
+            os.write(self.__wakeup_write, b"w")
+        except OSError:  # pragma: no cover
+            # scanner already stopped
+            pass
+
+    def register(self, watcher):
+        """
+        Register input watcher to receive edge events
+
+        Args:
+            watcher (GpioInputWatcher): input watcher (not started) with line specified
+
+        Returns:
+            bool: True if watcher is registered, False if edge events are not available for its line
+        """
+        if watcher.line is None:
+            return False
+
+        try:
+            fd = self.source.open(watcher.line)
+        except Exception as error:
+            self.logger.warning(
+                "Edge events unavailable for gpio line %s: %s", watcher.line, error
+            )
+            return False
+
+        self.logger.debug(
+            "Register input %s for device %s", watcher.pin, watcher.device_uuid
+        )
+        with self.__lock:
+            self.__watchers[watcher.device_uuid] = watcher
+            self.__fds[watcher.device_uuid] = fd
+            self.__pendings.append((True, watcher, fd))
+        self.__wakeup()
+
+        return True
+
+    def unregister(self, device_uuid):
+        """
+        Unregister input watcher
+
+        Args:
+            device_uuid (str): device uuid
+
+        Returns:
+            GpioInputWatcher: unregistered watcher or None if device was not registered
+        """
+        with self.__lock:
+            watcher = self.__watchers.pop(device_uuid, None)
+            fd = self.__fds.pop(device_uuid, None)
+            if fd is not None:
+                self.logger.debug("Unregister input for device %s", device_uuid)
+                self.__pendings.append((False, watcher, fd))
+        self.__wakeup()
+
+        return watcher
+
+    def reschedule(self, device_uuid):
+        """
+        Compute again poll timeout, to apply new watcher settings
+
+        Args:
+            device_uuid (str): device uuid
+        """
+        with self.__lock:
+            if device_uuid not in self.__watchers:
+                return
+        self.__wakeup()
+
+    def get_watchers(self):
+        """
+        Return registered watchers
+
+        Returns:
+            dict: registered watchers indexed by device uuid
+        """
+        with self.__lock:
+            return self.__watchers.copy()
+
+    def stop(self):
+        """
+        Stop process
+        """
+        self.continu = False
+        self.__wakeup()
+
+    def __is_registered(self, watcher):
+        """
+        Return True if watcher is still registered
+        """
+        with self.__lock:
+            return self.__watchers.get(watcher.device_uuid) is watcher
+
+    def __apply_pendings(self):
+        """
+        Apply pending registrations. File descriptors are only polled and closed by scanner thread.
+        """
+        with self.__lock:
+            pendings = self.__pendings
+            self.__pendings = []
+
+        for add, watcher, fd in pendings:
+            if add:
+                self.__poller.register(fd, self.source.POLL_EVENTS)
+                self.__polled[fd] = watcher
+                if self.__is_registered(watcher):
+                    # send initial value
+                    watcher.process(self.source.read_level(fd), time.monotonic())
+            else:
+                self.__poller.unregister(fd)
+                self.__polled.pop(fd, None)
+                self.source.close(fd)
+
+    def __get_timeout(self):
+        """
+        Return poll timeout according to watchers deadlines
+
+        Returns:
+            int: timeout in milliseconds or None if there is no deadline
+        """
+        deadlines = [
+            deadline
+            for deadline in (watcher.deadline() for watcher in self.__polled.values())
+            if deadline is not None
+        ]
+        if not deadlines:
+            return None
+
+        return max(0, int((min(deadlines) - time.monotonic()) * 1000) + 1)
+
+    def __process_deadlines(self):
+        """
+        Sample inputs whose deadline is reached
+        """
+        now = time.monotonic()
+        for fd, watcher in self.__polled.items():
+            deadline = watcher.deadline()
+            if deadline is not None and deadline <= now and self.__is_registered(watcher):
+                watcher.process(self.source.read_level(fd), now)
+
+    def __process_events(self, events):
+        """
+        Dispatch polled events to watchers
+        """
+        for fd, _ in events:
+            if fd == self.__wakeup_read:
+                os.read(fd, 512)
+                continue
+
+            watcher = self.__polled.get(fd)
+            if watcher is None:
+                continue
+            edge = self.source.read_event(fd)
+            if edge is not None and self.__is_registered(watcher):
+                watcher.process(*edge)
+
+    def run(self):
+        """
+        Run scanner
+        """
+        try:
+            while self.continu:
+                try:
+                    self.__apply_pendings()
+                    self.__process_events(self.__poller.poll(self.__get_timeout()))
+                    self.__process_deadlines()
+                except Exception:  # pragma: no cover
+                    self.logger.exception("Exception in GpioEdgeScanner:")
+                    time.sleep(0.1)
+
+        finally:
+            with self.__lock:
+                self.__closed = True
+                pendings = self.__pendings
+                self.__pendings = []
+            fds = set(self.__polled.keys())
+            fds.update(fd for add, _, fd in pendings if add)
+            for fd in fds:
+                self.source.close(fd)
+            self.__polled.clear()
+            os.close(self.__wakeup_read)
+            os.close(self.__wakeup_write)
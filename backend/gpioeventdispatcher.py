@@ -0,0 +1,169 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from threading import Thread, Lock
+import logging
+import queue
+
+
+class GpioEventDispatcher(Thread):
+    """
+    Class that decouples input sampling from callbacks work (device update, config write, event send)
+    Watchers push input level changes as records into a bounded queue that is drained by dispatcher
+    thread, so a slow callback never stalls sampling. When queue is full, new records are dropped
+    and counted.
+
+    Records are (device_uuid, on, duration) tuples.
+    """
+
+    DEPTH = 256
+
+    def __init__(self, on_callback, off_callback, depth=DEPTH):
+        """
+        Constructor
+
+        Args:
+            on_callback (function): function called with device uuid when input is turned on
+            off_callback (function): function called with device uuid and on duration when input is
+                                     turned off
+            depth (int): queue depth (number of records)
+        """
+        # init
+        Thread.__init__(self, daemon=True)
+        self.logger = logging.getLogger("Gpios")
+        # self.logger.setLevel(logging.DEBUG)
+
+        # members
+        self.continu = True
+        self.on_callback = on_callback
+        self.off_callback = off_callback
+        self.__queue = queue.Queue(depth)
+        self.__lock = Lock()
+        self.__high_water = 0
+        self.__dropped = 0
+        self.__dispatched = 0
+
+    def set_depth(self, depth):
+        """
+        Set queue depth. Must be called before dispatcher is started.
+
+        Args:
+            depth (int): queue depth (number of records)
+        """
+        self.__queue = queue.Queue(depth)
+
+    def on(self, device_uuid):
+        """
+        Queue input on record. Can be used as GpioInputWatcher on callback.
+
+        Args:
+            device_uuid (str): device uuid
+        """
+        self.push(device_uuid, True)
+
+    def off(self, device_uuid, duration):
+        """
+        Queue input off record. Can be used as GpioInputWatcher off callback.
+
+        Args:
+            device_uuid (str): device uuid
+            duration (float): on duration in seconds
+        """
+        self.push(device_uuid, False, duration)
+
+    def push(self, device_uuid, on, duration=0):
+        """
+        Queue record without blocking
+
+        Args:
+            device_uuid (str): device uuid
+            on (bool): True if input is on
+            duration (float): on duration in seconds (off record only)
+
+        Returns:
+            bool: True if record is queued, False if it is dropped because queue is full
+        """
+        try:
+            self.__queue.put_nowait((device_uuid, on, duration))
+        except queue.Full:
+            with self.__lock:
+                self.__dropped += 1
+            self.logger.warning(
+                'Dispatch queue is full, input record of device "%s" dropped',
+                device_uuid,
+            )
+            return False
+
+        size = self.__queue.qsize()
+        with self.__lock:
+            self.__high_water = max(self.__high_water, size)
+        return True
+
+    def get_stats(self):
+        """
+        Return dispatcher counters
+
+        Returns:
+            dict: counters::
+
+                {
+                    depth (int): queue depth
+                    size (int): number of records in queue
+                    high_water (int): maximum number of records queued at once
+                    dropped (int): number of records dropped because queue was full
+                    dispatched (int): number of records dispatched
+                }
+
+        """
+        with self.__lock:
+            return {
+                "depth": self.__queue.maxsize,
+                "size": self.__queue.qsize(),
+                "high_water": self.__high_water,
+                "dropped": self.__dropped,
+                "dispatched": self.__dispatched,
+            }
+
+    def stop(self):
+        """
+        Stop process. Records still queued are not dispatched.
+        """
+        self.continu = False
+        try:
+            # wake up dispatcher thread
+            self.__queue.put_nowait(None)
+        except queue.Full:
+            # dispatcher thread is not waiting for record
+            pass
+
+    def dispatch(self, record):
+        """
+        Call callback of specified record
+
+        Args:
+            record (tuple): (device_uuid, on, duration) record
+        """
+        device_uuid, on, duration = record
+        if on:
+            self.on_callback(device_uuid)
+        else:
+            self.off_callback(device_uuid, duration)
+
+        with self.__lock:
+            self.__dispatched += 1
+
+    def run(self):
+        """
+        Run dispatcher
+        """
+        while self.continu:
+            record = self.__queue.get()
+            if record is None or not self.continu:
+                break
+
+            try:
+                self.dispatch(record)
+            except Exception:
+                self.logger.exception(
+                    'Exception dispatching input record of device "%s":', record[0]
+                )
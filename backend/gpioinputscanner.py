@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from threading import Thread, Lock, Event
+import logging
+import time
+
+
+class GpioInputScanner(Thread):
+    """
+    Class that samples all registered input pins within a single thread
+    Each watcher is sampled according to its own period (and sooner when it waits for a level change
+    confirmation), watchers dispatch on/off callbacks themselves.
+
+    When gpio memory is available, all due inputs are decoded from a single read of gpio level
+    registers instead of one RPi.GPIO call per input.
+
+    Note:
+        This object doesn't configure pins!
+    """
+
+    def __init__(self, memory=None):
+        """
+        Constructor
+
+        Args:
+            memory (GpioMemory): opened gpio memory used to read all levels at once (optional)
+        """
+        # init
+        Thread.__init__(self, daemon=True)
+        self.logger = logging.getLogger("Gpios")
+        # self.logger.setLevel(logging.DEBUG)
+
+        # members
+        self.continu = True
+        self.memory = memory
+        self.__watchers = {}
+        self.__schedule = {}
+        self.__lock = Lock()
+        self.__wakeup = Event()
+
+    def register(self, watcher):
+        """
+        Register input watcher to sample
+
+        Args:
+            watcher (GpioInputWatcher): input watcher (not started)
+        """
+        self.logger.debug(
+            "Register input %s for device %s", watcher.pin, watcher.device_uuid
+        )
+        with self.__lock:
+            self.__watchers[watcher.device_uuid] = watcher
+            self.__schedule[watcher.device_uuid] = 0
+        self.__wakeup.set()
+
+    def unregister(self, device_uuid):
+        """
+        Unregister input watcher
+
+        Args:
+            device_uuid (str): device uuid
+
+        Returns:
+            GpioInputWatcher: unregistered watcher or None if device was not registered
+        """
+        self.logger.debug("Unregister input for device %s", device_uuid)
+        with self.__lock:
+            self.__schedule.pop(device_uuid, None)
+            return self.__watchers.pop(device_uuid, None)
+
+    def reschedule(self, device_uuid):
+        """
+        Sample input as soon as possible, to apply new watcher settings
+
+        Args:
+            device_uuid (str): device uuid
+        """
+        with self.__lock:
+            if device_uuid not in self.__schedule:
+                return
+            self.__schedule[device_uuid] = 0
+        self.__wakeup.set()
+
+    def get_watchers(self):
+        """
+        Return registered watchers
+
+        Returns:
+            dict: registered watchers indexed by device uuid
+        """
+        with self.__lock:
+            return self.__watchers.copy()
+
+    def stop(self):
+        """
+        Stop process
+        """
+        self.continu = False
+        self.__wakeup.set()
+
+    def scan(self):
+        """
+        Sample registered inputs whose sampling time is reached
+
+        Returns:
+            float: delay before next scan (in seconds) or None if there is no input to sample
+        """
+        now = time.monotonic()
+        with self.__lock:
+            watchers = [
+                watcher
+                for device_uuid, watcher in self.__watchers.items()
+                if self.__schedule[device_uuid] <= now
+            ]
+
+        levels = None
+        if watchers and self.memory is not None:
+            levels = self.memory.read_levels()
+
+        for watcher in watchers:
+            next_check = now + watcher.period
+            try:
+                if levels is not None and watcher.line is not None:
+                    watcher.process((levels >> watcher.line) & 1, now)
+                else:
+                    watcher.check()
+                next_check = now + watcher.current_period
+                deadline = watcher.deadline()
+                if deadline is not None:
+                    next_check = min(next_check, deadline)
+            except Exception:  # pragma: no cover
+                self.logger.exception(
+                    "Exception scanning input of device %s:", watcher.device_uuid
+                )
+
+            with self.__lock:
+                if watcher.device_uuid in self.__schedule:
+                    self.__schedule[watcher.device_uuid] = next_check
+
+        with self.__lock:
+            if not self.__schedule:
+                return None
+            return max(0, min(self.__schedule.values()) - time.monotonic())
+
+    def run(self):
+        """
+        Run scanner
+        """
+        while self.continu:
+            self.__wakeup.wait(self.scan())
+            self.__wakeup.clear()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from threading import Lock
+import logging
+import mmap
+import os
+
+
+class GpioMemory:
+    """
+    Class that accesses BCM283x gpio registers through memory mapped /dev/gpiomem
+    Whole gpio bank is read with a single register access instead of one RPi.GPIO call per pin, and
+    outputs of a bank are set (or cleared) with a single register store so they switch at the same
+    instant.
+
+    Note:
+        Lines are BCM numbered. This object doesn't configure pins!
+    """
+
+    DEVICE_PATH = "/dev/gpiomem"
+    BLOCK_SIZE = 4096
+
+    # output set registers offsets
+    GPSET0 = 0x1C
+    GPSET1 = 0x20
+    # output clear registers offsets
+    GPCLR0 = 0x28
+    GPCLR1 = 0x2C
+    # level registers offsets
+    GPLEV0 = 0x34
+    GPLEV1 = 0x38
+
+    def __init__(self, device_path=DEVICE_PATH):
+        """
+        Constructor
+
+        Args:
+            device_path (str): gpio memory device path
+        """
+        self.logger = logging.getLogger("Gpios")
+        # self.logger.setLevel(logging.DEBUG)
+        self.device_path = device_path
+        self.__mmap = None
+        self.__registers = None
+        self.__lock = Lock()
+
+    def open(self):
+        """
+        Map gpio memory
+
+        Returns:
+            bool: True if gpio memory is mapped, False if it is not available
+        """
+        try:
+            fd = os.open(self.device_path, os.O_RDWR | os.O_SYNC)
+        except OSError as error:
+            self.logger.info("Gpio memory is not available: %s", error)
+            return False
+
+        try:
+            # device file size is 0, regular file (tests) can be smaller than block
+            size = os.fstat(fd).st_size
+            length = min(size, self.BLOCK_SIZE) if size else self.BLOCK_SIZE
+            self.__mmap = mmap.mmap(fd, length, mmap.MAP_SHARED)
+            self.__registers = memoryview(self.__mmap).cast("I")
+            return True
+        except Exception as error:
+            self.logger.warning("Unable to map gpio memory: %s", error)
+            return False
+        finally:
+            os.close(fd)
+
+    def is_opened(self):
+        """
+        Return True if gpio memory is mapped
+
+        Returns:
+            bool: True if mapped
+        """
+        return self.__registers is not None
+
+    def close(self):
+        """
+        Unmap gpio memory
+        """
+        with self.__lock:
+            if self.__registers is not None:
+                self.__registers.release()
+                self.__registers = None
+            if self.__mmap is not None:
+                self.__mmap.close()
+                self.__mmap = None
+
+    def read_levels(self):
+        """
+        Read levels of all lines
+
+        Returns:
+            int: lines levels bitmask (bit N is level of line N) or None if memory is not mapped
+        """
+        with self.__lock:
+            if self.__registers is None:
+                return None
+            return self.__registers[self.GPLEV0 // 4] | (
+                self.__registers[self.GPLEV1 // 4] << 32
+            )
+
+    def write_levels(self, set_mask, clear_mask):
+        """
+        Clear and set output lines. Lines of a bank (0-31 and 32-53) are cleared with a single register
+        store, then set with a single register store (clearing first, complementary outputs like
+        H-bridge inputs are never high at the same time).
+
+        Note:
+            Lines must be configured as outputs.
+
+        Args:
+            set_mask (int): bitmask of lines to set high (bit N is line N)
+            clear_mask (int): bitmask of lines to set low (bit N is line N)
+
+        Returns:
+            bool: True if lines are written, False if memory is not mapped
+        """
+        with self.__lock:
+            if self.__registers is None:
+                return False
+            for offset, mask in (
+                (self.GPCLR0, clear_mask & 0xFFFFFFFF),
+                (self.GPCLR1, clear_mask >> 32),
+                (self.GPSET0, set_mask & 0xFFFFFFFF),
+                (self.GPSET1, set_mask >> 32),
+            ):
+                # writing 0 bits has no effect, skip useless stores
+                if mask:
+                    self.__registers[offset // 4] = mask
+            return True
@@ -0,0 +1,209 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from threading import Thread, Condition
+import heapq
+import logging
+import time
+
+
+class GpioPwmEngine(Thread):
+    """
+    Class that drives software PWM outputs from a single thread
+    Each channel (output pin) toggles at its own edges, next edges of all channels are stored in a heap
+    ordered by deadline, so any number of PWM outputs costs one thread. Edges are scheduled from
+    previous edge deadline (not from actual toggle time) so late edges don't shift the signal; a
+    channel late by more than a whole period is resynchronized.
+
+    Edge lateness (jitter) is measured on each toggle. Outputs are written by engine thread with
+    engine lock acquired, so no write occurs on a pin once its channel is removed. A channel whose
+    output write fails is removed.
+    """
+
+    def __init__(self, output_callback):
+        """
+        Constructor
+
+        Args:
+            output_callback (function): function called with pin and level (1 high, 0 low) to write output
+        """
+        # init
+        Thread.__init__(self, daemon=True)
+        self.logger = logging.getLogger("Gpios")
+        # self.logger.setLevel(logging.DEBUG)
+
+        # members
+        self.continu = True
+        self.output_callback = output_callback
+        self.__condition = Condition()
+        # pin => channel {frequency, duty, inverted, generation, high}
+        self.__channels = {}
+        # heap of (deadline, pin, generation)
+        self.__heap = []
+        self.__generation = 0
+        self.__edges = 0
+        self.__resyncs = 0
+        self.__jitter_sum = 0.0
+        self.__max_jitter = 0.0
+
+    def __write(self, pin, high, inverted):
+        """
+        Write output level (must be called with condition acquired)
+
+        Returns:
+            bool: True if output is written
+        """
+        try:
+            self.output_callback(pin, 1 if high != inverted else 0)
+            return True
+        except Exception:
+            self.logger.exception("Exception writing pwm output on pin %s:" % pin)
+            return False
+
+    def set_channel(self, pin, frequency, duty, inverted=False):
+        """
+        Drive pin with specified PWM signal, channel is created or updated. A new period starts
+        immediately. Duty cycle of 0 or 100% holds output level without toggling. Channel is not
+        created if its output can't be written.
+
+        Args:
+            pin (int): pin number
+            frequency (float): PWM frequency in Hz
+            duty (float): duty cycle in percent (0-100)
+            inverted (bool): True if output is active low
+        """
+        with self.__condition:
+            self.__generation += 1
+            channel = {
+                "frequency": frequency,
+                "duty": duty,
+                "inverted": inverted,
+                "generation": self.__generation,
+                "high": duty > 0,
+            }
+            self.__channels[pin] = channel
+            if not self.__write(pin, channel["high"], inverted):
+                del self.__channels[pin]
+                return
+            if 0 < duty < 100:
+                # first falling edge ends high part of first period
+                deadline = time.monotonic() + duty / 100.0 / frequency
+                heapq.heappush(self.__heap, (deadline, pin, channel["generation"]))
+                self.__condition.notify()
+
+    def remove_channel(self, pin):
+        """
+        Stop driving pin. Output keeps its current level, caller must set its final level.
+
+        Args:
+            pin (int): pin number
+
+        Returns:
+            bool: True if pin was driven by engine
+        """
+        with self.__condition:
+            # heap entry of removed channel is dropped lazily
+            return self.__channels.pop(pin, None) is not None
+
+    def get_channels(self):
+        """
+        Return driven pins
+
+        Returns:
+            dict: channels settings ({pin: {frequency, duty, inverted}})
+        """
+        with self.__condition:
+            return {
+                pin: {
+                    "frequency": channel["frequency"],
+                    "duty": channel["duty"],
+                    "inverted": channel["inverted"],
+                }
+                for pin, channel in self.__channels.items()
+            }
+
+    def get_stats(self):
+        """
+        Return engine counters
+
+        Returns:
+            dict: counters::
+
+                {
+                    channels (int): number of driven pins
+                    edges (int): number of edges generated
+                    resyncs (int): number of channels resynchronized after missing a whole period
+                    mean_jitter (float): mean delay between edge deadline and output toggle (in seconds)
+                    max_jitter (float): maximum delay between edge deadline and output toggle (in seconds)
+                }
+
+        """
+        with self.__condition:
+            return {
+                "channels": len(self.__channels),
+                "edges": self.__edges,
+                "resyncs": self.__resyncs,
+                "mean_jitter": self.__jitter_sum / self.__edges
+                if self.__edges
+                else 0.0,
+                "max_jitter": self.__max_jitter,
+            }
+
+    def stop(self):
+        """
+        Stop process. Outputs keep their current level.
+        """
+        with self.__condition:
+            self.continu = False
+            self.__condition.notify()
+
+    def __toggle_due_edge(self):
+        """
+        Wait for next due edge and toggle its output (must be called with condition acquired)
+        """
+        if not self.__heap:
+            self.__condition.wait()
+            return
+
+        deadline, pin, generation = self.__heap[0]
+        channel = self.__channels.get(pin)
+        if channel is None or channel["generation"] != generation:
+            # removed or updated channel
+            heapq.heappop(self.__heap)
+            return
+
+        now = time.monotonic()
+        if deadline > now:
+            self.__condition.wait(deadline - now)
+            return
+
+        heapq.heappop(self.__heap)
+        channel["high"] = not channel["high"]
+        if not self.__write(pin, channel["high"], channel["inverted"]):
+            del self.__channels[pin]
+            return
+        jitter = now - deadline
+        self.__edges += 1
+        self.__jitter_sum += jitter
+        self.__max_jitter = max(self.__max_jitter, jitter)
+
+        # schedule next edge from this edge deadline to keep signal frequency
+        period = 1.0 / channel["frequency"]
+        high_time = period * channel["duty"] / 100.0
+        next_deadline = deadline + (
+            high_time if channel["high"] else period - high_time
+        )
+        if next_deadline < now - period:
+            # engine was late by more than a period, don't try to catch up missed edges
+            self.__resyncs += 1
+            next_deadline = now + (next_deadline - deadline)
+        heapq.heappush(self.__heap, (next_deadline, pin, generation))
+
+    def run(self):
+        """
+        Run engine
+        """
+        while self.continu:
+            # lock is released between edges so engine can't starve commands when it is late
+            with self.__condition:
+                self.__toggle_due_edge()
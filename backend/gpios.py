@@ -1,10 +1,10 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
-from threading import Thread
+from threading import Thread, Event, Lock, RLock
 import logging
 import time
-import uptime
+from uuid import uuid4
 
 # pylint: disable=no-name-in-module
 from RPi.GPIO import (
@@ -34,6 +34,24 @@ from cleep.exception import (
     CommandError,
 )
 from cleep.core import CleepModule
+from .gpioinputscanner import GpioInputScanner
+from .gpiomemory import GpioMemory
+from .gpioasyncengine import GpioAsyncEngine
+from .gpioeventdispatcher import GpioEventDispatcher
+from .gpiodevicesindex import GpioDevicesIndex
+from .gpioboardprofile import GpioBoardProfile, FrozenDict
+from .gpiostatewriter import GpioStateWriter
+from .gpiostatestore import GpioStateStore
+from .gpiostatejournal import GpioStateJournal
+from .gpiotimerscheduler import GpioTimerScheduler
+from .gpiopwmengine import GpioPwmEngine
+from .gpiodevicessnapshot import GpioDevicesSnapshot
+from .gpiodevicelocks import GpioDeviceLocks
+from .gpioedgescanner import (
+    GpioEdgeScanner,
+    GpioChardevEdgeSource,
+    GpioSysfsEdgeSource,
+)
 
 __all__ = ["Gpios"]
 
@@ -43,13 +61,24 @@ class GpioInputWatcher(Thread):
     Class that watches for changes on specified input pin
     We don't use GPIO lib implemented threaded callback due to a bug when executing a timer within callback function.
 
+    Watcher can run as standalone thread or be sampled by a GpioInputScanner that handles all inputs
+    within a single thread (see check function). It can also be fed with kernel edge events by a
+    GpioEdgeScanner (see process function).
+
+    When max_period is set, sampling is adaptive: sampling period grows while input level doesn't
+    change (up to max_period) and gets back to period as soon as input level changes.
+
     Note:
         This object doesn't configure pin!
     """
 
     DEBOUNCE = 0.20
+    PERIOD = 0.125
+    ADAPTIVE_FACTOR = 1.5
 
-    def __init__(self, pin, device_uuid, on_callback, off_callback, level=GPIO_LOW):
+    def __init__(
+        self, pin, device_uuid, on_callback, off_callback, level=GPIO_LOW, line=None
+    ):
         """
         Constructor
 
@@ -59,6 +88,7 @@ class GpioInputWatcher(Thread):
             on_callback (function): on callback
             off_callback (function): off callback
             level (GPIO.LOW|GPIO.HIGH): triggered level
+            line (int): gpio line number (BCM numbering) used by edge scanner
         """
         # init
         Thread.__init__(self)
@@ -69,7 +99,9 @@ class GpioInputWatcher(Thread):
 
         # members
         self.continu = True
+        self.__stop_event = Event()
         self.pin = pin
+        self.line = line
         self.logger.debug(
             "Register new input callback for %s which trigger on '%s'",
             device_uuid,
@@ -77,14 +109,36 @@ class GpioInputWatcher(Thread):
         )
         self.level = level
         self.debounce = GpioInputWatcher.DEBOUNCE
+        self.period = GpioInputWatcher.PERIOD
+        self.max_period = None
         self.on_callback = on_callback
         self.off_callback = off_callback
+        self.__last_level = None
+        self.__pending_level = None
+        self.__pending_since = 0
+        self.__time_on = 0
+        self.__current_period = None
+        self.__lock = Lock()
+
+    @property
+    def current_period(self):
+        """
+        Return current sampling period
+
+        Returns:
+            float: sampling period in seconds
+        """
+        if self.__current_period is None or not self.max_period:
+            return self.period
+
+        return self.__current_period
 
     def stop(self):
         """
-        Stop process
+        Stop process. Watcher doesn't process levels anymore and running thread wakes up immediately
         """
         self.continu = False
+        self.__stop_event.set()
 
     def _get_input_level(self):  # pragma: no cover
         """
@@ -95,41 +149,158 @@ class GpioInputWatcher(Thread):
         """
         return GPIO_input(self.pin)
 
-    def run(self):
+    def deadline(self):
         """
-        Run watcher
+        Return timestamp at which input must be sampled again to confirm a pending level change
+
+        Returns:
+            float: monotonic timestamp or None if there is no pending level change
         """
-        last_level = None
-        time_on = 0
+        if self.__pending_level is None:
+            return None
 
-        try:
-            while self.continu:
-                current_level = self._get_input_level()
+        return self.__pending_since + self.debounce
 
-                if last_level is None:
-                    # first iteration, send initial value
-                    if current_level == self.level:
-                        self.on_callback(self.device_uuid)
-                    else:
-                        self.off_callback(self.device_uuid, 0)
+    def check(self):
+        """
+        Sample input once and trigger callbacks on level changes
+        """
+        self.process(self._get_input_level(), time.monotonic())
+
+    def configure(self, level=None, debounce=None, period=None, max_period=None):
+        """
+        Update watcher settings in place, atomically regarding level processing. Last level, pending
+        level change and on timestamp are kept, so no initial value is sent again.
+
+        If triggered level changes (inverted input), input logical state is inverted too and matching
+        callback is triggered.
+
+        Args:
+            level (GPIO.LOW|GPIO.HIGH): triggered level (optional, unchanged if not specified)
+            debounce (float): debounce delay in seconds (optional, unchanged if not specified)
+            period (float): sampling period in seconds (optional, unchanged if not specified)
+            max_period (float): adaptive sampling period ceiling in seconds, 0 to disable adaptive
+                                sampling (optional, unchanged if not specified)
+        """
+        callback = None
+        with self.__lock:
+            if debounce is not None:
+                self.debounce = debounce
+            if period is not None:
+                self.period = period
+            if max_period is not None:
+                self.max_period = max_period or None
+            if self.__current_period is not None:
+                # keep adaptive sampling progress within new bounds
+                self.__current_period = max(
+                    self.period, min(self.__current_period, self.max_period or 0)
+                )
+
+            if level is not None and level != self.level:
+                self.logger.debug(
+                    "Input %s now triggers on '%s'" % (str(self.pin), level)
+                )
+                self.level = level
+                if self.__last_level is not None:
+                    callback = self.__get_callback(self.__last_level, time.monotonic())
+
+        if callback:
+            callback[0](*callback[1:])
+
+    def __get_callback(self, level, changed_at):
+        """
+        Return callback to trigger for specified confirmed level (must be called with lock acquired)
+
+        Returns:
+            tuple: callback function followed by its arguments
+        """
+        if level == self.level:
+            self.logger.trace("Input %s on" % str(self.pin))
+            self.__time_on = changed_at
+            return (self.on_callback, self.device_uuid)
+
+        self.logger.trace("Input %s off" % str(self.pin))
+        return (self.off_callback, self.device_uuid, changed_at - self.__time_on)
+
+    def process(self, current_level, timestamp):
+        """
+        Process input level and trigger callbacks on level changes
+
+        Debounce doesn't block: a level change is pending until level remains stable during debounce
+        delay. Once confirmed, callbacks are triggered with level change timestamp, so duration is not
+        skewed by debounce nor sampling period.
+
+        Args:
+            current_level (RPi.GPIO.HIGH | RPi.GPIO.LOW): input level
+            timestamp (float): monotonic timestamp of level (in seconds)
+        """
+        if self.__stop_event.is_set():
+            return
+
+        with self.__lock:
+            callback = self.__process(current_level, timestamp)
+
+        # callbacks are triggered outside lock
+        if callback:
+            callback[0](*callback[1:])
+
+    def __process(self, current_level, timestamp):
+        """
+        Process input level (must be called with lock acquired)
+
+        Returns:
+            tuple: callback to trigger (function followed by its arguments) or None
+        """
+        if self.__last_level is None:
+            # first iteration, send initial value
+            self.__last_level = current_level
+            if current_level == self.level:
+                self.__time_on = timestamp
+                return (self.on_callback, self.device_uuid)
+            return (self.off_callback, self.device_uuid, 0)
+
+        if current_level == self.__last_level:
+            # no level changes (or bounce) drop it
+            self.__pending_level = None
+            if self.max_period:
+                # input is idle, slow down sampling
+                self.__current_period = min(
+                    max(self.period, self.max_period),
+                    self.current_period * self.ADAPTIVE_FACTOR,
+                )
+            return None
+
+        # input is active, back to fast sampling
+        self.__current_period = None
 
-                elif current_level == last_level:
-                    # no level changes drop it
-                    pass
+        if current_level != self.__pending_level:
+            # new level change, wait for level to be stable
+            self.__pending_level = current_level
+            self.__pending_since = timestamp
 
-                elif current_level == self.level:
-                    self.logger.trace("Input %s on" % str(self.pin))
-                    time_on = uptime.uptime()
-                    self.on_callback(self.device_uuid)
-                    time.sleep(self.debounce)
+        if timestamp - self.__pending_since < self.debounce:
+            return None
 
-                elif current_level != last_level:
-                    self.logger.trace("Input %s off" % str(self.pin))
-                    self.off_callback(self.device_uuid, uptime.uptime() - time_on)
-                    time.sleep(self.debounce)
+        # level change confirmed
+        self.__last_level = current_level
+        self.__pending_level = None
+        return self.__get_callback(current_level, self.__pending_since)
 
-                last_level = current_level
-                time.sleep(0.125)
+    def run(self):
+        """
+        Run watcher
+        """
+        try:
+            while self.continu:
+                self.check()
+                deadline = self.deadline()
+                period = self.current_period
+                if deadline is None:
+                    self.__stop_event.wait(period)
+                else:
+                    self.__stop_event.wait(
+                        min(period, max(0, deadline - time.monotonic()))
+                    )
 
         except Exception:  # pragma: no cover
             self.logger.exception("Exception in GpioInputWatcher:")
@@ -190,6 +361,16 @@ class Gpios(CleepModule):
 
     MODULE_CONFIG_FILE = "gpios.conf"
 
+    INPUT_ENGINE_THREADS = "threads"
+    INPUT_ENGINE_ASYNCIO = "asyncio"
+    DEFAULT_CONFIG = {
+        "input_engine": INPUT_ENGINE_THREADS,
+        "dispatch_queue_depth": GpioEventDispatcher.DEPTH,
+        "state_write_interval_ms": int(GpioStateWriter.INTERVAL * 1000),
+        "state_max_staleness_ms": int(GpioStateWriter.MAX_STALENESS * 1000),
+        "state_journal": False,
+    }
+
     GPIOS_REV1 = {
         "GPIO0": 3,
         "GPIO1": 5,
@@ -343,8 +524,38 @@ class Gpios(CleepModule):
     MODE_INPUT = "input"
     MODE_OUTPUT = "output"
     MODE_RESERVED = "reserved"
+    # parameters of a gpio in add_gpios batch
+    ADD_GPIO_KEYS = (
+        "name",
+        "gpio",
+        "mode",
+        "keep",
+        "inverted",
+        "debounce_ms",
+        "poll_ms",
+        "poll_max_ms",
+        "pwm_hz",
+    )
+    # parameters of a gpio in update_gpios batch
+    UPDATE_GPIO_KEYS = (
+        "name",
+        "keep",
+        "inverted",
+        "debounce_ms",
+        "poll_ms",
+        "poll_max_ms",
+    )
 
     INPUT_DROP_THRESHOLD = 0.150  # in ms
+    DEBOUNCE_MS_MAX = 10000
+    POLL_MS_MIN = 1
+    POLL_MS_MAX = 60000
+    STOP_TIMEOUT = 1.0  # in seconds
+    DISPATCH_QUEUE_DEPTH_MAX = 65536
+    STATE_WRITE_INTERVAL_MS_MAX = 60000
+    STATE_MAX_STALENESS_MS_MAX = 600000
+    PULSE_MS_MAX = 3600000
+    PWM_HZ_MAX = 1000
 
     def __init__(self, bootstrap, debug_enabled):
         """
@@ -358,7 +569,41 @@ class Gpios(CleepModule):
 
         # members
         self._input_watchers = {}
-        self.gpios_on_states = {}
+        self._gpio_memory = GpioMemory()
+        self._input_scanner = GpioInputScanner()
+        # edge scanner is created at startup, only when inputs are run by threads
+        self._edge_scanner = None
+        self._async_engine = None
+        self._event_dispatcher = GpioEventDispatcher(
+            self.__input_on_callback, self.__input_off_callback
+        )
+        self._devices_index = GpioDevicesIndex()
+        self.__devices_lock = RLock()
+        self._device_locks = GpioDeviceLocks()
+        self._state_writer = GpioStateWriter(
+            self._write_devices_states,
+            maintenance_callback=self._maintain_state_journal,
+        )
+        self._state_journal = GpioStateJournal()
+        # pwm duty cycles are persisted in background too, a burst of duty changes is written once
+        self._duty_writer = GpioStateWriter(self._write_devices_duties)
+        self.__duties = {}
+        self._board_profile = None
+        self._pins_usage = None
+        self._pins_usage_version = 0
+        self.__pins_usage_lock = Lock()
+        self.gpios_on_states = GpioStateStore()
+        self.__outputs_stats = {"writes": 0, "skipped_writes": 0}
+        self.__outputs_stats_lock = Lock()
+        self._timer_scheduler = GpioTimerScheduler()
+        self.__auto_offs = {}
+        self._pwm_engine = GpioPwmEngine(self.__pwm_output)
+        self._devices_snapshot = None
+        self.__snapshot_lock = Lock()
+        self.__snapshot_generation = 0
+        self.__changed_devices = set()
+        self.__devices_versions = {}
+        self.__deleted_versions = {}
 
         # events
         self.gpios_gpio_off = self._get_event("gpios.gpio.off")
@@ -372,290 +617,1027 @@ class Gpios(CleepModule):
         GPIO_setmode(GPIO_BOARD)
         GPIO_setwarnings(False)
 
-    def get_module_devices(self):
-        config_devices = super().get_module_devices()
-
-        # update volatile gpios "on" state (gpios with keep to False will
-        # not have current state propagated otherwise)
-        for device_uuid, config_device in config_devices.items():
-            device_on = config_device.get("on", False)
-            config_device["on"] = self.gpios_on_states.get(device_uuid, device_on)
-
-        return config_devices
+        # board doesn't change at runtime
+        self._board_profile = self._build_board_profile()
+        self._invalidate_pins_usage()
 
-    def _on_start(self):
-        """
-        Start application
+    def _get_edge_scanner(self):
         """
-        # configure gpios
-        devices = self.get_module_devices()
-        for uuid in devices:
-            self._configure_gpio(devices[uuid])
+        Return edge scanner using first edge events source available on system
 
-    def _on_stop(self):
-        """
-        Stop application
+        Returns:
+            GpioEdgeScanner: edge scanner or None if edge events are not available
         """
-        # stop input watchers
-        for uuid in self._input_watchers:
-            self._input_watchers[uuid].stop()
+        for source in (GpioChardevEdgeSource(), GpioSysfsEdgeSource()):
+            if source.is_available():
+                self.logger.debug("Use %s edge events source", type(source).__name__)
+                return GpioEdgeScanner(source)
 
-        # cleanup gpios
-        GPIO_cleanup()
+        self.logger.info("Edge events are not available, inputs will be polled")
+        return None
 
-    def _gpio_setup(self, pin, mode, pull_mode=None):
+    def _get_async_engine(self):
         """
-        Gpio setup
+        Return asyncio engine, inputs use edge events if gpio character device is available
 
-        Args:
-            pin (number): Pin number
-            mode (number): Pin mode (GPIO_IN|GPIO_OUT)
-            pull_mode (number): Pin pull mode, for input only (GPIO_PUD_UP|GPIO_PUD_DOWN)
+        Returns:
+            GpioAsyncEngine: asyncio engine
         """
-        if mode == GPIO_IN and pull_mode:
-            GPIO_setup(pin, mode, pull_up_down=pull_mode)
-        elif mode == GPIO_IN and not pull_mode:
-            GPIO_setup(pin, mode)
-        elif mode == GPIO_OUT:
-            GPIO_setup(pin, mode)
+        source = GpioChardevEdgeSource()
+        return GpioAsyncEngine(self, source if source.is_available() else None)
 
-    def _gpio_output(self, pin, level):
-        """
-        Set gpio output level
+    # devices helpers are overridden to keep devices index and pins usage up to date
 
-        Args:
-            pin (int): pin number
-            level (int): RPi.GPIO.LOW or RPi.GPIO.HIGH
-        """
-        GPIO_output(pin, level)
+    def _add_device(self, data):
+        with self.__devices_lock:
+            device = super()._add_device(data)
+        if device is not None:
+            self.__set_device_changed(device["uuid"])
+            self._devices_index.add(device)
+            self._update_pins_usage([device["gpio"]])
+        return device
 
-    def __launch_input_watcher(self, device):
+    def _add_devices(self, datas):
         """
-        Launch input watcher for specified device
+        Add devices at once (single config write)
 
         Args:
-            device (dict): device data
+            datas (list): list of devices data
+
+        Returns:
+            list: added devices (with uuid) or None if devices cannot be saved
         """
-        self.logger.debug(
-            'Launch input watcher for device "%s" (inverted=%s)'
-            % (device["uuid"], device["inverted"])
-        )
-        level = GPIO_HIGH if device.get("inverted", False) else GPIO_LOW
-        watcher = GpioInputWatcher(
-            device["pin"],
-            device["uuid"],
-            self.__input_on_callback,
-            self.__input_off_callback,
-            level,
-        )
-        self._input_watchers[device["uuid"]] = watcher
-        watcher.start()
+        with self.__devices_lock:
+            devices = self._get_config().get("devices", {})
+            for data in datas:
+                data["uuid"] = str(uuid4())
+                devices[data["uuid"]] = data
+            if not self._update_config({"devices": devices}):
+                return None
 
-    def _configure_gpio(self, device):
+        for data in datas:
+            self.__set_device_changed(data["uuid"])
+            self._devices_index.add(data)
+        self._update_pins_usage([data["gpio"] for data in datas])
+        return datas
+
+    def _update_device(self, device_uuid, data):
+        with self.__devices_lock:
+            updated = super()._update_device(device_uuid, data)
+        if updated:
+            self.__devices_updated({device_uuid: data})
+        return updated
+
+    def _update_devices(self, datas):
         """
-        Configure GPIO (internal use)
+        Update devices at once (single config write)
 
         Args:
-            device (dict): device object
+            datas (dict): devices data indexed by device uuid
 
         Returns:
-            bool: True if gpio is configured False otherwise
-        """
-        self.logger.debug("Configure gpio for device %s" % (device))
+            bool: True if devices are updated, False if a device does not exist or devices cannot be saved
+        """
+        with self.__devices_lock:
+            devices = self._get_config().get("devices", {})
+            if any(device_uuid not in devices for device_uuid in datas):
+                return False
+            for device_uuid, data in datas.items():
+                devices[device_uuid] = data
+            if not self._update_config({"devices": devices}):
+                return False
+
+        self.__devices_updated(datas)
+        return True
 
-        # check if gpio is not reserved
-        if device["mode"] == self.MODE_RESERVED:
-            self.logger.debug("Reserved gpio cannot be configured")
-            return True
+    def __devices_updated(self, datas):
+        """
+        Update devices index and pins usage after devices update
 
-        try:
-            # get gpio pin
-            if device["mode"] == self.MODE_OUTPUT:
-                self.logger.debug(
-                    "Configure gpio %s pin %d as OUTPUT with on=%s",
-                    device["gpio"],
-                    device["pin"],
-                    device["on"],
-                )
+        Args:
+            datas (dict): updated devices data indexed by device uuid
+        """
+        gpios = []
+        for device_uuid, data in datas.items():
+            self.__set_device_changed(device_uuid)
+            previous = self._devices_index.get_values(device_uuid)
+            self._devices_index.add(dict(data, uuid=device_uuid))
+            if previous is None or (previous["gpio"], previous["owner"]) != (
+                data.get("gpio"),
+                data.get("owner"),
+            ):
+                gpios += [data.get("gpio")] + ([previous["gpio"]] if previous else [])
+        if gpios:
+            self._update_pins_usage(gpios)
+
+    def _delete_device(self, device_uuid):
+        with self.__devices_lock:
+            deleted = super()._delete_device(device_uuid)
+        if deleted:
+            self.__devices_deleted([device_uuid])
+        return deleted
+
+    def _delete_devices(self, device_uuids):
+        """
+        Delete devices at once (single config write)
 
-                if device["on"]:
-                    self._gpio_setup(device["pin"], GPIO_OUT)
-                    self.turn_on(device["uuid"])
+        Args:
+            device_uuids (list): devices uuids
 
-                    # and broadcast gpio status at startup
-                    self.logger.debug(
-                        "Broadcast event %s for gpio %s",
-                        "gpios.gpio.on",
-                        device["gpio"],
-                    )
-                    self.gpios_gpio_on.send(
-                        params={"gpio": device["gpio"], "init": True, "on": True},
-                        device_id=device["uuid"],
-                    )
+        Returns:
+            bool: True if devices are deleted, False if a device does not exist or devices cannot be saved
+        """
+        with self.__devices_lock:
+            devices = self._get_config().get("devices", {})
+            if any(device_uuid not in devices for device_uuid in device_uuids):
+                return False
+            for device_uuid in device_uuids:
+                devices.pop(device_uuid)
+            if not self._update_config({"devices": devices}):
+                return False
+
+        self.__devices_deleted(device_uuids)
+        return True
 
-                else:
-                    self._gpio_setup(device["pin"], GPIO_OUT)
-                    self.turn_off(device["uuid"])
+    def __devices_deleted(self, device_uuids):
+        """
+        Drop states and update devices index and pins usage after devices deletion
 
-                    # and broadcast gpio status at startup
-                    self.logger.debug(
-                        "Broadcast event %s for gpio %s",
-                        "gpios.gpio.off",
-                        device["gpio"],
-                    )
-                    self.gpios_gpio_off.send(
-                        params={
-                            "gpio": device["gpio"],
-                            "init": True,
-                            "duration": 0,
-                            "on": False,
-                        },
-                        device_id=device["uuid"],
-                    )
+        Args:
+            device_uuids (list): deleted devices uuids
+        """
+        gpios = []
+        for device_uuid in device_uuids:
+            self.__set_device_changed(device_uuid)
+            self.__cancel_auto_off(device_uuid)
+            self._state_writer.discard(device_uuid)
+            self._duty_writer.discard(device_uuid)
+            self.__duties.pop(device_uuid, None)
+            self.gpios_on_states.forget(device_uuid)
+            previous = self._devices_index.get_values(device_uuid)
+            self._devices_index.remove(device_uuid)
+            if previous:
+                gpios.append(previous["gpio"])
+        if gpios:
+            self._update_pins_usage(gpios)
+
+    def _write_devices_states(self, states):
+        """
+        Write devices states at once, to states journal if enabled or to config
 
-            elif device["mode"] == self.MODE_INPUT:
-                # always PUD_UP: https://sourceforge.net/p/raspberry-gpio-python/wiki/Inputs/
-                self._gpio_setup(device["pin"], GPIO_IN, pull_mode=GPIO_PUD_UP)
+        Args:
+            states (dict): devices states ({device_uuid: on})
 
-                # and launch input watcher
-                self.__launch_input_watcher(device)
+        Returns:
+            bool: True if states are written
+        """
+        with self.__devices_lock:
+            if not self._state_journal.is_opened():
+                return self.__write_config_states(states)
 
+            if not self._state_journal.append(states):
+                return False
+            if self._state_journal.needs_compaction():
+                # states are safe in journal even if compaction fails
+                self._compact_state_journal()
             return True
 
-        except Exception:
-            self.logger.exception("Exception during GPIO configuration:")
-            return False
-
-    def _reconfigure_gpio(self, device):
+    def __write_config_states(self, states):
         """
-        Reconfigure specified gpio. A reconfiguration consists of stopping watcher and launch it again with new parameters
+        Write devices states to config at once
 
         Args:
-            device (dict): device data
+            states (dict): devices states ({device_uuid: on})
 
         Returns:
-            True if gpio reconfigured successfully, False otherwise
+            bool: True if states are written
         """
-        # stop watcher
-        deconfigured = self._deconfigure_gpio(device)
-        if not deconfigured:
-            return False
-
-        # launch new watcher
-        self.__launch_input_watcher(device)
-        return True
+        with self.__devices_lock:
+            devices = self._get_config().get("devices", {})
+            for device_uuid, on in states.items():
+                if device_uuid in devices:
+                    devices[device_uuid]["on"] = on
+            return self._update_config({"devices": devices})
 
-    def _deconfigure_gpio(self, device):
+    def _write_devices_duties(self, duties):
         """
-        Deconfigure device stopping its watcher
+        Write pwm outputs duty cycles to config at once
 
         Args:
-            device (dict): device data
+            duties (dict): duty cycles ({device_uuid: percent})
 
         Returns:
-            True if gpio deconfigured successfully, False otherwise
+            bool: True if duty cycles are written
         """
-        if device["mode"] == self.MODE_OUTPUT:
-            # nothing to deconfigure for output
-            return True
+        with self.__devices_lock:
+            devices = self._get_config().get("devices", {})
+            for device_uuid, duty in duties.items():
+                if device_uuid in devices:
+                    devices[device_uuid]["duty"] = duty
+            return self._update_config({"devices": devices})
 
-        # get watcher
-        if device["uuid"] not in self._input_watchers:
-            self.logger.debug('No gpio watcher found for device "%s"' % device)
-            return False
+    def _compact_state_journal(self):
+        """
+        Write states journal to config and truncate journal
 
-        # stop and launch again watcher
-        self._input_watchers[device["uuid"]].stop()
-        del self._input_watchers[device["uuid"]]
+        Returns:
+            bool: True if journal is compacted
+        """
+        with self.__devices_lock:
+            states = self._state_journal.read()
+            if not states:
+                return True
 
-        return True
+            self.logger.debug("Compact %d journal states", len(states))
+            if not self.__write_config_states(states):
+                self.logger.error("Unable to write journal states to config")
+                return False
+            return self._state_journal.truncate()
 
-    def __input_on_callback(self, device_uuid):
+    def _maintain_state_journal(self):
         """
-        Callback when input is turned on (internal use)
+        Compact states journal if its records are too old, so journal is compacted periodically even
+        when states stop changing
+        """
+        with self.__devices_lock:
+            if (
+                self._state_journal.is_opened()
+                and self._state_journal.needs_compaction()
+            ):
+                self._compact_state_journal()
 
-        Args:
-            device_uuid (string): device uuid
+    def __close_state_journal(self):
         """
-        self.logger.debug("on_callback for gpio %s triggered" % device_uuid)
-        device = self._get_device(device_uuid)
-        if device is None:
-            raise Exception('Device "%s" not found' % device_uuid)
+        Compact and close states journal, states are written to config afterwards
+        """
+        with self.__devices_lock:
+            self._compact_state_journal()
+            self._state_journal.close()
 
-        # save current state
-        device["on"] = True
-        if device.get("keep", False):
-            self._update_device(device_uuid, device)
-        else:
-            self.gpios_on_states[device_uuid] = device["on"]
+    def _search_device(self, key, value):
+        if not self._devices_index.is_indexed(key):
+            return super()._search_device(key, value)
 
-        # broadcast event
-        self.gpios_gpio_on.send(
-            params={"gpio": device["gpio"], "init": False, "on": True},
-            device_id=device_uuid,
-        )
+        for device_uuid in self._devices_index.get(key, value):
+            device = self._get_device(device_uuid)
+            if device is not None:
+                return device
+        return None
 
-    def __input_off_callback(self, device_uuid, duration):
+    def _search_devices(self, key, value):
+        if not self._devices_index.is_indexed(key):
+            return super()._search_devices(key, value)
+
+        devices = [
+            self._get_device(device_uuid)
+            for device_uuid in self._devices_index.get(key, value)
+        ]
+        return [device for device in devices if device is not None]
+
+    def __sync_device_state(self, device):
         """
-        Callback when input is turned off
+        Copy volatile state and duty cycle into device data before it is saved, so values persisted
+        in background are not overwritten with stale config values. Only state of device with keep
+        flag is persisted, timed on state (pending auto off) is not.
 
         Args:
-            device_uuid (string): device uuid
-            duration (float): trigger duration
+            device (dict): device data
         """
-        self.logger.debug("off_callback for gpio %s triggered" % device_uuid)
-        device = self._get_device(device_uuid)
-        if device is None:
-            raise Exception('Device "%s" not found' % device_uuid)
+        if device["uuid"] in self.__duties:
+            device["duty"] = self.__duties[device["uuid"]]
+        if (
+            device["keep"]
+            and device["uuid"] in self.gpios_on_states
+            and device["uuid"] not in self.__auto_offs
+        ):
+            device["on"] = self.gpios_on_states[device["uuid"]]
 
-        # save current state
-        device["on"] = False
-        if device["keep"]:
-            self._update_device(device_uuid, device)
-        else:
-            self.gpios_on_states[device_uuid] = device["on"]
+    def __set_device_changed(self, device_uuid):
+        """
+        Flag device as changed, its snapshot will be built again on next get_module_devices call
 
-        # broadcast event
-        self.gpios_gpio_off.send(
-            params={
-                "gpio": device["gpio"],
-                "init": False,
-                "duration": duration,
-                "on": False,
-            },
-            device_id=device_uuid,
-        )
+        Args:
+            device_uuid (str): device uuid
+        """
+        with self.__snapshot_lock:
+            self.__changed_devices.add(device_uuid)
 
-    def _get_revision(self):
+    def __freeze_device(self, device):
         """
-        Return raspberry pi revision
+        Return read-only copy of device with its current state
+
+        Args:
+            device (dict): config device
 
         Returns:
-            int: raspberry pi revision number
+            FrozenDict: device
         """
-        return GPIO_RPI_INFO["P1_REVISION"]
+        # update volatile gpios "on" state (gpios with keep to False will
+        # not have current state propagated otherwise)
+        device_on = device.get("on", False)
+        # and current duty cycle not persisted yet
+        volatiles = {"on": self.gpios_on_states.get(device["uuid"], device_on)}
+        if device["uuid"] in self.__duties:
+            volatiles["duty"] = self.__duties[device["uuid"]]
+        return FrozenDict(device, **volatiles)
 
-    def get_module_config(self):
+    def get_module_devices(self):
         """
-        Return module full config
+        Return module devices with their current state
 
         Returns:
-            gpios configuration::
-
-                {
-                    revision (int): revision number (1|2|3)
-                    pinsnumber (int): number of board pins
-                }
-
+            GpioDevicesSnapshot: read-only devices indexed by uuid, stamped with devices version. Same
+                                 snapshot is returned until a device or a device state changes
         """
-        config = {}
+        with self.__snapshot_lock:
+            generation, states = self.gpios_on_states.get_states(
+                self.__snapshot_generation
+            )
+            changed = self.__changed_devices.union(states.keys())
+            if self._devices_snapshot is not None and not changed:
+                return self._devices_snapshot
+
+            # empty snapshot is falsy, check it against None to keep version increasing
+            version = (
+                self._devices_snapshot.version
+                if self._devices_snapshot is not None
+                else 0
+            ) + 1
+            self.__changed_devices = set()
+            self.__snapshot_generation = generation
+
+            if self._devices_snapshot is None:
+                # full build
+                devices = {
+                    device_uuid: self.__freeze_device(dict(device, uuid=device_uuid))
+                    for device_uuid, device in super().get_module_devices().items()
+                }
+                changed = set(devices.keys()).union(self.__devices_versions.keys())
+            else:
+                # only changed devices are built again
+                devices = dict(self._devices_snapshot)
+                for device_uuid in changed:
+                    device = self._get_device(device_uuid)
+                    if device is None:
+                        devices.pop(device_uuid, None)
+                    else:
+                        devices[device_uuid] = self.__freeze_device(device)
 
-        config["revision"] = self._get_revision()
-        config["pinsnumber"] = self.get_pins_number()
+            for device_uuid in changed:
+                if device_uuid in devices:
+                    self.__devices_versions[device_uuid] = version
+                    self.__deleted_versions.pop(device_uuid, None)
+                elif self.__devices_versions.pop(device_uuid, None) is not None:
+                    self.__deleted_versions[device_uuid] = version
 
-        return config
+            self._devices_snapshot = GpioDevicesSnapshot(devices, version)
+            return self._devices_snapshot
 
-    def get_pins_usage(self):
+    def get_module_devices_since(self, version):
+        """
+        Return devices changed since specified version
+
+        Args:
+            version (int): devices version returned by previous call (0 to get all devices)
+
+        Returns:
+            dict: changed devices::
+
+                {
+                    version (int): current devices version
+                    devices (dict): devices added or updated since version, indexed by uuid
+                    deleted (list): uuids of devices deleted since version
+                }
+
+        Raises:
+            InvalidParameter: Invalid command parameter
+        """
+        self._check_parameters(
+            [
+                {
+                    "name": "version",
+                    "value": version,
+                    "type": int,
+                    "validator": lambda val: val >= 0,
+                },
+            ]
+        )
+
+        snapshot = self.get_module_devices()
+        if version > snapshot.version:
+            # version from previous application run
+            version = 0
+
+        with self.__snapshot_lock:
+            changed = [
+                device_uuid
+                for device_uuid, device_version in self.__devices_versions.items()
+                if device_version > version
+            ]
+            deleted = [
+                device_uuid
+                for device_uuid, device_version in self.__deleted_versions.items()
+                if device_version > version
+            ]
+
+        return {
+            "version": snapshot.version,
+            "devices": {
+                device_uuid: snapshot[device_uuid]
+                for device_uuid in changed
+                if device_uuid in snapshot
+            },
+            "deleted": deleted,
+        }
+
+    def _invalidate_devices_snapshot(self):
+        """
+        Drop devices snapshot, it will be fully built again on next call (versions keep increasing)
+        """
+        with self.__snapshot_lock:
+            if self._devices_snapshot is not None:
+                self._devices_snapshot = GpioDevicesSnapshot(
+                    {}, self._devices_snapshot.version
+                )
+                self.__changed_devices.update(self.__devices_versions.keys())
+
+    def _on_start(self):
+        """
+        Start application
+        """
+        # inputs callbacks are executed by dispatcher thread, not by sampling threads
+        self._event_dispatcher.set_depth(
+            self._get_config().get("dispatch_queue_depth", GpioEventDispatcher.DEPTH)
+        )
+        self._event_dispatcher.start()
+
+        # replay states journal left by previous run, append new states to it if enabled
+        config = self._get_config()
+        self._compact_state_journal()
+        if config.get("state_journal", False):
+            self._state_journal.open()
+
+        # keep states and duty cycles are persisted in background
+        for writer in (self._state_writer, self._duty_writer):
+            writer.configure(
+                interval=config.get(
+                    "state_write_interval_ms",
+                    self.DEFAULT_CONFIG["state_write_interval_ms"],
+                )
+                / 1000.0,
+                max_staleness=config.get(
+                    "state_max_staleness_ms",
+                    self.DEFAULT_CONFIG["state_max_staleness_ms"],
+                )
+                / 1000.0,
+            )
+            writer.start()
+
+        # timed outputs (pulses) are turned off by scheduler thread
+        self._timer_scheduler.start()
+
+        # all pwm outputs are driven by pwm engine thread
+        self._pwm_engine.start()
+
+        # index devices for fast searches
+        self._devices_index.rebuild(super().get_module_devices())
+        self._invalidate_pins_usage()
+        self._invalidate_devices_snapshot()
+
+        # map gpio memory to write outputs (and read inputs) at once if available
+        memory = self._gpio_memory.open()
+
+        if self._get_config().get("input_engine") == self.INPUT_ENGINE_ASYNCIO:
+            # run all inputs within asyncio engine
+            self._async_engine = self._get_async_engine()
+            self._async_engine.start()
+        else:
+            # start input scanners (read all inputs at once through gpio memory if available)
+            if memory:
+                self._input_scanner.memory = self._gpio_memory
+            self._input_scanner.start()
+            self._edge_scanner = self._get_edge_scanner()
+            if self._edge_scanner:
+                self._edge_scanner.start()
+
+        # configure gpios
+        devices = self.get_module_devices()
+        for uuid in devices:
+            self._configure_gpio(devices[uuid])
+
+    def _on_stop(self):
+        """
+        Stop application
+        """
+        # stop input watchers
+        self._stop_input_threads()
+        self._input_scanner.memory = None
+        self._gpio_memory.close()
+
+        # persist pending states and duty cycles
+        if not self._state_writer.flush():
+            self.logger.error("Unable to persist gpios states")
+        if not self._duty_writer.flush():
+            self.logger.error("Unable to persist pwm duty cycles")
+        if self._state_journal.is_opened():
+            self.__close_state_journal()
+
+        # cleanup gpios
+        GPIO_cleanup()
+
+    def _stop_input_threads(self):
+        """
+        Stop all input threads (and state and duty writers, timer scheduler, pwm engine) at once and wait
+        for them in parallel (within STOP_TIMEOUT)
+
+        Returns:
+            float: shutdown duration in seconds
+        """
+        started_at = time.monotonic()
+        threads = [
+            thread
+            for thread in [
+                self._input_scanner,
+                self._edge_scanner,
+                self._async_engine,
+                self._event_dispatcher,
+                self._state_writer,
+                self._duty_writer,
+                self._timer_scheduler,
+                self._pwm_engine,
+            ]
+            + list(self._input_watchers.values())
+            if thread
+        ]
+        for thread in threads:
+            thread.stop()
+
+        # all threads are stopping concurrently, so they share the same timeout
+        deadline = started_at + self.STOP_TIMEOUT
+        for thread in threads:
+            if thread.is_alive():
+                thread.join(max(0, deadline - time.monotonic()))
+
+        duration = time.monotonic() - started_at
+        alives = [thread for thread in threads if thread.is_alive()]
+        if alives:
+            self.logger.warning(
+                "%d input threads still running after %.1f ms",
+                len(alives),
+                duration * 1000,
+            )
+        else:
+            self.logger.info(
+                "%d input threads stopped in %.1f ms", len(threads), duration * 1000
+            )
+
+        return duration
+
+    def _gpio_setup(self, pin, mode, pull_mode=None):
+        """
+        Gpio setup
+
+        Args:
+            pin (number): Pin number
+            mode (number): Pin mode (GPIO_IN|GPIO_OUT)
+            pull_mode (number): Pin pull mode, for input only (GPIO_PUD_UP|GPIO_PUD_DOWN)
+        """
+        if mode == GPIO_IN and pull_mode:
+            GPIO_setup(pin, mode, pull_up_down=pull_mode)
+        elif mode == GPIO_IN and not pull_mode:
+            GPIO_setup(pin, mode)
+        elif mode == GPIO_OUT:
+            GPIO_setup(pin, mode)
+
+    def _gpio_output(self, pin, level):
+        """
+        Set gpio output level
+
+        Args:
+            pin (int): pin number
+            level (int): RPi.GPIO.LOW or RPi.GPIO.HIGH
+        """
+        GPIO_output(pin, level)
+
+    def __pwm_output(self, pin, level):
+        """
+        Pwm engine output callback
+
+        Args:
+            pin (int): pin number
+            level (int): RPi.GPIO.LOW or RPi.GPIO.HIGH
+        """
+        self._gpio_output(pin, level)
+
+    def __is_pwm_output(self, device):
+        """
+        Return True if device is an output driven by pwm engine
+
+        Args:
+            device (dict): device data
+        """
+        return device["mode"] == self.MODE_OUTPUT and bool(device.get("pwm_hz"))
+
+    def __write_output(self, device, on):
+        """
+        Write output level, pwm output is driven by pwm engine while it is on
+
+        Args:
+            device (dict): device data
+            on (bool): output state
+        """
+        inverted = device.get("inverted", False)
+        if self.__is_pwm_output(device):
+            if on:
+                duty = self.__duties.get(device["uuid"], device["duty"])
+                self._pwm_engine.set_channel(
+                    device["pin"], device["pwm_hz"], duty, inverted
+                )
+                return
+            self._pwm_engine.remove_channel(device["pin"])
+        self._gpio_output(device["pin"], GPIO_HIGH if on != inverted else GPIO_LOW)
+
+    def __count_outputs_writes(self, writes, skipped_writes):
+        """
+        Update outputs writes counters
+
+        Args:
+            writes (int): number of outputs written
+            skipped_writes (int): number of outputs writes skipped because output was already in
+                                  requested state
+        """
+        with self.__outputs_stats_lock:
+            self.__outputs_stats["writes"] += writes
+            self.__outputs_stats["skipped_writes"] += skipped_writes
+
+    def _gpio_outputs(self, levels):
+        """
+        Set level of several gpio outputs. Outputs switch at the same instant when gpio memory is
+        mapped (set/clear registers), otherwise they are set back-to-back with RPi.GPIO.
+
+        Args:
+            levels (dict): levels (RPi.GPIO.LOW or RPi.GPIO.HIGH) indexed by pin number
+        """
+        lines = self._get_board_profile().lines
+        if all(pin in lines for pin in levels):
+            set_mask = 0
+            clear_mask = 0
+            for pin, level in levels.items():
+                if level == GPIO_HIGH:
+                    set_mask |= 1 << lines[pin]
+                else:
+                    clear_mask |= 1 << lines[pin]
+            if self._gpio_memory.write_levels(set_mask, clear_mask):
+                return
+
+        for pin, level in levels.items():
+            self._gpio_output(pin, level)
+
+    def __launch_input_watcher(self, device):
+        """
+        Launch input watcher for specified device. Watcher is not started but registered to asyncio engine
+        if enabled, otherwise to edge scanner if edge events are available for its gpio, otherwise to
+        input scanner that polls it
+
+        Args:
+            device (dict): device data
+        """
+        self.logger.debug(
+            'Launch input watcher for device "%s" (inverted=%s debounce_ms=%s poll_ms=%s poll_max_ms=%s)'
+            % (
+                device["uuid"],
+                device["inverted"],
+                device.get("debounce_ms"),
+                device.get("poll_ms"),
+                device.get("poll_max_ms"),
+            )
+        )
+        watcher = GpioInputWatcher(
+            device["pin"],
+            device["uuid"],
+            self._event_dispatcher.on,
+            self._event_dispatcher.off,
+            line=int(device["gpio"].replace("GPIO", "")),
+        )
+        watcher.configure(**self.__get_input_watcher_settings(device))
+        self._input_watchers[device["uuid"]] = watcher
+        if self._async_engine:
+            self._async_engine.register(watcher)
+        elif not self._edge_scanner or not self._edge_scanner.register(watcher):
+            self._input_scanner.register(watcher)
+
+    def __get_input_watcher_settings(self, device):
+        """
+        Return input watcher settings of specified device
+
+        Args:
+            device (dict): device data
+
+        Returns:
+            dict: input watcher settings (see GpioInputWatcher.configure)
+        """
+        return {
+            "level": GPIO_HIGH if device.get("inverted", False) else GPIO_LOW,
+            "debounce": device["debounce_ms"] / 1000.0
+            if device.get("debounce_ms") is not None
+            else GpioInputWatcher.DEBOUNCE,
+            "period": device["poll_ms"] / 1000.0
+            if device.get("poll_ms") is not None
+            else GpioInputWatcher.PERIOD,
+            "max_period": device["poll_max_ms"] / 1000.0
+            if device.get("poll_max_ms")
+            else 0,
+        }
+
+    def _configure_gpio(self, device):
+        """
+        Configure GPIO (internal use)
+
+        Args:
+            device (dict): device object
+
+        Returns:
+            bool: True if gpio is configured False otherwise
+        """
+        self.logger.debug("Configure gpio for device %s" % (device))
+
+        # check if gpio is not reserved
+        if device["mode"] == self.MODE_RESERVED:
+            self.logger.debug("Reserved gpio cannot be configured")
+            return True
+
+        try:
+            # get gpio pin
+            if device["mode"] == self.MODE_OUTPUT:
+                self.logger.debug(
+                    "Configure gpio %s pin %d as OUTPUT with on=%s",
+                    device["gpio"],
+                    device["pin"],
+                    device["on"],
+                )
+
+                if device["on"]:
+                    self._gpio_setup(device["pin"], GPIO_OUT)
+                    self.turn_on(device["uuid"], force=True)
+
+                    # and broadcast gpio status at startup
+                    self.logger.debug(
+                        "Broadcast event %s for gpio %s",
+                        "gpios.gpio.on",
+                        device["gpio"],
+                    )
+                    self.gpios_gpio_on.send(
+                        params={"gpio": device["gpio"], "init": True, "on": True},
+                        device_id=device["uuid"],
+                    )
+
+                else:
+                    self._gpio_setup(device["pin"], GPIO_OUT)
+                    self.turn_off(device["uuid"], force=True)
+
+                    # and broadcast gpio status at startup
+                    self.logger.debug(
+                        "Broadcast event %s for gpio %s",
+                        "gpios.gpio.off",
+                        device["gpio"],
+                    )
+                    self.gpios_gpio_off.send(
+                        params={
+                            "gpio": device["gpio"],
+                            "init": True,
+                            "duration": 0,
+                            "on": False,
+                        },
+                        device_id=device["uuid"],
+                    )
+
+            elif device["mode"] == self.MODE_INPUT:
+                # always PUD_UP: https://sourceforge.net/p/raspberry-gpio-python/wiki/Inputs/
+                self._gpio_setup(device["pin"], GPIO_IN, pull_mode=GPIO_PUD_UP)
+
+                # and launch input watcher
+                self.__launch_input_watcher(device)
+
+            return True
+
+        except Exception:
+            self.logger.exception("Exception during GPIO configuration:")
+            return False
+
+    def _reconfigure_gpio(self, device):
+        """
+        Reconfigure specified gpio. Running input watcher takes new parameters in place, so its level
+        and timing are kept and no initial value is sent again. Output is written again at its current
+        state so it takes new polarity.
+
+        Args:
+            device (dict): device data
+
+        Returns:
+            True if gpio reconfigured successfully, False otherwise
+        """
+        if device["mode"] == self.MODE_OUTPUT:
+            # output takes new polarity, nothing else to reconfigure for output
+            with self._device_locks.get(device["uuid"]):
+                self.__write_output(
+                    device, self.gpios_on_states.get(device["uuid"], device["on"])
+                )
+            return True
+
+        watcher = self._input_watchers.get(device["uuid"])
+        if watcher is None:
+            self.logger.debug('No gpio watcher found for device "%s"' % device)
+            return False
+
+        watcher.configure(**self.__get_input_watcher_settings(device))
+
+        # new sampling parameters are applied immediately
+        self._input_scanner.reschedule(device["uuid"])
+        if self._edge_scanner:
+            self._edge_scanner.reschedule(device["uuid"])
+        if self._async_engine:
+            self._async_engine.reschedule(device["uuid"])
+
+        return True
+
+    def _deconfigure_gpio(self, device, wait=True):
+        """
+        Deconfigure device stopping its watcher
+
+        Args:
+            device (dict): device data
+            wait (bool): wait for watcher thread end (default True)
+
+        Returns:
+            True if gpio deconfigured successfully, False otherwise
+        """
+        if device["mode"] == self.MODE_OUTPUT:
+            # stop driving pwm output, nothing else to deconfigure for output
+            if self.__is_pwm_output(device):
+                self._pwm_engine.remove_channel(device["pin"])
+            return True
+
+        # get watcher
+        if device["uuid"] not in self._input_watchers:
+            self.logger.debug('No gpio watcher found for device "%s"' % device)
+            return False
+
+        # stop watcher first so no callback is triggered anymore, then unregister it from input scanners
+        watcher = self._input_watchers.pop(device["uuid"])
+        watcher.stop()
+        self._input_scanner.unregister(device["uuid"])
+        if self._edge_scanner:
+            self._edge_scanner.unregister(device["uuid"])
+        if self._async_engine:
+            self._async_engine.unregister(device["uuid"])
+        if wait and watcher.is_alive():
+            watcher.join(self.STOP_TIMEOUT)
+
+        return True
+
+    def _deconfigure_gpios(self, devices):
+        """
+        Deconfigure several devices, their watchers are stopped at once and waited in parallel
+        (within STOP_TIMEOUT)
+
+        Args:
+            devices (list): list of devices data
+        """
+        watchers = [
+            self._input_watchers[device["uuid"]]
+            for device in devices
+            if device["uuid"] in self._input_watchers
+        ]
+        for device in devices:
+            self._deconfigure_gpio(device, wait=False)
+
+        deadline = time.monotonic() + self.STOP_TIMEOUT
+        for watcher in watchers:
+            if watcher.is_alive():
+                watcher.join(max(0, deadline - time.monotonic()))
+
+    def __input_on_callback(self, device_uuid):
+        """
+        Callback when input is turned on (internal use)
+
+        Args:
+            device_uuid (string): device uuid
+        """
+        self.logger.debug("on_callback for gpio %s triggered" % device_uuid)
+        with self._device_locks.get(device_uuid):
+            device = self._get_device(device_uuid)
+            if device is None:
+                # device deleted while its input record was queued
+                self.logger.debug('Input device "%s" not found' % device_uuid)
+                return
+
+            # save current state (keep state is persisted in background)
+            device["on"] = True
+            self.gpios_on_states[device_uuid] = device["on"]
+            if device.get("keep", False):
+                self._state_writer.mark(device_uuid, device["on"])
+
+            # broadcast event
+            self.gpios_gpio_on.send(
+                params={"gpio": device["gpio"], "init": False, "on": True},
+                device_id=device_uuid,
+            )
+
+    def __input_off_callback(self, device_uuid, duration):
+        """
+        Callback when input is turned off
+
+        Args:
+            device_uuid (string): device uuid
+            duration (float): trigger duration
+        """
+        self.logger.debug("off_callback for gpio %s triggered" % device_uuid)
+        with self._device_locks.get(device_uuid):
+            device = self._get_device(device_uuid)
+            if device is None:
+                # device deleted while its input record was queued
+                self.logger.debug('Input device "%s" not found' % device_uuid)
+                return
+
+            # save current state (keep state is persisted in background)
+            device["on"] = False
+            self.gpios_on_states[device_uuid] = device["on"]
+            if device["keep"]:
+                self._state_writer.mark(device_uuid, device["on"])
+
+            # broadcast event
+            self.gpios_gpio_off.send(
+                params={
+                    "gpio": device["gpio"],
+                    "init": False,
+                    "duration": duration,
+                    "on": False,
+                },
+                device_id=device_uuid,
+            )
+
+    def _get_revision(self):
+        """
+        Return raspberry pi revision
+
+        Returns:
+            int: raspberry pi revision number
+        """
+        return GPIO_RPI_INFO["P1_REVISION"]
+
+    def _build_board_profile(self):
+        """
+        Build board profile according to raspberry pi revision
+
+        Returns:
+            GpioBoardProfile: board profile
+        """
+        rev = self._get_revision()
+
+        if rev == 1:
+            return GpioBoardProfile.build(rev, self.GPIOS_REV1, self.PINS_REV1, 26)
+        if rev == 2:
+            return GpioBoardProfile.build(rev, self.GPIOS_REV2, self.PINS_REV2, 26)
+        if rev == 3:
+            gpios = self.GPIOS_REV2.copy()
+            gpios.update(self.GPIOS_REV3)
+            return GpioBoardProfile.build(rev, gpios, self.PINS_REV3, 40)
+
+        return GpioBoardProfile.build(rev, {}, {}, 0)
+
+    def _get_board_profile(self):
+        """
+        Return board profile (built at application configuration)
+
+        Returns:
+            GpioBoardProfile: board profile
+        """
+        if self._board_profile is None:
+            self._board_profile = self._build_board_profile()
+        return self._board_profile
+
+    def get_module_config(self):
+        """
+        Return module full config
+
+        Returns:
+            gpios configuration::
+
+                {
+                    revision (int): revision number (1|2|3)
+                    pinsnumber (int): number of board pins
+                }
+
+        """
+        config = {}
+
+        profile = self._get_board_profile()
+        config["revision"] = profile.revision
+        config["pinsnumber"] = profile.pins_number
+
+        return config
+
+    def get_pins_usage(self):
         """
         Return pins usage
 
@@ -673,42 +1655,102 @@ class Gpios(CleepModule):
                     ...
                 }
 
+        Note:
+            Returned dict is read-only and is the same until pins usage changes (see get_pins_usage_version)
+        """
+        with self.__pins_usage_lock:
+            if self._pins_usage is None:
+                self._pins_usage = self.__build_pins_usage()
+                self._pins_usage_version += 1
+            return self._pins_usage
+
+    def get_pins_usage_version(self):
+        """
+        Return pins usage version. Version changes each time pins usage changes, so callers can keep
+        previous pins usage while version is the same.
+
+        Returns:
+            int: pins usage version
+        """
+        with self.__pins_usage_lock:
+            if self._pins_usage is None:
+                self._pins_usage = self.__build_pins_usage()
+                self._pins_usage_version += 1
+            return self._pins_usage_version
+
+    def __get_gpio_usage(self, gpio):
+        """
+        Return usage of specified gpio
+
+        Args:
+            gpio (str): gpio name
+
+        Returns:
+            FrozenDict: gpio usage (assigned and owner)
+        """
+        device_uuids = self._devices_index.get("gpio", gpio)
+        values = self._devices_index.get_values(device_uuids[0]) if device_uuids else None
+        return FrozenDict(
+            assigned=values is not None, owner=values["owner"] if values else None
+        )
+
+    def __build_pins_usage(self):
+        """
+        Build pins usage of all board pins
+
+        Returns:
+            FrozenDict: pins usage (see get_pins_usage)
+        """
+        profile = self._get_board_profile()
+        return FrozenDict(
+            (
+                pin_number,
+                FrozenDict(
+                    label=label,
+                    gpio=self.__get_gpio_usage(label)
+                    if label in profile.gpios
+                    else None,
+                ),
+            )
+            for pin_number, label in profile.pins.items()
+        )
+
+    def _update_pins_usage(self, gpios):
         """
-        output = {}
+        Update usage of specified gpios. Pins usage is copied on write, so already returned pins usage
+        is never modified, and its version is incremented only if usage really changed.
 
-        # get pins descriptions according to raspberry pi revision
-        all_pins = {}
-        rev = self._get_revision()
-        if rev == 1:
-            all_pins = self.PINS_REV1
-        elif rev == 2:
-            all_pins = self.PINS_REV2
-        elif rev == 3:
-            all_pins = self.PINS_REV3
-        self.logger.debug("all_pins %s" % all_pins)
-
-        # fill pins usage
-        all_gpios = self.get_raspi_gpios()
-        self.logger.debug("all_gpios %s" % all_gpios)
-        devices = self.get_module_devices()
-        for pin_number in all_pins:
-            # default pin data
-            output[pin_number] = {"label": all_pins[pin_number], "gpio": None}
+        Args:
+            gpios (list): list of gpio names
+        """
+        profile = self._get_board_profile()
+        with self.__pins_usage_lock:
+            if self._pins_usage is None:
+                # pins usage will be built on next call
+                return
 
-            # fill gpio data
-            if all_pins[pin_number] in all_gpios:
-                gpio_name = all_pins[pin_number]
-                assigned = False
-                owner = None
-                for uuid in devices:
-                    if devices[uuid]["gpio"] == gpio_name:
-                        assigned = True
-                        owner = devices[uuid]["owner"]
-                        break
+            pins_usage = None
+            for gpio in gpios:
+                pin_number = profile.gpios.get(gpio)
+                if pin_number is None or pin_number not in self._pins_usage:
+                    continue
+                usage = self.__get_gpio_usage(gpio)
+                if usage == self._pins_usage[pin_number]["gpio"]:
+                    continue
+                if pins_usage is None:
+                    pins_usage = dict(self._pins_usage)
+                pins_usage[pin_number] = FrozenDict(label=gpio, gpio=usage)
 
-                output[pin_number]["gpio"] = {"assigned": assigned, "owner": owner}
+            if pins_usage is not None:
+                self._pins_usage = FrozenDict(pins_usage)
+                self._pins_usage_version += 1
 
-        return output
+    def _invalidate_pins_usage(self):
+        """
+        Drop pins usage, it will be built again on next call
+        """
+        with self.__pins_usage_lock:
+            self._pins_usage = None
 
     def get_assigned_gpios(self):
         """
@@ -735,19 +1777,10 @@ class Gpios(CleepModule):
                     ...
                 }
 
+        Note:
+            Returned dict is read-only
         """
-        rev = self._get_revision()
-
-        if rev == 1:
-            return self.GPIOS_REV1
-        if rev == 2:
-            return self.GPIOS_REV2
-        if rev == 3:
-            gpios = self.GPIOS_REV2.copy()
-            gpios.update(self.GPIOS_REV3)
-            return gpios
-
-        return {}
+        return self._get_board_profile().gpios
 
     def get_pins_number(self):
         """
@@ -756,163 +1789,624 @@ class Gpios(CleepModule):
         Returns:
             int: pins number
         """
-        rev = self._get_revision()
+        return self._get_board_profile().pins_number
 
-        if rev in (1, 2):
-            return 26
-        if rev == 3:
-            return 40
+    def _get_input_settings_parameters(self, debounce_ms, poll_ms, poll_max_ms):
+        """
+        Return parameters to check input settings
 
-        return 0
+        Args:
+            debounce_ms (int): input debounce delay in milliseconds
+            poll_ms (int): input sampling period in milliseconds
+            poll_max_ms (int): input adaptive sampling period ceiling in milliseconds (0 to disable)
+
+        Returns:
+            list: list of parameters to check with _check_parameters
+        """
+        return [
+            {
+                "name": "debounce_ms",
+                "value": debounce_ms,
+                "type": int,
+                "none": True,
+                "validator": lambda val: 0 <= val <= self.DEBOUNCE_MS_MAX,
+                "message": "Debounce must be between 0 and %d ms"
+                % self.DEBOUNCE_MS_MAX,
+            },
+            {
+                "name": "poll_ms",
+                "value": poll_ms,
+                "type": int,
+                "none": True,
+                "validator": lambda val: self.POLL_MS_MIN <= val <= self.POLL_MS_MAX,
+                "message": "Sampling period must be between %d and %d ms"
+                % (self.POLL_MS_MIN, self.POLL_MS_MAX),
+            },
+            {
+                "name": "poll_max_ms",
+                "value": poll_max_ms,
+                "type": int,
+                "none": True,
+                "validator": lambda val: val == 0
+                or self.POLL_MS_MIN <= val <= self.POLL_MS_MAX,
+                "message": "Maximum sampling period must be 0 or between %d and %d ms"
+                % (self.POLL_MS_MIN, self.POLL_MS_MAX),
+            },
+        ]
 
     def reserve_gpio(self, name, gpio, usage, command_sender):
         """
-        Reserve a gpio used to configure raspberry pi (ie onewire, lirc...)
-        This action only flag this gpio as reserved to avoid using it again
+        Reserve a gpio used to configure raspberry pi (ie onewire, lirc...)
+        This action only flag this gpio as reserved to avoid using it again
+
+        Args:
+            name (str): name of gpio
+            gpio (str) : gpio value
+            usage (str) : describe gpio usage
+            command_sender (str): command request sender (used to set gpio in readonly mode)
+
+        Returns:
+            dict: Created gpio device::
+
+                {
+                    name (str): name of gpio
+                    mode (str): Gpio mode ("output"|"input")
+                    pin (number): Gpio pin number
+                    gpio (str): Gpio id (GPIOX)
+                    keep (bool): True if gpio value is stored in config and restored after reboot
+                    on (bool): True if gpio is on
+                    inverted (bool): Gpio has inverted state
+                    owner (str): Application that owns the gpio
+                    type (str): Always "gpio"
+                    subtype (str): Same value than mode
+                }
+
+        Raises:
+            CommandError: Command failed
+            MissingParameter: Missing command parameter
+            InvalidParameter: Invalid command parameter
+        """
+        # fix command_sender: rpcserver is the default gpio entry point
+        if command_sender == "rpcserver":
+            command_sender = "gpios"
+
+        # check values
+        if gpio:
+            found_gpio = self._search_device("gpio", gpio)
+            if found_gpio is not None and found_gpio["subtype"] != usage:
+                raise InvalidParameter(
+                    'Gpio "%s" is already reserved for "%s" usage'
+                    % (found_gpio["gpio"], found_gpio["subtype"])
+                )
+            if found_gpio is not None and found_gpio["subtype"] == usage:
+                return found_gpio
+        self._check_parameters(
+            [
+                {
+                    "name": "name",
+                    "value": name,
+                    "type": str,
+                    "validator": lambda val: self._search_device("name", val) is None,
+                    "message": 'Name "%s" is already used' % name,
+                },
+                {
+                    "name": "gpio",
+                    "value": gpio,
+                    "type": str,
+                    "validator": lambda val: val in self.get_raspi_gpios().keys(),
+                    "message": 'Gpio "%s" does not exist for this raspberry pi' % gpio,
+                },
+                {"name": "usage", "value": usage, "type": str},
+            ]
+        )
+
+        # gpio is valid, prepare new entry
+        data = {
+            "name": name,
+            "mode": self.MODE_RESERVED,
+            "pin": self.get_raspi_gpios()[gpio],
+            "gpio": gpio,
+            "keep": False,
+            "on": False,
+            "inverted": False,
+            "owner": command_sender,
+            "type": "gpio",
+            "subtype": usage,
+        }
+
+        # add device
+        self.logger.debug("data=%s" % data)
+        device = self._add_device(data)
+        if device is None:
+            raise CommandError("Unable to add device")
+
+        return device
+
+    def get_reserved_gpios(self, usage):
+        """
+        Return reserved gpios for specified usage
+
+        Args:
+            usage (str): gpio reserved usage
+
+        Returns:
+            list: list of reserved gpios (full data)::
+
+                [
+                    {
+                        gpio: "GPIO1",
+                        pin: 1,
+                        ...
+                    },
+                    ...
+                ]
+
+        """
+        if usage is None or len(usage) == 0:
+            raise MissingParameter('Parameter "usage" is missing')
+
+        gpios = self._search_devices("subtype", usage)
+        return [gpio for gpio in gpios if gpio["mode"] == self.MODE_RESERVED]
+
+    def is_reserved_gpio(self, gpio):
+        """
+        Return True if gpio is reserved
+
+        Args:
+            gpio (str): gpio
+
+        Returns:
+            bool: True if gpio is reserved, False otherwise
+        """
+        device = self._search_device("gpio", gpio)
+        if device is None:
+            return False
+
+        self.logger.debug("is_reserved_gpio: %s" % device)
+        if device["mode"] == self.MODE_RESERVED:
+            return True
+
+        return False
+
+    def _get_add_gpio_parameters(
+        self,
+        name,
+        gpio,
+        mode,
+        keep,
+        inverted,
+        debounce_ms,
+        poll_ms,
+        poll_max_ms,
+        pwm_hz,
+    ):
+        """
+        Return parameters to check for new gpio
+
+        Args:
+            name (str): name of gpio
+            gpio (str): selected gpio ("GPIOX")
+            mode (str): mode ("input"|"output")
+            keep (bool): keep state when restarting
+            inverted (bool): inverted flag
+            debounce_ms (int): input debounce delay in milliseconds
+            poll_ms (int): input sampling period in milliseconds
+            poll_max_ms (int): input adaptive sampling period ceiling in milliseconds
+            pwm_hz (int): output pwm frequency in Hz
+
+        Returns:
+            list: list of parameters for _check_parameters
+        """
+        return [
+            {
+                "name": "name",
+                "value": name,
+                "type": str,
+                "validator": lambda val: self._search_device("name", val) is None,
+                "message": 'Name "%s" is already used' % name,
+            },
+            {
+                "name": "gpio",
+                "value": gpio,
+                "type": str,
+                "validators": [
+                    {
+                        "validator": lambda val: val in self.get_raspi_gpios().keys(),
+                        "message": 'Gpio "%s" does not exist for this raspberry pi'
+                        % gpio,
+                    },
+                    {
+                        "validator": lambda val: self._search_device("gpio", gpio)
+                        is None,
+                        "message": 'Gpio "%s" is already used by other application'
+                        % gpio,
+                    },
+                ],
+            },
+            {
+                "name": "mode",
+                "value": mode,
+                "type": str,
+                "validator": lambda val: val in (self.MODE_INPUT, self.MODE_OUTPUT),
+            },
+            {"name": "keep", "value": keep, "type": bool},
+            {"name": "inverted", "value": inverted, "type": bool},
+            {
+                "name": "pwm_hz",
+                "value": pwm_hz,
+                "type": int,
+                "none": True,
+                "validators": [
+                    {
+                        "validator": lambda val: mode == self.MODE_OUTPUT,
+                        "message": "Pwm is only available for output gpio",
+                    },
+                    {
+                        "validator": lambda val: 1 <= val <= self.PWM_HZ_MAX,
+                        "message": "Pwm frequency must be between 1 and %d Hz"
+                        % self.PWM_HZ_MAX,
+                    },
+                ],
+            },
+        ] + self._get_input_settings_parameters(debounce_ms, poll_ms, poll_max_ms)
+
+    def _build_gpio_device(
+        self,
+        name,
+        gpio,
+        mode,
+        keep,
+        inverted,
+        command_sender,
+        debounce_ms,
+        poll_ms,
+        poll_max_ms,
+        pwm_hz,
+    ):
+        """
+        Return data of new gpio device (parameters must be checked before)
+
+        Args:
+            name (str): name of gpio
+            gpio (str): selected gpio ("GPIOX")
+            mode (str): mode ("input"|"output")
+            keep (bool): keep state when restarting
+            inverted (bool): inverted flag
+            command_sender (str): gpio owner
+            debounce_ms (int): input debounce delay in milliseconds
+            poll_ms (int): input sampling period in milliseconds
+            poll_max_ms (int): input adaptive sampling period ceiling in milliseconds
+            pwm_hz (int): output pwm frequency in Hz
+
+        Returns:
+            dict: gpio device data (without uuid)
+        """
+        return {
+            "name": name,
+            "mode": mode,
+            "pin": self.get_raspi_gpios()[gpio],
+            "gpio": gpio,
+            "keep": keep,
+            "on": False,
+            "inverted": inverted,
+            "owner": command_sender,
+            "type": "gpio",
+            "subtype": mode,
+            "debounce_ms": debounce_ms,
+            "poll_ms": poll_ms,
+            "poll_max_ms": poll_max_ms or None,
+            "pwm_hz": pwm_hz,
+            "duty": 100 if pwm_hz else None,
+        }
+
+    def add_gpio(
+        self,
+        name,
+        gpio,
+        mode,
+        keep,
+        inverted,
+        command_sender,
+        debounce_ms=None,
+        poll_ms=None,
+        poll_max_ms=None,
+        pwm_hz=None,
+    ):
+        """
+        Add new gpio
+
+        Args:
+            name (str): name of gpio
+            gpio (str): selected gpio ("GPIOX")
+            mode (str): mode ("input"|"output")
+            keep (bool): keep state when restarting
+            inverted (bool): if true a callback will be triggered on gpio high level instead of low level
+            command_sender (str): command request sender (optional)
+            debounce_ms (int): input debounce delay in milliseconds (optional, default 200ms)
+            poll_ms (int): input sampling period in milliseconds (optional, default 125ms)
+            poll_max_ms (int): enable input adaptive sampling, sampling period grows up to this value
+                               while input is idle (optional, disabled by default)
+            pwm_hz (int): drive output with software pwm at this frequency, duty cycle is set with
+                          set_duty command (optional, disabled by default)
+
+        Returns:
+            dict: created gpio device ::
+
+                {
+                    name (str): name of gpio
+                    mode (str): Gpio mode ("output"|"input")
+                    pin (number): Gpio pin number
+                    gpio (str): Gpio id (GPIOX)
+                    keep (bool): True if gpio value is stored in config and restored after reboot
+                    on (bool): True if gpio is on
+                    inverted (bool): Gpio has inverted state
+                    owner (str): Application that owns the gpio
+                    type (str): Always "gpio"
+                    subtype (str): Same value than mode
+                    debounce_ms (int): Input debounce delay (None for default)
+                    poll_ms (int): Input sampling period (None for default)
+                    poll_max_ms (int): Input adaptive sampling period ceiling (None if disabled)
+                    pwm_hz (int): Output pwm frequency (None if disabled)
+                    duty (int): Output pwm duty cycle in percent (None if disabled)
+                }
+
+        Raises:
+            CommandError: Command failed
+            MissingParameter: Missing command parameter
+            InvalidParameter: Invalid command parameter specified
+        """
+        # fix command_sender: rpcserver is the default gpio entry point
+        if command_sender == "rpcserver":
+            command_sender = "gpios"
+
+        # check values
+        self._check_parameters(
+            self._get_add_gpio_parameters(
+                name,
+                gpio,
+                mode,
+                keep,
+                inverted,
+                debounce_ms,
+                poll_ms,
+                poll_max_ms,
+                pwm_hz,
+            )
+        )
+
+        # gpio is valid, prepare new entry
+        data = self._build_gpio_device(
+            name,
+            gpio,
+            mode,
+            keep,
+            inverted,
+            command_sender,
+            debounce_ms,
+            poll_ms,
+            poll_max_ms,
+            pwm_hz,
+        )
+
+        # add device
+        device = self._add_device(data)
+        if device is None:
+            raise CommandError("Unable to add device")
+
+        # configure it
+        self._configure_gpio(device)
+
+        return device
+
+    def add_gpios(self, gpios, command_sender):
+        """
+        Add several gpios at once. Whole batch is checked before any gpio is added, so no gpio is
+        added if one of them is invalid.
 
         Args:
-            name (str): name of gpio
-            gpio (str) : gpio value
-            usage (str) : describe gpio usage
-            command_sender (str): command request sender (used to set gpio in readonly mode)
+            gpios (list): list of gpios to add::
 
-        Returns:
-            dict: Created gpio device::
+                [
+                    {
+                        name (str): name of gpio
+                        gpio (str): selected gpio ("GPIOX")
+                        mode (str): mode ("input"|"output")
+                        keep (bool): keep state when restarting
+                        inverted (bool): inverted flag
+                        debounce_ms (int): input debounce delay in milliseconds (optional)
+                        poll_ms (int): input sampling period in milliseconds (optional)
+                        poll_max_ms (int): input adaptive sampling period ceiling (optional)
+                        pwm_hz (int): output pwm frequency in Hz (optional)
+                    },
+                    ...
+                ]
 
-                {
-                    name (str): name of gpio
-                    mode (str): Gpio mode ("output"|"input")
-                    pin (number): Gpio pin number
-                    gpio (str): Gpio id (GPIOX)
-                    keep (bool): True if gpio value is stored in config and restored after reboot
-                    on (bool): True if gpio is on
-                    inverted (bool): Gpio has inverted state
-                    owner (str): Application that owns the gpio
-                    type (str): Always "gpio"
-                    subtype (str): Same value than mode
-                }
+            command_sender (str): command request sender (optional)
+
+        Returns:
+            list: created gpio devices (see add_gpio), in same order than specified gpios
 
         Raises:
             CommandError: Command failed
             MissingParameter: Missing command parameter
-            InvalidParameter: Invalid command parameter
+            InvalidParameter: Invalid command parameter specified
         """
         # fix command_sender: rpcserver is the default gpio entry point
         if command_sender == "rpcserver":
             command_sender = "gpios"
 
         # check values
-        if gpio:
-            found_gpio = self._search_device("gpio", gpio)
-            if found_gpio is not None and found_gpio["subtype"] != usage:
-                raise InvalidParameter(
-                    'Gpio "%s" is already reserved for "%s" usage'
-                    % (found_gpio["gpio"], found_gpio["subtype"])
-                )
-            if found_gpio is not None and found_gpio["subtype"] == usage:
-                return found_gpio
         self._check_parameters(
             [
                 {
-                    "name": "name",
-                    "value": name,
-                    "type": str,
-                    "validator": lambda val: self._search_device("name", val) is None,
-                    "message": 'Name "%s" is already used' % name,
-                },
-                {
-                    "name": "gpio",
-                    "value": gpio,
-                    "type": str,
-                    "validator": lambda val: val in self.get_raspi_gpios().keys(),
-                    "message": 'Gpio "%s" does not exist for this raspberry pi' % gpio,
+                    "name": "gpios",
+                    "value": gpios,
+                    "type": list,
+                    "validator": lambda val: len(val) > 0
+                    and all(isinstance(params, dict) for params in val),
+                    "message": "Gpios must be a non empty list of gpios",
                 },
-                {"name": "usage", "value": usage, "type": str},
             ]
         )
+        datas = []
+        names = set()
+        used_gpios = set()
+        for params in gpios:
+            unknown = set(params.keys()).difference(self.ADD_GPIO_KEYS)
+            if unknown:
+                raise InvalidParameter(
+                    'Unknown gpio parameters "%s"' % '", "'.join(sorted(unknown))
+                )
+            params = {key: params.get(key) for key in self.ADD_GPIO_KEYS}
+            self._check_parameters(self._get_add_gpio_parameters(**params))
 
-        # gpio is valid, prepare new entry
-        data = {
-            "name": name,
-            "mode": self.MODE_RESERVED,
-            "pin": self.get_raspi_gpios()[gpio],
-            "gpio": gpio,
-            "keep": False,
-            "on": False,
-            "inverted": False,
-            "owner": command_sender,
-            "type": "gpio",
-            "subtype": usage,
-        }
+            # check conflicts within batch
+            if params["name"] in names:
+                raise InvalidParameter('Name "%s" is already used' % params["name"])
+            if params["gpio"] in used_gpios:
+                raise InvalidParameter(
+                    'Gpio "%s" is specified several times' % params["gpio"]
+                )
+            names.add(params["name"])
+            used_gpios.add(params["gpio"])
 
-        # add device
-        self.logger.debug("data=%s" % data)
-        device = self._add_device(data)
-        if device is None:
-            raise CommandError("Unable to add device")
+            datas.append(
+                self._build_gpio_device(command_sender=command_sender, **params)
+            )
 
-        return device
+        # add devices
+        devices = self._add_devices(datas)
+        if devices is None:
+            raise CommandError("Unable to add devices")
 
-    def get_reserved_gpios(self, usage):
+        # configure them
+        for device in devices:
+            self._configure_gpio(device)
+
+        return devices
+
+    def delete_gpio(self, device_uuid, command_sender):
         """
-        Return reserved gpios for specified usage
+        Delete gpio
 
         Args:
-            usage (str): gpio reserved usage
+            device_uuid (str): device identifier
+            command_sender (str): command sender
 
         Returns:
-            list: list of reserved gpios (full data)::
-
-                [
-                    {
-                        gpio: "GPIO1",
-                        pin: 1,
-                        ...
-                    },
-                    ...
-                ]
+            bool: True if device was deleted, False otherwise
 
+        Raises:
+            CommandError: Command failed
+            MissingParameter: Missing command parameter
+            Unauthorized: Command cannot be executed by application
+            InvalidParameter: Invalid command parameter
         """
-        if usage is None or len(usage) == 0:
-            raise MissingParameter('Parameter "usage" is missing')
+        # fix command_sender: rpcserver is the default gpio entry point
+        if command_sender == "rpcserver":
+            command_sender = "gpios"
 
-        gpios = self._search_devices("subtype", usage)
-        return [gpio for gpio in gpios if gpio["mode"] == self.MODE_RESERVED]
+        # check values
+        self._check_parameters(
+            [
+                {"name": "device_uuid", "value": device_uuid, "type": str},
+            ]
+        )
+        with self._device_locks.get(device_uuid):
+            device = self._get_device(device_uuid)
+            if device is None:
+                raise InvalidParameter('Device "%s" does not exist' % device_uuid)
+            if device["owner"] != command_sender:
+                raise Unauthorized("Device can only be deleted by its owner")
 
-    def is_reserved_gpio(self, gpio):
+            # device is valid, remove entry
+            if not self._delete_device(device_uuid):
+                raise CommandError('Failed to delete device "%s"' % device["uuid"])
+
+        self._deconfigure_gpio(device)
+
+        return True
+
+    def delete_gpios(self, device_uuids, command_sender):
         """
-        Return True if gpio is reserved
+        Delete several gpios at once. No gpio is deleted if one of them can't be deleted.
 
         Args:
-            gpio (str): gpio
+            device_uuids (list): devices identifiers
+            command_sender (str): command sender
 
         Returns:
-            bool: True if gpio is reserved, False otherwise
+            bool: True if devices were deleted
+
+        Raises:
+            CommandError: Command failed
+            MissingParameter: Missing command parameter
+            Unauthorized: Command cannot be executed by application
+            InvalidParameter: Invalid command parameter
         """
-        device = self._search_device("gpio", gpio)
-        if device is None:
-            return False
+        # fix command_sender: rpcserver is the default gpio entry point
+        if command_sender == "rpcserver":
+            command_sender = "gpios"
 
-        self.logger.debug("is_reserved_gpio: %s" % device)
-        if device["mode"] == self.MODE_RESERVED:
-            return True
+        # check values
+        self._check_parameters(
+            [
+                {
+                    "name": "device_uuids",
+                    "value": device_uuids,
+                    "type": list,
+                    "validator": lambda val: len(val) > 0
+                    and all(isinstance(device_uuid, str) for device_uuid in val),
+                    "message": "Device uuids must be a non empty list of uuids",
+                },
+            ]
+        )
+        device_uuids = list(dict.fromkeys(device_uuids))
+        with self._device_locks.hold(device_uuids):
+            devices = []
+            for device_uuid in device_uuids:
+                device = self._get_device(device_uuid)
+                if device is None:
+                    raise InvalidParameter('Device "%s" does not exist' % device_uuid)
+                if device["owner"] != command_sender:
+                    raise Unauthorized("Device can only be deleted by its owner")
+                devices.append(device)
+
+            # devices are valid, remove entries
+            if not self._delete_devices(device_uuids):
+                raise CommandError("Failed to delete devices")
+
+        self._deconfigure_gpios(devices)
 
-        return False
+        return True
 
-    def add_gpio(self, name, gpio, mode, keep, inverted, command_sender):
+    def update_gpio(
+        self,
+        device_uuid,
+        name,
+        keep,
+        inverted,
+        command_sender,
+        debounce_ms=None,
+        poll_ms=None,
+        poll_max_ms=None,
+    ):
         """
-        Add new gpio
+        Update gpio
 
         Args:
-            name (str): name of gpio
-            gpio (str): selected gpio ("GPIOX")
-            mode (str): mode ("input"|"output")
-            keep (bool): keep state when restarting
-            inverted (bool): if true a callback will be triggered on gpio high level instead of low level
-            command_sender (str): command request sender (optional)
+            device_uuid (str): device identifier
+            name (str): gpio name
+            keep (bool): keep status flag
+            inverted (bool): inverted flag
+            command_sender (str): command sender
+            debounce_ms (int): input debounce delay in milliseconds (optional, unchanged if not specified)
+            poll_ms (int): input sampling period in milliseconds (optional, unchanged if not specified)
+            poll_max_ms (int): input adaptive sampling period ceiling in milliseconds, 0 to disable
+                               adaptive sampling (optional, unchanged if not specified)
 
         Returns:
-            dict: created gpio device ::
+            dict: updated gpio device::
 
                 {
                     name (str): name of gpio
@@ -930,7 +2424,8 @@ class Gpios(CleepModule):
         Raises:
             CommandError: Command failed
             MissingParameter: Missing command parameter
-            InvalidParameter: Invalid command parameter specified
+            Unauthorized: Command cannot be executed by application
+            InvalidParameter: Invalid command parameter
         """
         # fix command_sender: rpcserver is the default gpio entry point
         if command_sender == "rpcserver":
@@ -939,253 +2434,529 @@ class Gpios(CleepModule):
         # check values
         self._check_parameters(
             [
+                {"name": "device_uuid", "value": device_uuid, "type": str},
+                {"name": "name", "value": name, "type": str},
+                {"name": "keep", "value": keep, "type": bool},
+                {"name": "inverted", "value": inverted, "type": bool},
+            ]
+            + self._get_input_settings_parameters(debounce_ms, poll_ms, poll_max_ms)
+        )
+        with self._device_locks.get(device_uuid):
+            device = self._get_device(device_uuid)
+            if device is None:
+                raise InvalidParameter('Device "%s" does not exist' % device_uuid)
+            if device["owner"] != command_sender:
+                raise Unauthorized("Device can only be updated by its owner")
+
+            # device is valid, update entry
+            settings = self.__get_input_watcher_settings(device)
+            device["name"] = name
+            device["keep"] = keep
+            device["inverted"] = inverted
+            if debounce_ms is not None:
+                device["debounce_ms"] = debounce_ms
+            if poll_ms is not None:
+                device["poll_ms"] = poll_ms
+            if poll_max_ms is not None:
+                device["poll_max_ms"] = poll_max_ms or None
+            self.__sync_device_state(device)
+            if not self._update_device(device_uuid, device):
+                raise CommandError('Failed to update device "%s"' % device["uuid"])
+
+        # reconfigure watcher only if its settings changed
+        if settings != self.__get_input_watcher_settings(device):
+            self._reconfigure_gpio(device)
+
+        return device
+
+    def update_gpios(self, changes, command_sender):
+        """
+        Update several gpios at once. No gpio is updated if one of the changes is invalid.
+
+        Args:
+            changes (dict): changes indexed by device uuid, only specified fields are updated::
+
                 {
-                    "name": "name",
-                    "value": name,
-                    "type": str,
-                    "validator": lambda val: self._search_device("name", val) is None,
-                    "message": 'Name "%s" is already used' % name,
-                },
+                    device_uuid (str): {
+                        name (str): gpio name (optional)
+                        keep (bool): keep status flag (optional)
+                        inverted (bool): inverted flag (optional)
+                        debounce_ms (int): input debounce delay in milliseconds (optional)
+                        poll_ms (int): input sampling period in milliseconds (optional)
+                        poll_max_ms (int): input adaptive sampling period ceiling, 0 to disable (optional)
+                    },
+                    ...
+                }
+
+            command_sender (str): command sender
+
+        Returns:
+            list: updated gpio devices (see update_gpio)
+
+        Raises:
+            CommandError: Command failed
+            MissingParameter: Missing command parameter
+            Unauthorized: Command cannot be executed by application
+            InvalidParameter: Invalid command parameter
+        """
+        # fix command_sender: rpcserver is the default gpio entry point
+        if command_sender == "rpcserver":
+            command_sender = "gpios"
+
+        # check values
+        self._check_parameters(
+            [
                 {
-                    "name": "gpio",
-                    "value": gpio,
-                    "type": str,
-                    "validators": [
-                        {
-                            "validator": lambda val: val
-                            in self.get_raspi_gpios().keys(),
-                            "message": 'Gpio "%s" does not exist for this raspberry pi'
-                            % gpio,
-                        },
-                        {
-                            "validator": lambda val: self._search_device("gpio", gpio)
-                            is None,
-                            "message": 'Gpio "%s" is already used by other application'
-                            % gpio,
-                        },
-                    ],
+                    "name": "changes",
+                    "value": changes,
+                    "type": dict,
+                    "validator": lambda val: len(val) > 0
+                    and all(isinstance(params, dict) for params in val.values()),
+                    "message": "Changes must be a non empty dict of gpios changes",
                 },
+            ]
+        )
+        for params in changes.values():
+            unknown = set(params.keys()).difference(self.UPDATE_GPIO_KEYS)
+            if unknown:
+                raise InvalidParameter(
+                    'Unknown gpio parameters "%s"' % '", "'.join(sorted(unknown))
+                )
+            self._check_parameters(
+                [
+                    {
+                        "name": "name",
+                        "value": params.get("name"),
+                        "type": str,
+                        "none": True,
+                    },
+                    {
+                        "name": "keep",
+                        "value": params.get("keep"),
+                        "type": bool,
+                        "none": True,
+                    },
+                    {
+                        "name": "inverted",
+                        "value": params.get("inverted"),
+                        "type": bool,
+                        "none": True,
+                    },
+                ]
+                + self._get_input_settings_parameters(
+                    params.get("debounce_ms"),
+                    params.get("poll_ms"),
+                    params.get("poll_max_ms"),
+                )
+            )
+
+        with self._device_locks.hold(changes.keys()):
+            devices = {}
+            settings = {}
+            for device_uuid, params in changes.items():
+                device = self._get_device(device_uuid)
+                if device is None:
+                    raise InvalidParameter('Device "%s" does not exist' % device_uuid)
+                if device["owner"] != command_sender:
+                    raise Unauthorized("Device can only be updated by its owner")
+
+                settings[device_uuid] = self.__get_input_watcher_settings(device)
+                for key, value in params.items():
+                    if value is None:
+                        continue
+                    if key == "poll_max_ms":
+                        value = value or None
+                    device[key] = value
+                self.__sync_device_state(device)
+                devices[device_uuid] = device
+
+            # devices are valid, update entries
+            if not self._update_devices(devices):
+                raise CommandError("Failed to update devices")
+
+        # reconfigure watchers only if their settings changed
+        for device_uuid, device in devices.items():
+            if settings[device_uuid] != self.__get_input_watcher_settings(device):
+                self._reconfigure_gpio(device)
+
+        return list(devices.values())
+
+    def turn_on(self, device_uuid, force=False, auto_off_ms=None):
+        """
+        Turn on specified output gpio. Nothing is done if output is already on, unless force is set.
+        Any new command on output cancels pending auto off.
+
+        Args:
+            device_uuid (str): device identifier
+            force (bool): write output, save state and send event even if output is already on
+                          (optional, default False)
+            auto_off_ms (int): turn off output after this delay in milliseconds (optional). Timed on
+                               state is not persisted.
+
+        Returns:
+            bool: True if command executed successfully
+
+        Raises:
+            CommandError: Command failed
+            InvalidParameter: Invalid command parameter
+        """
+        self._check_parameters(
+            [
+                {"name": "force", "value": force, "type": bool},
                 {
-                    "name": "mode",
-                    "value": mode,
-                    "type": str,
-                    "validator": lambda val: val in (self.MODE_INPUT, self.MODE_OUTPUT),
+                    "name": "auto_off_ms",
+                    "value": auto_off_ms,
+                    "type": int,
+                    "none": True,
+                    "validator": lambda val: 1 <= val <= self.PULSE_MS_MAX,
+                    "message": "Auto off delay must be between 1 and %d ms"
+                    % self.PULSE_MS_MAX,
                 },
-                {"name": "keep", "value": keep, "type": bool},
-                {"name": "inverted", "value": inverted, "type": bool},
             ]
         )
 
-        # gpio is valid, prepare new entry
-        data = {
-            "name": name,
-            "mode": mode,
-            "pin": self.get_raspi_gpios()[gpio],
-            "gpio": gpio,
-            "keep": keep,
-            "on": False,
-            "inverted": inverted,
-            "owner": command_sender,
-            "type": "gpio",
-            "subtype": mode,
-        }
-
-        # add device
-        device = self._add_device(data)
-        if device is None:
-            raise CommandError("Unable to add device")
+        with self._device_locks.get(device_uuid):
+            device = self._get_device(device_uuid)
+            if device is None:
+                raise CommandError("Device not found")
+            if device["mode"] != self.MODE_OUTPUT:
+                raise CommandError(
+                    'Gpio "%s" configured as "%s" cannot be turned on'
+                    % (device["gpio"], device["mode"])
+                )
 
-        # configure it
-        self._configure_gpio(device)
+            # new command replaces pending auto off
+            cancelled = self.__cancel_auto_off(device_uuid)
+            if auto_off_ms:
+                self.__schedule_auto_off(device_uuid, auto_off_ms)
+
+            # volatile state shadows output level, skip redundant command
+            if not force and self.gpios_on_states.get(device_uuid) is True:
+                if cancelled and device["keep"] and not auto_off_ms:
+                    # timed on state becomes permanent, persist it
+                    self._state_writer.mark(device_uuid, True)
+                self.__count_outputs_writes(0, 1)
+                return True
+
+            # turn on output
+            self.logger.debug("Turn on GPIO %s" % device["gpio"])
+            self.__write_output(device, True)
+            self.__count_outputs_writes(1, 0)
+
+            # save current state (keep state is persisted in background)
+            device["on"] = True
+            self.gpios_on_states[device_uuid] = device["on"]
+            if device["keep"] and not auto_off_ms:
+                self._state_writer.mark(device_uuid, device["on"])
 
-        return device
+            # broadcast event
+            self.gpios_gpio_on.send(
+                params={"gpio": device["gpio"], "init": False}, device_id=device_uuid
+            )
 
-    def delete_gpio(self, device_uuid, command_sender):
+        return True
+
+    def turn_off(self, device_uuid, force=False):
         """
-        Delete gpio
+        Turn off specified output gpio. Nothing is done if output is already off, unless force is set.
 
         Args:
             device_uuid (str): device identifier
-            command_sender (str): command sender
+            force (bool): write output, save state and send event even if output is already off
+                          (optional, default False)
 
         Returns:
-            bool: True if device was deleted, False otherwise
+            bool: True if command executed successfully
 
         Raises:
             CommandError: Command failed
-            MissingParameter: Missing command parameter
-            Unauthorized: Command cannot be executed by application
             InvalidParameter: Invalid command parameter
         """
-        # fix command_sender: rpcserver is the default gpio entry point
-        if command_sender == "rpcserver":
-            command_sender = "gpios"
-
-        # check values
         self._check_parameters(
             [
-                {"name": "device_uuid", "value": device_uuid, "type": str},
+                {"name": "force", "value": force, "type": bool},
             ]
         )
-        device = self._get_device(device_uuid)
-        if device is None:
-            raise InvalidParameter('Device "%s" does not exist' % device_uuid)
-        if device["owner"] != command_sender:
-            raise Unauthorized("Device can only be deleted by its owner")
 
-        # device is valid, remove entry
-        if not self._delete_device(device_uuid):
-            raise CommandError('Failed to delete device "%s"' % device["uuid"])
+        with self._device_locks.get(device_uuid):
+            device = self._get_device(device_uuid)
+            if device is None:
+                raise CommandError("Device not found")
+            if device["mode"] != self.MODE_OUTPUT:
+                raise CommandError(
+                    'Gpio "%s" configured as "%s" cannot be turned off'
+                    % (device["gpio"], device["mode"])
+                )
+
+            # new command cancels pending auto off
+            self.__cancel_auto_off(device_uuid)
 
-        self._deconfigure_gpio(device)
+            # volatile state shadows output level, skip redundant command
+            if not force and self.gpios_on_states.get(device_uuid) is False:
+                self.__count_outputs_writes(0, 1)
+                return True
+
+            # turn off output
+            self.logger.debug("Turn off GPIO %s" % device["gpio"])
+            self.__write_output(device, False)
+            self.__count_outputs_writes(1, 0)
+
+            # save current state (keep state is persisted in background)
+            device["on"] = False
+            self.gpios_on_states[device_uuid] = device["on"]
+            if device["keep"]:
+                self._state_writer.mark(device_uuid, device["on"])
+
+            # broadcast event
+            self.gpios_gpio_off.send(
+                params={"gpio": device["gpio"], "init": False, "duration": 0},
+                device_id=device_uuid,
+            )
 
         return True
 
-    def update_gpio(self, device_uuid, name, keep, inverted, command_sender):
+    def set_outputs(self, outputs, force=False):
         """
-        Update gpio
+        Turn on or off several output gpios at once. All outputs are checked before any level is
+        changed, then levels are applied back-to-back, states are persisted at once and events are
+        sent. Outputs already in requested state are left untouched, unless force is set.
 
         Args:
-            device_uuid (str): device identifier
-            name (str): gpio name
-            keep (bool): keep status flag
-            inverted (bool): inverted flag
-            command_sender (str): command sender
+            outputs (dict): outputs states indexed by device identifier ({device_uuid: on})
+            force (bool): write outputs, save states and send events even if outputs are already in
+                          requested state (optional, default False)
 
         Returns:
-            dict: updated gpio device::
-
-                {
-                    name (str): name of gpio
-                    mode (str): Gpio mode ("output"|"input")
-                    pin (number): Gpio pin number
-                    gpio (str): Gpio id (GPIOX)
-                    keep (bool): True if gpio value is stored in config and restored after reboot
-                    on (bool): True if gpio is on
-                    inverted (bool): Gpio has inverted state
-                    owner (str): Application that owns the gpio
-                    type (str): Always "gpio"
-                    subtype (str): Same value than mode
-                }
+            bool: True if command executed successfully
 
         Raises:
             CommandError: Command failed
             MissingParameter: Missing command parameter
-            Unauthorized: Command cannot be executed by application
             InvalidParameter: Invalid command parameter
         """
-        # fix command_sender: rpcserver is the default gpio entry point
-        if command_sender == "rpcserver":
-            command_sender = "gpios"
-
-        # check values
         self._check_parameters(
             [
-                {"name": "device_uuid", "value": device_uuid, "type": str},
-                {"name": "name", "value": name, "type": str},
-                {"name": "keep", "value": keep, "type": bool},
-                {"name": "inverted", "value": inverted, "type": bool},
+                {
+                    "name": "outputs",
+                    "value": outputs,
+                    "type": dict,
+                    "validator": lambda val: len(val) > 0
+                    and all(isinstance(on, bool) for on in val.values()),
+                    "message": "Outputs must be a non empty dict of outputs states",
+                },
+                {"name": "force", "value": force, "type": bool},
             ]
         )
-        device = self._get_device(device_uuid)
-        if device is None:
-            raise InvalidParameter('Device "%s" does not exist' % device_uuid)
-        if device["owner"] != command_sender:
-            raise Unauthorized("Device can only be updated by its owner")
 
-        # device is valid, update entry
-        device["name"] = name
-        device["keep"] = keep
-        device["inverted"] = inverted
-        if not self._update_device(device_uuid, device):
-            raise CommandError('Failed to update device "%s"' % device["uuid"])
+        with self._device_locks.hold(outputs.keys()):
+            devices = []
+            for device_uuid, on in outputs.items():
+                device = self._get_device(device_uuid)
+                if device is None:
+                    raise CommandError('Device "%s" not found' % device_uuid)
+                if device["mode"] != self.MODE_OUTPUT:
+                    raise CommandError(
+                        'Gpio "%s" configured as "%s" cannot be turned %s'
+                        % (device["gpio"], device["mode"], "on" if on else "off")
+                    )
+                devices.append(device)
 
-        # relaunch watcher
-        self._reconfigure_gpio(device)
+            # new command cancels pending auto offs
+            cancelled = [
+                device
+                for device in devices
+                if self.__cancel_auto_off(device["uuid"])
+            ]
 
-        return device
+            # volatile states shadow outputs levels, skip redundant outputs
+            if not force:
+                devices = [
+                    device
+                    for device in devices
+                    if self.gpios_on_states.get(device["uuid"])
+                    is not outputs[device["uuid"]]
+                ]
+            self.__count_outputs_writes(len(devices), len(outputs) - len(devices))
+
+            # timed on states of skipped outputs become permanent, persist them
+            written = {device["uuid"] for device in devices}
+            timed_states = {
+                device["uuid"]: True
+                for device in cancelled
+                if device["keep"] and device["uuid"] not in written
+            }
+            if timed_states:
+                self._state_writer.mark_states(timed_states)
+            if not devices:
+                return True
+
+            # set outputs (pwm outputs turned on are started by pwm engine afterwards)
+            self.logger.debug("Set outputs %s" % outputs)
+            levels = {}
+            pwm_devices = []
+            for device in devices:
+                on = outputs[device["uuid"]]
+                if self.__is_pwm_output(device):
+                    if on:
+                        pwm_devices.append(device)
+                        continue
+                    self._pwm_engine.remove_channel(device["pin"])
+                high = on != device.get("inverted", False)
+                levels[device["pin"]] = GPIO_HIGH if high else GPIO_LOW
+            if levels:
+                self._gpio_outputs(levels)
+            for device in pwm_devices:
+                self.__write_output(device, True)
+
+            # save current states (keep states are persisted at once in background)
+            keep_states = {}
+            for device in devices:
+                device["on"] = outputs[device["uuid"]]
+                self.gpios_on_states[device["uuid"]] = device["on"]
+                if device["keep"]:
+                    keep_states[device["uuid"]] = device["on"]
+            if keep_states:
+                self._state_writer.mark_states(keep_states)
+
+            # broadcast events
+            for device in devices:
+                if device["on"]:
+                    self.gpios_gpio_on.send(
+                        params={"gpio": device["gpio"], "init": False},
+                        device_id=device["uuid"],
+                    )
+                else:
+                    self.gpios_gpio_off.send(
+                        params={"gpio": device["gpio"], "init": False, "duration": 0},
+                        device_id=device["uuid"],
+                    )
+
+        return True
 
-    def turn_on(self, device_uuid):
+    def pulse(self, device_uuid, duration_ms):
         """
-        Turn on specified output gpio
+        Turn on specified output gpio during specified duration. Any new command on output cancels
+        pulse end.
 
         Args:
             device_uuid (str): device identifier
+            duration_ms (int): pulse duration in milliseconds
 
         Returns:
             bool: True if command executed successfully
 
         Raises:
             CommandError: Command failed
+            MissingParameter: Missing command parameter
+            InvalidParameter: Invalid command parameter
         """
-        # check values
-        device = self._get_device(device_uuid)
-        if device is None:
-            raise CommandError("Device not found")
-        if device["mode"] != self.MODE_OUTPUT:
-            raise CommandError(
-                'Gpio "%s" configured as "%s" cannot be turned on'
-                % (device["gpio"], device["mode"])
-            )
+        self._check_parameters(
+            [
+                {
+                    "name": "duration_ms",
+                    "value": duration_ms,
+                    "type": int,
+                    "validator": lambda val: 1 <= val <= self.PULSE_MS_MAX,
+                    "message": "Duration must be between 1 and %d ms" % self.PULSE_MS_MAX,
+                },
+            ]
+        )
 
-        # turn on output
-        self.logger.debug("Turn on GPIO %s" % device["gpio"])
-        level = GPIO_LOW if device.get("inverted", False) else GPIO_HIGH
-        self._gpio_output(device["pin"], level)
+        return self.turn_on(device_uuid, auto_off_ms=duration_ms)
 
-        # save current state
-        device["on"] = True
-        if device["keep"]:
-            self._update_device(device_uuid, device)
-        else:
-            self.gpios_on_states[device_uuid] = device["on"]
+    def __schedule_auto_off(self, device_uuid, delay_ms):
+        """
+        Schedule output auto off (must be called with device lock acquired)
 
-        # broadcast event
-        self.gpios_gpio_on.send(
-            params={"gpio": device["gpio"], "init": False}, device_id=device_uuid
+        Args:
+            device_uuid (str): device identifier
+            delay_ms (int): delay before turning off output in milliseconds
+        """
+        token = object()
+        timer_id = self._timer_scheduler.schedule(
+            delay_ms / 1000.0, self.__auto_off, device_uuid, token
         )
+        self.__auto_offs[device_uuid] = (timer_id, token)
+
+    def __cancel_auto_off(self, device_uuid):
+        """
+        Cancel pending output auto off (must be called with device lock acquired)
+
+        Args:
+            device_uuid (str): device identifier
 
+        Returns:
+            bool: True if an auto off was pending
+        """
+        auto_off = self.__auto_offs.pop(device_uuid, None)
+        if auto_off is None:
+            return False
+        self._timer_scheduler.cancel(auto_off[0])
         return True
 
-    def turn_off(self, device_uuid):
+    def __auto_off(self, device_uuid, token):
+        """
+        Timer callback that turns off output at end of pulse
+
+        Args:
+            device_uuid (str): device identifier
+            token (object): auto off token, auto off is ignored if it was replaced meanwhile
+        """
+        with self._device_locks.get(device_uuid):
+            auto_off = self.__auto_offs.get(device_uuid)
+            if auto_off is None or auto_off[1] is not token:
+                # replaced by a new command while timer was firing
+                return
+            self.turn_off(device_uuid)
+
+    def set_duty(self, device_uuid, percent):
         """
-        Turn off specified output gpio
+        Set duty cycle of pwm output. It is applied immediately if output is on, otherwise when it is
+        turned on. Output on/off state is not changed.
 
         Args:
             device_uuid (str): device identifier
+            percent (int): duty cycle in percent (0-100)
 
         Returns:
             bool: True if command executed successfully
 
         Raises:
             CommandError: Command failed
+            MissingParameter: Missing command parameter
+            InvalidParameter: Invalid command parameter
         """
-        device = self._get_device(device_uuid)
-        if device is None:
-            raise CommandError("Device not found")
-        if device["mode"] != self.MODE_OUTPUT:
-            raise CommandError(
-                'Gpio "%s" configured as "%s" cannot be turned off'
-                % (device["gpio"], device["mode"])
-            )
+        self._check_parameters(
+            [
+                {
+                    "name": "percent",
+                    "value": percent,
+                    "type": int,
+                    "validator": lambda val: 0 <= val <= 100,
+                    "message": "Duty cycle must be between 0 and 100",
+                },
+            ]
+        )
 
-        # turn off output
-        self.logger.debug("Turn off GPIO %s" % device["gpio"])
-        level = GPIO_HIGH if device.get("inverted", False) else GPIO_LOW
-        self._gpio_output(device["pin"], level)
+        with self._device_locks.get(device_uuid):
+            device = self._get_device(device_uuid)
+            if device is None:
+                raise CommandError("Device not found")
+            if not self.__is_pwm_output(device):
+                raise CommandError(
+                    'Gpio "%s" is not configured as pwm output' % device["gpio"]
+                )
+            if self.__duties.get(device_uuid, device["duty"]) == percent:
+                return True
 
-        # save current state
-        device["on"] = False
-        if device["keep"]:
-            self._update_device(device_uuid, device)
-        else:
-            self.gpios_on_states[device_uuid] = device["on"]
+            # save duty cycle (persisted in background)
+            self.__duties[device_uuid] = percent
+            self._duty_writer.mark(device_uuid, percent)
+            self.__set_device_changed(device_uuid)
 
-        # broadcast event
-        self.gpios_gpio_off.send(
-            params={"gpio": device["gpio"], "init": False, "duration": 0},
-            device_id=device_uuid,
-        )
+            # apply it
+            if self.gpios_on_states.get(device_uuid):
+                self.__write_output(device, True)
 
         return True
 
@@ -1212,7 +2983,7 @@ class Gpios(CleepModule):
                 % (device["gpio"], device["mode"])
             )
 
-        return device["on"]
+        return self.gpios_on_states.get(device_uuid, device["on"])
 
     def is_gpio_on(self, gpio):
         """
@@ -1242,11 +3013,275 @@ class Gpios(CleepModule):
 
         return GPIO_input(pin) == GPIO_HIGH
 
+    def get_states(self, generation=0):
+        """
+        Return gpios states changed since specified generation
+
+        Args:
+            generation (int): generation returned by previous call (0 to get all states)
+
+        Returns:
+            dict: gpios states::
+
+                {
+                    generation (int): current states generation
+                    states (dict): {
+                        device_uuid (str): True if gpio is on
+                        ...
+                    }
+                }
+
+        Raises:
+            InvalidParameter: Invalid command parameter
+        """
+        self._check_parameters(
+            [
+                {
+                    "name": "generation",
+                    "value": generation,
+                    "type": int,
+                    "validator": lambda val: val >= 0,
+                },
+            ]
+        )
+
+        generation, states = self.gpios_on_states.get_states(generation)
+        return {"generation": generation, "states": states}
+
     def reset_gpios(self):
         """
         Reset all gpios turning them off
         """
-        devices = self.get_module_devices()
-        for uuid in devices:
-            if devices[uuid]["mode"] == Gpios.MODE_OUTPUT:
-                self.turn_off(uuid)
+        for device_uuid in self._devices_index.get("subtype", self.MODE_OUTPUT):
+            self.turn_off(device_uuid)
+
+    def get_diagnostics(self):
+        """
+        Return gpios diagnostics
+
+        Returns:
+            dict: diagnostics::
+
+                {
+                    inputs (dict): {
+                        device_uuid (str): {
+                            scanner (str): "asyncio", "edge" or "poll"
+                            period (float): current sampling period in seconds (None for edge)
+                            debounce (float): debounce delay in seconds
+                        },
+                        ...
+                    },
+                    dispatcher (dict): {
+                        depth (int): dispatch queue depth
+                        size (int): number of input records in queue
+                        high_water (int): maximum number of input records queued at once
+                        dropped (int): number of input records dropped because queue was full
+                        dispatched (int): number of input records dispatched
+                    },
+                    persistence (dict): {
+                        pending (int): number of states waiting to be written
+                        changes (int): number of states changes of gpios with keep flag
+                        writes (int): number of states writes (config or journal)
+                        writes_saved (int): number of writes saved by coalescing states changes
+                        failures (int): number of failed writes
+                        interval (float): write interval in seconds
+                        max_staleness (float): maximum staleness in seconds
+                    },
+                    journal (dict): {
+                        enabled (bool): True if states are appended to journal
+                        records (int): number of records in journal
+                        appends (int): number of appends
+                        compactions (int): number of compactions into config
+                    },
+                    outputs (dict): {
+                        backend (str): "gpiomem" (simultaneous outputs through set/clear registers)
+                                       or "rpigpio" (outputs set back-to-back)
+                        writes (int): number of outputs written
+                        skipped_writes (int): number of outputs writes skipped because output was
+                                              already in requested state
+                    },
+                    timers (dict): {
+                        pending (int): number of pending auto offs
+                        fired (int): number of auto offs fired
+                        cancelled (int): number of auto offs cancelled by a new command
+                        max_lateness (float): maximum auto off delay overrun in seconds
+                    },
+                    pwm (dict): {
+                        channels (int): number of pwm outputs currently driven
+                        edges (int): number of pwm edges generated
+                        resyncs (int): number of pwm outputs resynchronized after missing a whole period
+                        mean_jitter (float): mean pwm edge lateness in seconds
+                        max_jitter (float): maximum pwm edge lateness in seconds
+                    }
+                }
+
+        """
+        edge_watchers = self._edge_scanner.get_watchers() if self._edge_scanner else {}
+        inputs = {}
+        for device_uuid, watcher in self._input_watchers.items():
+            edge = device_uuid in edge_watchers
+            if self._async_engine:
+                scanner = self.INPUT_ENGINE_ASYNCIO
+            else:
+                scanner = "edge" if edge else "poll"
+            inputs[device_uuid] = {
+                "scanner": scanner,
+                "period": None if edge else watcher.current_period,
+                "debounce": watcher.debounce,
+            }
+
+        with self.__outputs_stats_lock:
+            outputs = dict(self.__outputs_stats)
+        outputs["backend"] = "gpiomem" if self._gpio_memory.is_opened() else "rpigpio"
+
+        return {
+            "inputs": inputs,
+            "dispatcher": self._event_dispatcher.get_stats(),
+            "persistence": self._state_writer.get_stats(),
+            "journal": self._state_journal.get_stats(),
+            "outputs": outputs,
+            "timers": self._timer_scheduler.get_stats(),
+            "pwm": self._pwm_engine.get_stats(),
+        }
+
+    def set_input_engine(self, engine):
+        """
+        Set engine that runs inputs. New engine is used after application restart.
+
+        Args:
+            engine (str): "threads" (dedicated edge and polling scanner threads) or "asyncio" (single event loop)
+
+        Returns:
+            bool: True if engine is saved
+
+        Raises:
+            MissingParameter: Missing command parameter
+            InvalidParameter: Invalid command parameter
+        """
+        self._check_parameters(
+            [
+                {
+                    "name": "engine",
+                    "value": engine,
+                    "type": str,
+                    "validator": lambda val: val
+                    in (self.INPUT_ENGINE_THREADS, self.INPUT_ENGINE_ASYNCIO),
+                },
+            ]
+        )
+
+        return self._set_config_field("input_engine", engine)
+
+    def set_dispatch_queue_depth(self, depth):
+        """
+        Set depth of input records queue. New depth is used after application restart.
+
+        Args:
+            depth (int): maximum number of input records waiting for dispatch
+
+        Returns:
+            bool: True if depth is saved
+
+        Raises:
+            MissingParameter: Missing command parameter
+            InvalidParameter: Invalid command parameter
+        """
+        self._check_parameters(
+            [
+                {
+                    "name": "depth",
+                    "value": depth,
+                    "type": int,
+                    "validator": lambda val: 1 <= val <= self.DISPATCH_QUEUE_DEPTH_MAX,
+                    "message": "Queue depth must be between 1 and %d"
+                    % self.DISPATCH_QUEUE_DEPTH_MAX,
+                },
+            ]
+        )
+
+        return self._set_config_field("dispatch_queue_depth", depth)
+
+    def set_state_persistence(self, interval_ms, max_staleness_ms):
+        """
+        Set how states of gpios with keep flag are persisted. States changes are written at once when no
+        state changed during interval, or when a state waits for max staleness (ie chattering input).
+        Settings are applied immediately.
+
+        Args:
+            interval_ms (int): delay without state change before writing states in milliseconds
+                               (0 to write states as soon as possible)
+            max_staleness_ms (int): maximum delay before writing a state in milliseconds
+
+        Returns:
+            bool: True if settings are saved
+
+        Raises:
+            MissingParameter: Missing command parameter
+            InvalidParameter: Invalid command parameter
+        """
+        self._check_parameters(
+            [
+                {
+                    "name": "interval_ms",
+                    "value": interval_ms,
+                    "type": int,
+                    "validator": lambda val: 0
+                    <= val
+                    <= self.STATE_WRITE_INTERVAL_MS_MAX,
+                    "message": "Write interval must be between 0 and %d ms"
+                    % self.STATE_WRITE_INTERVAL_MS_MAX,
+                },
+                {
+                    "name": "max_staleness_ms",
+                    "value": max_staleness_ms,
+                    "type": int,
+                    "validator": lambda val: interval_ms
+                    <= val
+                    <= self.STATE_MAX_STALENESS_MS_MAX,
+                    "message": "Maximum staleness must be between write interval and %d ms"
+                    % self.STATE_MAX_STALENESS_MS_MAX,
+                },
+            ]
+        )
+
+        for writer in (self._state_writer, self._duty_writer):
+            writer.configure(
+                interval=interval_ms / 1000.0, max_staleness=max_staleness_ms / 1000.0
+            )
+        return self._update_config(
+            {
+                "state_write_interval_ms": interval_ms,
+                "state_max_staleness_ms": max_staleness_ms,
+            }
+        )
+
+    def set_state_journal(self, enabled):
+        """
+        Enable or disable states journal. When enabled, states of gpios with keep flag are appended to a
+        journal instead of rewriting config file, journal is compacted into config periodically and when
+        application stops. Setting is applied immediately.
+
+        Args:
+            enabled (bool): True to enable states journal
+
+        Returns:
+            bool: True if setting is saved
+
+        Raises:
+            CommandError: Command failed
+            MissingParameter: Missing command parameter
+            InvalidParameter: Invalid command parameter
+        """
+        self._check_parameters(
+            [
+                {"name": "enabled", "value": enabled, "type": bool},
+            ]
+        )
+
+        if enabled:
+            if not self._state_journal.open():
+                raise CommandError("Unable to open states journal")
+        else:
+            self.__close_state_journal()
+
+        return self._set_config_field("state_journal", enabled)
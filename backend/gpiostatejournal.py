@@ -0,0 +1,215 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from threading import Lock
+import logging
+import os
+import time
+
+
+class GpioStateJournal:
+    """
+    Class that persists devices states as records appended to a journal file
+    Appending a record is a small write at the end of the file instead of rewriting the whole config
+    file. Journal must be compacted regularly: its states are written to config and journal is
+    truncated.
+
+    Records are "<device_uuid> <0|1>" lines, last record of a device wins. An incomplete last line
+    (power loss while appending) is ignored when journal is read.
+    """
+
+    PATH = "/etc/cleep/gpios.journal"
+    COMPACT_RECORDS = 1000
+    COMPACT_INTERVAL = 3600.0  # in seconds
+
+    def __init__(
+        self, path=PATH, compact_records=COMPACT_RECORDS, compact_interval=COMPACT_INTERVAL
+    ):
+        """
+        Constructor
+
+        Args:
+            path (str): journal file path
+            compact_records (int): number of records that triggers compaction
+            compact_interval (float): delay after which journal with records must be compacted (in seconds)
+        """
+        self.logger = logging.getLogger("Gpios")
+        # self.logger.setLevel(logging.DEBUG)
+        self.path = path
+        self.compact_records = compact_records
+        self.compact_interval = compact_interval
+        self.__file = None
+        self.__lock = Lock()
+        self.__records = 0
+        self.__compacted_at = time.monotonic()
+        self.__appends = 0
+        self.__compactions = 0
+
+    def open(self):
+        """
+        Open journal for appending
+
+        Returns:
+            bool: True if journal is opened
+        """
+        with self.__lock:
+            if self.__file is not None:
+                return True
+            try:
+                self.__records = len(self.__read())
+                self.__file = open(self.path, "a", encoding="utf-8")
+                if self.__file.tell() and not self.__ends_with_newline():
+                    # terminate incomplete record so it doesn't corrupt next one
+                    self.__file.write("\n")
+                    self.__file.flush()
+                return True
+            except OSError as error:
+                self.logger.error("Unable to open states journal: %s", error)
+                return False
+
+    def __ends_with_newline(self):
+        """
+        Return True if journal file ends with a newline
+        """
+        with open(self.path, "rb") as journal:
+            journal.seek(-1, os.SEEK_END)
+            return journal.read(1) == b"\n"
+
+    def is_opened(self):
+        """
+        Return True if journal is opened
+
+        Returns:
+            bool: True if opened
+        """
+        return self.__file is not None
+
+    def close(self):
+        """
+        Close journal
+        """
+        with self.__lock:
+            if self.__file is not None:
+                self.__file.close()
+                self.__file = None
+
+    def append(self, states):
+        """
+        Append states records and sync them to storage
+
+        Args:
+            states (dict): devices states ({device_uuid: on})
+
+        Returns:
+            bool: True if records are appended
+        """
+        records = "".join(
+            "%s %d\n" % (device_uuid, 1 if on else 0)
+            for device_uuid, on in states.items()
+        )
+        with self.__lock:
+            if self.__file is None:
+                return False
+            try:
+                self.__file.write(records)
+                self.__file.flush()
+                os.fsync(self.__file.fileno())
+            except OSError as error:
+                self.logger.error("Unable to append states to journal: %s", error)
+                return False
+            self.__records += len(states)
+            self.__appends += 1
+            return True
+
+    def __read(self):
+        """
+        Read journal records (must be called with lock acquired)
+
+        Returns:
+            list: list of (device_uuid, on) records
+        """
+        try:
+            with open(self.path, "r", encoding="utf-8") as journal:
+                lines = journal.read().split("\n")
+        except FileNotFoundError:
+            return []
+
+        # last item is empty when journal ends with a complete record
+        records = []
+        for line in lines[:-1]:
+            fields = line.split(" ")
+            if len(fields) != 2 or fields[1] not in ("0", "1"):
+                self.logger.warning('Invalid journal record "%s" ignored', line)
+                continue
+            records.append((fields[0], fields[1] == "1"))
+        return records
+
+    def read(self):
+        """
+        Return states stored in journal
+
+        Returns:
+            dict: devices states ({device_uuid: on})
+        """
+        with self.__lock:
+            return dict(self.__read())
+
+    def needs_compaction(self):
+        """
+        Return True if journal must be compacted
+
+        Returns:
+            bool: True if journal contains too many records or if records are too old
+        """
+        with self.__lock:
+            if not self.__records:
+                return False
+            return (
+                self.__records >= self.compact_records
+                or time.monotonic() - self.__compacted_at >= self.compact_interval
+            )
+
+    def truncate(self):
+        """
+        Drop all records. Must be called once journal states are written to config.
+
+        Returns:
+            bool: True if journal is truncated
+        """
+        with self.__lock:
+            try:
+                if self.__file is not None:
+                    self.__file.truncate(0)
+                    os.fsync(self.__file.fileno())
+                elif os.path.exists(self.path):
+                    os.remove(self.path)
+            except OSError as error:
+                self.logger.error("Unable to truncate states journal: %s", error)
+                return False
+            self.__records = 0
+            self.__compacted_at = time.monotonic()
+            self.__compactions += 1
+            return True
+
+    def get_stats(self):
+        """
+        Return journal counters
+
+        Returns:
+            dict: counters::
+
+                {
+                    enabled (bool): True if journal is opened
+                    records (int): number of records in journal
+                    appends (int): number of appends
+                    compactions (int): number of compactions
+                }
+
+        """
+        with self.__lock:
+            return {
+                "enabled": self.__file is not None,
+                "records": self.__records,
+                "appends": self.__appends,
+                "compactions": self.__compactions,
+            }
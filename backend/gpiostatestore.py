@@ -0,0 +1,159 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from threading import Lock
+
+
+class GpioStateStore:
+    """
+    Class that stores volatile on/off states of devices in a bitmask
+    Each device gets a slot (bit index) the first time its state is stored, slots of forgotten devices
+    are reused. A generation counter is incremented each time a state changes, so changes since a
+    known generation can be returned without comparing states.
+
+    Store can be used as a dict of states indexed by device uuid (get, [], in, len).
+    """
+
+    def __init__(self):
+        """
+        Constructor
+        """
+        self.__lock = Lock()
+        self.__slots = {}
+        self.__uuids = []
+        self.__free_slots = []
+        self.__mask = 0
+        self.__generation = 0
+        self.__generations = []
+
+    def __get_slot(self, device_uuid):
+        """
+        Return device slot, allocate it if necessary (must be called with lock acquired)
+        """
+        slot = self.__slots.get(device_uuid)
+        if slot is not None:
+            return slot
+
+        if self.__free_slots:
+            slot = self.__free_slots.pop()
+            self.__uuids[slot] = device_uuid
+            self.__generations[slot] = 0
+        else:
+            slot = len(self.__uuids)
+            self.__uuids.append(device_uuid)
+            self.__generations.append(0)
+        self.__slots[device_uuid] = slot
+        return slot
+
+    @property
+    def generation(self):
+        """
+        Current generation
+
+        Returns:
+            int: generation
+        """
+        return self.__generation
+
+    def set(self, device_uuid, on):
+        """
+        Set device state
+
+        Args:
+            device_uuid (str): device uuid
+            on (bool): device state
+
+        Returns:
+            bool: True if state changed
+        """
+        with self.__lock:
+            known = device_uuid in self.__slots
+            slot = self.__get_slot(device_uuid)
+            bit = 1 << slot
+            if known and bool(self.__mask & bit) == bool(on):
+                return False
+
+            self.__mask = self.__mask | bit if on else self.__mask & ~bit
+            self.__generation += 1
+            self.__generations[slot] = self.__generation
+            return True
+
+    def get(self, device_uuid, default=None):
+        """
+        Return device state
+
+        Args:
+            device_uuid (str): device uuid
+            default (any): value returned if device state is not stored
+
+        Returns:
+            bool: device state or default value
+        """
+        with self.__lock:
+            slot = self.__slots.get(device_uuid)
+            if slot is None:
+                return default
+            return bool(self.__mask >> slot & 1)
+
+    def forget(self, device_uuid):
+        """
+        Forget device state and release its slot
+
+        Args:
+            device_uuid (str): device uuid
+        """
+        with self.__lock:
+            slot = self.__slots.pop(device_uuid, None)
+            if slot is None:
+                return
+            self.__mask &= ~(1 << slot)
+            self.__uuids[slot] = None
+            self.__free_slots.append(slot)
+
+    def get_mask(self):
+        """
+        Return raw states
+
+        Returns:
+            tuple: states bitmask (int), slots ({device_uuid: slot}) and generation (int)
+        """
+        with self.__lock:
+            return self.__mask, self.__slots.copy(), self.__generation
+
+    def get_states(self, generation=0):
+        """
+        Return states changed since specified generation
+
+        Args:
+            generation (int): generation returned by previous call (0 to get all states)
+
+        Returns:
+            tuple: current generation (int) and states ({device_uuid: on})
+        """
+        with self.__lock:
+            mask = self.__mask
+            return self.__generation, {
+                device_uuid: bool(mask >> slot & 1)
+                for slot, device_uuid in enumerate(self.__uuids)
+                if device_uuid is not None and self.__generations[slot] > generation
+            }
+
+    def __getitem__(self, device_uuid):
+        state = self.get(device_uuid)
+        if state is None:
+            raise KeyError(device_uuid)
+        return state
+
+    def __setitem__(self, device_uuid, on):
+        self.set(device_uuid, on)
+
+    def __delitem__(self, device_uuid):
+        if device_uuid not in self.__slots:
+            raise KeyError(device_uuid)
+        self.forget(device_uuid)
+
+    def __contains__(self, device_uuid):
+        return device_uuid in self.__slots
+
+    def __len__(self):
+        return len(self.__slots)
@@ -0,0 +1,259 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from threading import Thread, Lock, Event
+import logging
+import time
+
+
+class GpioStateWriter(Thread):
+    """
+    Class that persists devices states in background (write-behind)
+    State changes mark devices as dirty, dirty states are written all at once when no state changed
+    during write interval, or when oldest dirty state reaches maximum staleness (chattering input).
+    So a burst of state changes results in a single config write.
+
+    An optional maintenance callback (ie storage compaction) is called periodically by writer thread,
+    even when no state changes.
+
+    Note:
+        Pending states are not persisted until flushed: caller must flush writer before stopping.
+    """
+
+    INTERVAL = 1.0  # in seconds
+    MAX_STALENESS = 10.0  # in seconds
+    RETRY_DELAY = 1.0  # in seconds
+    MAINTENANCE_INTERVAL = 60.0  # in seconds
+
+    def __init__(
+        self,
+        write_callback,
+        interval=INTERVAL,
+        max_staleness=MAX_STALENESS,
+        maintenance_callback=None,
+        maintenance_interval=MAINTENANCE_INTERVAL,
+    ):
+        """
+        Constructor
+
+        Args:
+            write_callback (function): function called with dirty states ({device_uuid: on}) to persist,
+                                       it must return True if states are persisted
+            interval (float): delay without state change before writing dirty states (in seconds).
+                              0 writes states as soon as possible
+            max_staleness (float): maximum delay a dirty state can wait before being written (in seconds)
+            maintenance_callback (function): function called periodically by writer thread (optional)
+            maintenance_interval (float): delay between maintenance callback calls (in seconds)
+        """
+        # init
+        Thread.__init__(self, daemon=True)
+        self.logger = logging.getLogger("Gpios")
+        # self.logger.setLevel(logging.DEBUG)
+
+        # members
+        self.continu = True
+        self.write_callback = write_callback
+        self.interval = interval
+        self.max_staleness = max_staleness
+        self.maintenance_callback = maintenance_callback
+        self.maintenance_interval = maintenance_interval
+        self.__dirty = {}
+        self.__dirty_since = None
+        self.__changed_at = None
+        self.__lock = Lock()
+        self.__write_lock = Lock()
+        self.__wakeup = Event()
+        self.__changes = 0
+        self.__dirty_changes = 0
+        self.__written_changes = 0
+        self.__writes = 0
+        self.__failures = 0
+
+    def configure(self, interval=None, max_staleness=None):
+        """
+        Update writer settings, they are applied immediately
+
+        Args:
+            interval (float): delay without state change before writing dirty states (in seconds, optional)
+            max_staleness (float): maximum delay a dirty state can wait before being written (in seconds, optional)
+        """
+        with self.__lock:
+            if interval is not None:
+                self.interval = interval
+            if max_staleness is not None:
+                self.max_staleness = max_staleness
+        self.__wakeup.set()
+
+    def mark(self, device_uuid, on):
+        """
+        Mark device state as dirty
+
+        Args:
+            device_uuid (str): device uuid
+            on (bool): device state
+        """
+        self.mark_states({device_uuid: on})
+
+    def mark_states(self, states):
+        """
+        Mark several devices states as dirty at once, so they are written together
+
+        Args:
+            states (dict): devices states ({device_uuid: on})
+        """
+        now = time.monotonic()
+        with self.__lock:
+            self.__dirty.update(states)
+            self.__changes += len(states)
+            self.__dirty_changes += len(states)
+            self.__changed_at = now
+            if self.__dirty_since is None:
+                self.__dirty_since = now
+        self.__wakeup.set()
+
+    def discard(self, device_uuid):
+        """
+        Drop dirty state of device (deleted device)
+
+        Args:
+            device_uuid (str): device uuid
+        """
+        with self.__lock:
+            self.__dirty.pop(device_uuid, None)
+
+    def get_dirty(self):
+        """
+        Return dirty states
+
+        Returns:
+            dict: dirty states ({device_uuid: on})
+        """
+        with self.__lock:
+            return self.__dirty.copy()
+
+    def get_stats(self):
+        """
+        Return writer counters
+
+        Returns:
+            dict: counters::
+
+                {
+                    pending (int): number of dirty states waiting to be written
+                    changes (int): number of state changes
+                    writes (int): number of config writes
+                    writes_saved (int): number of config writes saved by coalescing state changes
+                    failures (int): number of failed config writes
+                    interval (float): write interval in seconds
+                    max_staleness (float): maximum staleness in seconds
+                }
+
+        """
+        with self.__lock:
+            return {
+                "pending": len(self.__dirty),
+                "changes": self.__changes,
+                "writes": self.__writes,
+                "writes_saved": self.__written_changes - self.__writes,
+                "failures": self.__failures,
+                "interval": self.interval,
+                "max_staleness": self.max_staleness,
+            }
+
+    def get_delay(self):
+        """
+        Return delay before dirty states must be written
+
+        Returns:
+            float: delay in seconds (0 if states must be written now) or None if there is no dirty state
+        """
+        with self.__lock:
+            if not self.__dirty:
+                return None
+            deadline = min(
+                self.__changed_at + self.interval,
+                self.__dirty_since + self.max_staleness,
+            )
+        return max(0, deadline - time.monotonic())
+
+    def flush(self):
+        """
+        Write dirty states now
+
+        Returns:
+            bool: True if there was no dirty state or if they are written, False if write failed
+        """
+        with self.__write_lock:
+            with self.__lock:
+                dirty = self.__dirty
+                dirty_since = self.__dirty_since
+                dirty_changes = self.__dirty_changes
+                self.__dirty = {}
+                self.__dirty_since = None
+                self.__dirty_changes = 0
+            if not dirty:
+                return True
+
+            self.logger.debug("Write %d devices states", len(dirty))
+            try:
+                written = self.write_callback(dirty)
+            except Exception:
+                self.logger.exception("Exception writing devices states:")
+                written = False
+
+            with self.__lock:
+                if written:
+                    self.__writes += 1
+                    self.__written_changes += dirty_changes
+                    return True
+
+                # keep states for next write, newer states have priority
+                self.__failures += 1
+                dirty.update(self.__dirty)
+                self.__dirty = dirty
+                self.__dirty_since = dirty_since
+                self.__dirty_changes += dirty_changes
+                return False
+
+    def stop(self):
+        """
+        Stop process. Dirty states are not written, call flush after writer is stopped.
+        """
+        self.continu = False
+        self.__wakeup.set()
+
+    def __maintain(self):
+        """
+        Call maintenance callback
+        """
+        try:
+            self.maintenance_callback()
+        except Exception:
+            self.logger.exception("Exception during states maintenance:")
+
+    def run(self):
+        """
+        Run writer
+        """
+        maintenance_at = time.monotonic() + self.maintenance_interval
+        while self.continu:
+            if self.maintenance_callback and time.monotonic() >= maintenance_at:
+                maintenance_at = time.monotonic() + self.maintenance_interval
+                self.__maintain()
+
+            delay = self.get_delay()
+            if delay == 0:
+                if not self.flush():
+                    # don't retry immediately
+                    self.__wakeup.wait(self.RETRY_DELAY)
+                    self.__wakeup.clear()
+                continue
+
+            if self.maintenance_callback:
+                # wake up for next maintenance even if no state changes
+                maintenance_delay = max(0, maintenance_at - time.monotonic())
+                delay = (
+                    maintenance_delay if delay is None else min(delay, maintenance_delay)
+                )
+            self.__wakeup.wait(delay)
+            self.__wakeup.clear()
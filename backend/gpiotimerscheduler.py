@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from threading import Thread, Condition
+import heapq
+import logging
+import time
+
+
+class GpioTimerScheduler(Thread):
+    """
+    Class that runs timed callbacks (ie pulse end) from a single thread
+    Timers are stored in a heap ordered by deadline, so any number of pending timers costs one thread
+    and scheduling or cancelling a timer is O(log n). Cancelled timers are dropped lazily when they
+    reach top of heap.
+
+    Callbacks are executed by scheduler thread, they must be short.
+    """
+
+    HEAP_COMPACT_SIZE = 64
+
+    def __init__(self):
+        """
+        Constructor
+        """
+        # init
+        Thread.__init__(self, daemon=True)
+        self.logger = logging.getLogger("Gpios")
+        # self.logger.setLevel(logging.DEBUG)
+
+        # members
+        self.continu = True
+        self.__condition = Condition()
+        # heap of (deadline, timer_id)
+        self.__heap = []
+        # timer_id => (callback, args)
+        self.__timers = {}
+        self.__last_timer_id = 0
+        self.__fired = 0
+        self.__cancelled = 0
+        self.__max_lateness = 0.0
+
+    def schedule(self, delay, callback, *args):
+        """
+        Schedule callback
+
+        Args:
+            delay (float): delay before callback is called (in seconds)
+            callback (function): function to call
+            args: callback arguments
+
+        Returns:
+            int: timer identifier
+        """
+        deadline = time.monotonic() + delay
+        with self.__condition:
+            self.__last_timer_id += 1
+            timer_id = self.__last_timer_id
+            self.__timers[timer_id] = (callback, args)
+            heapq.heappush(self.__heap, (deadline, timer_id))
+            if self.__heap[0][1] == timer_id:
+                # new timer is the next one, wake up scheduler thread
+                self.__condition.notify()
+        return timer_id
+
+    def cancel(self, timer_id):
+        """
+        Cancel pending timer
+
+        Args:
+            timer_id (int): timer identifier
+
+        Returns:
+            bool: True if timer was pending, False if it already fired or was cancelled
+        """
+        with self.__condition:
+            if self.__timers.pop(timer_id, None) is None:
+                return False
+            self.__cancelled += 1
+
+            # drop cancelled timers when they fill heap (ie long timers often rescheduled)
+            if len(self.__heap) > self.HEAP_COMPACT_SIZE and len(self.__heap) > 2 * len(
+                self.__timers
+            ):
+                self.__heap = [
+                    entry for entry in self.__heap if entry[1] in self.__timers
+                ]
+                heapq.heapify(self.__heap)
+            return True
+
+    def get_stats(self):
+        """
+        Return scheduler counters
+
+        Returns:
+            dict: counters::
+
+                {
+                    pending (int): number of pending timers
+                    fired (int): number of timers fired
+                    cancelled (int): number of timers cancelled
+                    max_lateness (float): maximum delay between timer deadline and callback call (in seconds)
+                }
+
+        """
+        with self.__condition:
+            return {
+                "pending": len(self.__timers),
+                "fired": self.__fired,
+                "cancelled": self.__cancelled,
+                "max_lateness": self.__max_lateness,
+            }
+
+    def stop(self):
+        """
+        Stop process. Pending timers are not fired.
+        """
+        with self.__condition:
+            self.continu = False
+            self.__condition.notify()
+
+    def __pop_due_timer(self):
+        """
+        Wait for next due timer (must be called with condition acquired)
+
+        Returns:
+            tuple: (callback, args) of due timer or None if scheduler is stopped
+        """
+        while self.continu:
+            if not self.__heap:
+                self.__condition.wait()
+                continue
+
+            deadline, timer_id = self.__heap[0]
+            if timer_id not in self.__timers:
+                # cancelled timer
+                heapq.heappop(self.__heap)
+                continue
+
+            now = time.monotonic()
+            if deadline > now:
+                self.__condition.wait(deadline - now)
+                continue
+
+            heapq.heappop(self.__heap)
+            self.__fired += 1
+            self.__max_lateness = max(self.__max_lateness, now - deadline)
+            return self.__timers.pop(timer_id)
+
+        return None
+
+    def run(self):
+        """
+        Run scheduler
+        """
+        while self.continu:
+            with self.__condition:
+                timer = self.__pop_due_timer()
+            if timer is None:
+                break
+
+            callback, args = timer
+            try:
+                callback(*args)
+            except Exception:
+                self.logger.exception("Exception running timer callback:")
@@ -7,6 +7,8 @@ angular
 .service('gpiosService', ['$q', '$rootScope', 'rpcService', 'cleepService',
 function($q, $rootScope, rpcService, cleepService) {
     var self = this;
+    self.pinsUsage = null;
+    self.pinsUsageVersion = null;
     
     /**
      * Init module devices
@@ -38,9 +40,22 @@ function($q, $rootScope, rpcService, cleepService) {
 
     /**
      * Return gpios usage
+     * Usage is cached and only requested again when backend pins usage version changes
      */
     self.getPinsUsage = function() {
-        return rpcService.sendCommand('get_pins_usage', 'gpios');
+        return rpcService.sendCommand('get_pins_usage_version', 'gpios')
+            .then(function(version) {
+                if( self.pinsUsage && version.data===self.pinsUsageVersion ) {
+                    return self.pinsUsage;
+                }
+
+                return rpcService.sendCommand('get_pins_usage', 'gpios')
+                    .then(function(pins) {
+                        self.pinsUsage = pins;
+                        self.pinsUsageVersion = version.data;
+                        return pins;
+                    });
+            });
     };
 
     /**
@@ -53,6 +68,20 @@ function($q, $rootScope, rpcService, cleepService) {
             })
     };
 
+    /**
+     * Add several gpios at once
+     * Gpios is a list of {name, gpio, mode, keep, inverted} objects, module is reloaded only once
+     */
+    self.addGpios = function(gpios) {
+        return rpcService.sendCommand('add_gpios', 'gpios', {'gpios':gpios})
+            .then(function(resp) {
+                return $q.all(cleepService.reloadModuleConfig('gpios'), cleepService.reloadDevices())
+                    .then(function() {
+                        return resp.data;
+                    });
+            });
+    };
+
     /**
      * Delete gpio
      */
@@ -63,6 +92,16 @@ function($q, $rootScope, rpcService, cleepService) {
             });
     };
 
+    /**
+     * Delete several gpios at once
+     */
+    self.deleteGpios = function(uuids) {
+        return rpcService.sendCommand('delete_gpios', 'gpios', {'device_uuids':uuids})
+            .then(function(resp) {
+                return $q.all(cleepService.reloadModuleConfig('gpios'), cleepService.reloadDevices());
+            });
+    };
+
     /**
      * Update device
      */
@@ -73,6 +112,17 @@ function($q, $rootScope, rpcService, cleepService) {
             });
     };
 
+    /**
+     * Update several gpios at once
+     * Changes is an object of {name, keep, inverted} changes indexed by device uuid
+     */
+    self.updateGpios = function(changes) {
+        return rpcService.sendCommand('update_gpios', 'gpios', {'changes':changes})
+            .then(function(resp) {
+                return $q.all(cleepService.reloadModuleConfig('gpios'), cleepService.reloadDevices());
+            });
+    };
+
     /**
      * Turn on specified gpio
      */
@@ -86,5 +136,27 @@ function($q, $rootScope, rpcService, cleepService) {
     self.turnOff = function(uuid) {
         return rpcService.sendCommand('turn_off', 'gpios', {'device_uuid':uuid});
     };
+
+    /**
+     * Turn on specified gpio during specified duration (in milliseconds)
+     */
+    self.pulse = function(uuid, durationMs) {
+        return rpcService.sendCommand('pulse', 'gpios', {'device_uuid':uuid, 'duration_ms':durationMs});
+    };
+
+    /**
+     * Set duty cycle (in percent) of specified pwm gpio
+     */
+    self.setDuty = function(uuid, percent) {
+        return rpcService.sendCommand('set_duty', 'gpios', {'device_uuid':uuid, 'percent':percent});
+    };
+
+    /**
+     * Turn on or off several gpios at once
+     * Outputs is an object of states (bool) indexed by device uuid
+     */
+    self.setOutputs = function(outputs) {
+        return rpcService.sendCommand('set_outputs', 'gpios', {'outputs':outputs});
+    };
 }]);
 
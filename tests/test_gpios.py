@@ -4,9 +4,26 @@ import logging
 import time
 import sys, os, copy
 import shutil
+import select
+import struct
+import tempfile
+import json
+import threading
 
 sys.path.append("../")
 from backend.gpios import Gpios, GpioInputWatcher
+from backend.gpioinputscanner import GpioInputScanner
+from backend.gpioedgescanner import GpioEdgeScanner
+from backend.gpiomemory import GpioMemory
+from backend.gpioasyncengine import GpioAsyncEngine
+from backend.gpioeventdispatcher import GpioEventDispatcher
+from backend.gpiodevicesindex import GpioDevicesIndex
+from backend.gpiostatewriter import GpioStateWriter
+from backend.gpiostatestore import GpioStateStore
+from backend.gpiostatejournal import GpioStateJournal
+from backend.gpiodevicelocks import GpioDeviceLocks
+from backend.gpiotimerscheduler import GpioTimerScheduler
+from backend.gpiopwmengine import GpioPwmEngine
 from backend.gpiosgpioonevent import GpiosGpioOnEvent
 from backend.gpiosgpiooffevent import GpiosGpioOffEvent
 from cleep.exception import (
@@ -16,7 +33,7 @@ from cleep.exception import (
     Unauthorized,
 )
 import RPi.GPIO as GPIO
-from unittest.mock import Mock, patch
+from unittest.mock import Mock, patch, call
 from cleep.libs.tests.common import get_log_level
 
 LOG_LEVEL = get_log_level()
@@ -59,51 +76,1541 @@ class TestGpioInputWatcher(unittest.TestCase):
         except:
             self.assertFalse(True, "Thread should properly stop")
 
+    def test_stop_is_immediate(self):
+        self.w._get_input_level = Mock(return_value=GPIO.HIGH)
+        self.w.period = 5.0
+        self.w.start()
+        time.sleep(0.1)
+
+        started_at = time.monotonic()
+        self.w.stop()
+        self.w.join(1.0)
+
+        self.assertFalse(self.w.is_alive())
+        self.assertLess(time.monotonic() - started_at, 0.5)
+
+    def test_process_after_stop(self):
+        self.w.stop()
+
+        self.w.process(GPIO.LOW, 10.0)
+        self.w.process(GPIO.HIGH, 11.0)
+
+        self.assertEqual(self.on_cb_count, 0)
+        self.assertEqual(self.off_cb_count, 0)
+
     def test_initial_level_on(self):
         w = GpioInputWatcher(
             7, "123-456-789-123", self.__on_callback, self.__off_callback, GPIO.HIGH
         )
-        w._get_input_level = Mock(return_value=GPIO.HIGH)
-        w.start()
-        time.sleep(0.25)
-        self.assertEqual(self.on_cb_count, 1)
-        self.assertEqual(self.off_cb_count, 0)
-        w.stop()
-        w.join()
+        w._get_input_level = Mock(return_value=GPIO.HIGH)
+        w.start()
+        time.sleep(0.25)
+        self.assertEqual(self.on_cb_count, 1)
+        self.assertEqual(self.off_cb_count, 0)
+        w.stop()
+        w.join()
+
+    def test_initial_level_off(self):
+        w = GpioInputWatcher(
+            7, "123-456-789-123", self.__on_callback, self.__off_callback, GPIO.LOW
+        )
+        w._get_input_level = Mock(return_value=GPIO.HIGH)
+        w.start()
+        time.sleep(0.25)
+        self.assertEqual(self.on_cb_count, 0)
+        self.assertEqual(self.off_cb_count, 1)
+        w.stop()
+        w.join()
+
+    def test_callbacks(self):
+        self.w._get_input_level = Mock(return_value=GPIO.LOW)
+        self.w.start()
+        time.sleep(0.5)
+        self.assertEqual(self.on_cb_count, 1)
+        self.assertEqual(self.off_cb_count, 0)
+
+        self.w._get_input_level.return_value = GPIO.HIGH
+        time.sleep(0.5)
+        self.assertEqual(self.on_cb_count, 1)
+        self.assertEqual(self.off_cb_count, 1)
+
+        self.w._get_input_level.return_value = GPIO.LOW
+        time.sleep(0.5)
+        self.assertEqual(self.on_cb_count, 2)
+        self.assertEqual(self.off_cb_count, 1)
+
+        self.w._get_input_level.return_value = GPIO.HIGH
+        time.sleep(0.5)
+        self.assertEqual(self.on_cb_count, 2)
+        self.assertEqual(self.off_cb_count, 2)
+
+    def test_process_debounce(self):
+        self.w.debounce = 0.2
+        self.w.process(GPIO.HIGH, 10.0)
+        self.assertEqual(self.off_cb_count, 1)
+
+        # level change is pending
+        self.w.process(GPIO.LOW, 11.0)
+        self.assertEqual(self.on_cb_count, 0)
+        self.assertAlmostEqual(self.w.deadline(), 11.2)
+
+        # level still pending
+        self.w.process(GPIO.LOW, 11.1)
+        self.assertEqual(self.on_cb_count, 0)
+
+        # level confirmed
+        self.w.process(GPIO.LOW, 11.25)
+        self.assertEqual(self.on_cb_count, 1)
+        self.assertIsNone(self.w.deadline())
+
+    def test_process_bounce_dropped(self):
+        self.w.debounce = 0.2
+        self.w.process(GPIO.HIGH, 10.0)
+
+        self.w.process(GPIO.LOW, 11.0)
+        self.w.process(GPIO.HIGH, 11.05)
+        self.w.process(GPIO.HIGH, 12.0)
+
+        self.assertEqual(self.on_cb_count, 0)
+        self.assertEqual(self.off_cb_count, 1)
+        self.assertIsNone(self.w.deadline())
+
+    def test_process_duration(self):
+        durations = []
+        self.w.off_callback = lambda uuid, duration: durations.append(duration)
+        self.w.debounce = 0.2
+        self.w.process(GPIO.HIGH, 10.0)
+
+        self.w.process(GPIO.LOW, 11.0)
+        self.w.process(GPIO.LOW, 11.3)
+        # release during debounce window of sampling
+        self.w.process(GPIO.HIGH, 11.5)
+        self.w.process(GPIO.HIGH, 11.9)
+
+        self.assertAlmostEqual(durations[-1], 0.5)
+
+    def test_configure_keeps_state(self):
+        durations = []
+        self.w.off_callback = lambda uuid, duration: durations.append(duration)
+        self.w.debounce = 0.2
+        self.w.process(GPIO.HIGH, 10.0)
+        self.w.process(GPIO.LOW, 11.0)
+        self.w.process(GPIO.LOW, 11.3)
+        self.assertEqual(self.on_cb_count, 1)
+
+        self.w.configure(debounce=0.05, period=0.01, max_period=0.5)
+
+        self.assertEqual(self.w.debounce, 0.05)
+        self.assertEqual(self.w.period, 0.01)
+        self.assertEqual(self.w.max_period, 0.5)
+        # no initial value sent again
+        self.w.process(GPIO.LOW, 12.0)
+        self.assertEqual(self.on_cb_count, 1)
+        self.assertEqual(len(durations), 1)
+        # on timestamp is kept
+        self.w.process(GPIO.HIGH, 13.0)
+        self.w.process(GPIO.HIGH, 13.1)
+        self.assertAlmostEqual(durations[-1], 2.0)
+
+    def test_configure_disable_adaptive_period(self):
+        self.w.configure(max_period=0.5)
+        self.assertEqual(self.w.max_period, 0.5)
+
+        self.w.configure(max_period=0)
+
+        self.assertIsNone(self.w.max_period)
+
+    def test_configure_level(self):
+        self.w.process(GPIO.HIGH, 10.0)
+        self.assertEqual(self.off_cb_count, 1)
+
+        self.w.configure(level=GPIO.HIGH)
+
+        self.assertEqual(self.w.level, GPIO.HIGH)
+        self.assertEqual(self.on_cb_count, 1)
+        self.w.configure(level=GPIO.HIGH)
+        self.assertEqual(self.on_cb_count, 1)
+
+    def test_configure_level_before_first_sample(self):
+        self.w.configure(level=GPIO.HIGH)
+
+        self.assertEqual(self.on_cb_count, 0)
+        self.assertEqual(self.off_cb_count, 0)
+
+    def test_adaptive_period(self):
+        self.w.period = 0.01
+        self.w.max_period = 0.5
+        self.w.debounce = 0
+        self.w.process(GPIO.HIGH, 10.0)
+        self.assertEqual(self.w.current_period, 0.01)
+
+        # idle input slows down sampling
+        periods = []
+        for i in range(20):
+            self.w.process(GPIO.HIGH, 11.0 + i)
+            periods.append(self.w.current_period)
+        self.assertEqual(periods, sorted(periods))
+        self.assertGreater(periods[1], periods[0])
+        self.assertEqual(periods[-1], 0.5)
+
+        # activity gets back to fast sampling
+        self.w.process(GPIO.LOW, 40.0)
+        self.assertEqual(self.w.current_period, 0.01)
+        self.assertEqual(self.on_cb_count, 1)
+
+    def test_adaptive_period_disabled(self):
+        self.w.period = 0.01
+        self.w.process(GPIO.HIGH, 10.0)
+
+        for i in range(20):
+            self.w.process(GPIO.HIGH, 11.0 + i)
+
+        self.assertEqual(self.w.current_period, 0.01)
+
+
+class TestGpioInputScanner(unittest.TestCase):
+
+    def setUp(self):
+        logging.basicConfig(
+            level=LOG_LEVEL,
+            format="%(asctime)s %(name)s:%(lineno)d %(levelname)s : %(message)s",
+        )
+        self.session = session.TestSession(self)
+
+        self.s = GpioInputScanner()
+        self.on_cb_uuids = []
+        self.off_cb_uuids = []
+
+    def tearDown(self):
+        if self.s.is_alive():
+            self.s.stop()
+            self.s.join()
+        self.session.clean()
+
+    def __on_callback(self, uuid):
+        self.on_cb_uuids.append(uuid)
+
+    def __off_callback(self, uuid, duration):
+        self.off_cb_uuids.append(uuid)
+
+    def _get_watcher(self, pin, uuid, level=GPIO.LOW):
+        w = GpioInputWatcher(
+            pin, uuid, self.__on_callback, self.__off_callback, GPIO.HIGH
+        )
+        w._get_input_level = Mock(return_value=level)
+        w.period = 0.05
+        return w
+
+    def test_register(self):
+        w1 = self._get_watcher(7, "uuid1", GPIO.HIGH)
+        w2 = self._get_watcher(11, "uuid2", GPIO.LOW)
+
+        self.s.register(w1)
+        self.s.register(w2)
+
+        self.assertDictEqual(self.s.get_watchers(), {"uuid1": w1, "uuid2": w2})
+        self.assertFalse(w1.is_alive())
+        self.assertFalse(w2.is_alive())
+
+    def test_unregister(self):
+        w1 = self._get_watcher(7, "uuid1")
+        self.s.register(w1)
+
+        self.assertEqual(self.s.unregister("uuid1"), w1)
+        self.assertIsNone(self.s.unregister("uuid1"))
+        self.assertDictEqual(self.s.get_watchers(), {})
+
+    def test_scan(self):
+        w1 = self._get_watcher(7, "uuid1", GPIO.HIGH)
+        w2 = self._get_watcher(11, "uuid2", GPIO.LOW)
+        self.s.register(w1)
+        self.s.register(w2)
+
+        self.s.scan()
+
+        self.assertListEqual(self.on_cb_uuids, ["uuid1"])
+        self.assertListEqual(self.off_cb_uuids, ["uuid2"])
+        w1._get_input_level.assert_called_once()
+        w2._get_input_level.assert_called_once()
+
+    def test_run(self):
+        w1 = self._get_watcher(7, "uuid1", GPIO.LOW)
+        self.s.register(w1)
+        self.s.start()
+        time.sleep(0.2)
+        self.assertListEqual(self.off_cb_uuids, ["uuid1"])
+
+        w1._get_input_level.return_value = GPIO.HIGH
+        time.sleep(0.4)
+        self.assertListEqual(self.on_cb_uuids, ["uuid1"])
+
+        self.s.unregister("uuid1")
+        w1._get_input_level.return_value = GPIO.LOW
+        time.sleep(0.4)
+        self.assertListEqual(self.off_cb_uuids, ["uuid1"])
+
+    def test_run_watchers_periods(self):
+        w1 = self._get_watcher(7, "uuid1", GPIO.LOW)
+        w1.period = 0.01
+        w2 = self._get_watcher(11, "uuid2", GPIO.LOW)
+        w2.period = 0.5
+        self.s.register(w1)
+        self.s.register(w2)
+        self.s.start()
+        time.sleep(0.3)
+
+        self.assertGreater(w1._get_input_level.call_count, 10)
+        self.assertEqual(w2._get_input_level.call_count, 1)
+
+    def test_scan_with_memory(self):
+        memory = Mock()
+        memory.read_levels.return_value = 1 << 18
+        self.s.memory = memory
+        w1 = self._get_watcher(12, "uuid1", GPIO.LOW)
+        w1.line = 18
+        w2 = self._get_watcher(11, "uuid2", GPIO.LOW)
+        w2.line = 17
+        self.s.register(w1)
+        self.s.register(w2)
+
+        self.s.scan()
+
+        memory.read_levels.assert_called_once()
+        w1._get_input_level.assert_not_called()
+        w2._get_input_level.assert_not_called()
+        self.assertListEqual(self.on_cb_uuids, ["uuid1"])
+        self.assertListEqual(self.off_cb_uuids, ["uuid2"])
+
+    def test_scan_with_closed_memory(self):
+        memory = Mock()
+        memory.read_levels.return_value = None
+        self.s.memory = memory
+        w1 = self._get_watcher(12, "uuid1", GPIO.HIGH)
+        w1.line = 18
+        self.s.register(w1)
+
+        self.s.scan()
+
+        w1._get_input_level.assert_called_once()
+        self.assertListEqual(self.on_cb_uuids, ["uuid1"])
+
+    def test_scan_delay(self):
+        self.assertIsNone(self.s.scan())
+
+        w1 = self._get_watcher(7, "uuid1", GPIO.LOW)
+        w1.period = 0.5
+        self.s.register(w1)
+        delay = self.s.scan()
+        self.assertGreater(delay, 0.4)
+        self.assertLessEqual(delay, 0.5)
+
+        # level change pending, next scan at debounce deadline
+        w1.debounce = 0.1
+        w1._get_input_level.return_value = GPIO.HIGH
+        w1.process(GPIO.HIGH, time.monotonic())
+        self.s.register(w1)
+        self.assertLessEqual(self.s.scan(), 0.1)
+
+    def test_reschedule(self):
+        w1 = self._get_watcher(7, "uuid1", GPIO.LOW)
+        w1.period = 10.0
+        self.s.register(w1)
+        self.s.start()
+        time.sleep(0.1)
+        self.assertEqual(w1._get_input_level.call_count, 1)
+
+        w1.configure(period=0.01)
+        self.s.reschedule("uuid1")
+        self.s.reschedule("unknown")
+        time.sleep(0.2)
+
+        self.assertGreater(w1._get_input_level.call_count, 5)
+        self.assertListEqual(self.off_cb_uuids, ["uuid1"])
+
+    def test_stop(self):
+        self.s.start()
+        self.s.stop()
+        self.s.join(1.0)
+        self.assertFalse(self.s.is_alive())
+
+
+class TestGpioMemory(unittest.TestCase):
+
+    def setUp(self):
+        logging.basicConfig(
+            level=LOG_LEVEL,
+            format="%(asctime)s %(name)s:%(lineno)d %(levelname)s : %(message)s",
+        )
+        self.session = session.TestSession(self)
+
+        fd, self.path = tempfile.mkstemp()
+        os.write(fd, bytes(GpioMemory.BLOCK_SIZE))
+        os.close(fd)
+        self.m = GpioMemory(self.path)
+
+    def tearDown(self):
+        self.m.close()
+        os.remove(self.path)
+        self.session.clean()
+
+    def set_register(self, offset, value):
+        with open(self.path, "r+b") as fd:
+            fd.seek(offset)
+            fd.write(struct.pack("<I", value))
+
+    def test_open(self):
+        self.assertTrue(self.m.open())
+        self.assertTrue(self.m.is_opened())
+
+    def test_open_unavailable(self):
+        m = GpioMemory("/dummy/gpiomem")
+
+        self.assertFalse(m.open())
+        self.assertFalse(m.is_opened())
+        self.assertIsNone(m.read_levels())
+
+    def test_read_levels(self):
+        self.set_register(GpioMemory.GPLEV0, (1 << 4) | (1 << 17))
+        self.set_register(GpioMemory.GPLEV1, 1 << 1)
+        self.m.open()
+
+        levels = self.m.read_levels()
+
+        self.assertEqual(levels, (1 << 4) | (1 << 17) | (1 << 33))
+
+        # memory is shared, registers changes are seen without reopening
+        self.set_register(GpioMemory.GPLEV0, 1 << 18)
+        self.assertEqual(self.m.read_levels(), (1 << 18) | (1 << 33))
+
+    def get_register(self, offset):
+        with open(self.path, "rb") as fd:
+            fd.seek(offset)
+            return struct.unpack("<I", fd.read(4))[0]
+
+    def test_write_levels(self):
+        self.m.open()
+
+        self.assertTrue(
+            self.m.write_levels((1 << 18) | (1 << 40), (1 << 4) | (1 << 23))
+        )
+
+        self.assertEqual(self.get_register(GpioMemory.GPSET0), 1 << 18)
+        self.assertEqual(self.get_register(GpioMemory.GPSET1), 1 << 8)
+        self.assertEqual(self.get_register(GpioMemory.GPCLR0), (1 << 4) | (1 << 23))
+        self.assertEqual(self.get_register(GpioMemory.GPCLR1), 0)
+
+    def test_write_levels_not_opened(self):
+        self.assertFalse(self.m.write_levels(1 << 18, 0))
+
+        self.assertEqual(self.get_register(GpioMemory.GPSET0), 0)
+
+    def test_close(self):
+        self.m.open()
+
+        self.m.close()
+
+        self.assertFalse(self.m.is_opened())
+        self.assertIsNone(self.m.read_levels())
+
+
+class PipeEdgeSource:
+    """
+    Edge events source driven by pipes
+    """
+
+    POLL_EVENTS = select.POLLIN
+
+    def __init__(self):
+        self.writers = {}
+        self.levels = {}
+        self.closed = []
+
+    def is_available(self):
+        return True
+
+    def open(self, line):
+        if line == 99:
+            raise Exception("Line unavailable")
+        read_fd, write_fd = os.pipe()
+        self.writers[line] = write_fd
+        self.levels[read_fd] = GPIO.LOW
+        return read_fd
+
+    def read_level(self, fd):
+        return self.levels[fd]
+
+    def read_event(self, fd):
+        self.levels[fd] = int(os.read(fd, 1))
+        return self.levels[fd], time.monotonic()
+
+    def close(self, fd):
+        self.closed.append(fd)
+        os.close(fd)
+
+    def edge(self, line, level):
+        os.write(self.writers[line], b"1" if level else b"0")
+
+
+class TestGpioEdgeScanner(unittest.TestCase):
+
+    def setUp(self):
+        logging.basicConfig(
+            level=LOG_LEVEL,
+            format="%(asctime)s %(name)s:%(lineno)d %(levelname)s : %(message)s",
+        )
+        self.session = session.TestSession(self)
+
+        self.source = PipeEdgeSource()
+        self.s = GpioEdgeScanner(self.source)
+        self.on_cb_uuids = []
+        self.off_cb_uuids = []
+
+    def tearDown(self):
+        if self.s.is_alive():
+            self.s.stop()
+            self.s.join()
+        self.session.clean()
+
+    def __on_callback(self, uuid):
+        self.on_cb_uuids.append(uuid)
+
+    def __off_callback(self, uuid, duration):
+        self.off_cb_uuids.append((uuid, duration))
+
+    def _get_watcher(self, line, uuid, debounce=0):
+        w = GpioInputWatcher(
+            7, uuid, self.__on_callback, self.__off_callback, GPIO.HIGH, line=line
+        )
+        w._get_input_level = Mock(side_effect=Exception("Input must not be polled"))
+        w.debounce = debounce
+        return w
+
+    def test_register(self):
+        w = self._get_watcher(4, "uuid1")
+
+        self.assertTrue(self.s.register(w))
+
+        self.assertDictEqual(self.s.get_watchers(), {"uuid1": w})
+        self.assertTrue(4 in self.source.writers)
+
+    def test_register_unavailable_line(self):
+        self.assertFalse(self.s.register(self._get_watcher(99, "uuid1")))
+        self.assertFalse(self.s.register(self._get_watcher(None, "uuid2")))
+
+        self.assertDictEqual(self.s.get_watchers(), {})
+
+    def test_unregister(self):
+        w = self._get_watcher(4, "uuid1")
+        self.s.register(w)
+        self.s.start()
+        time.sleep(0.1)
+
+        self.assertEqual(self.s.unregister("uuid1"), w)
+        time.sleep(0.1)
+
+        self.assertIsNone(self.s.unregister("uuid1"))
+        self.assertEqual(len(self.source.closed), 1)
+        self.assertListEqual(self.on_cb_uuids, [])
+
+    def test_edges(self):
+        self.s.register(self._get_watcher(4, "uuid1"))
+        self.s.register(self._get_watcher(17, "uuid2"))
+        self.s.start()
+        time.sleep(0.1)
+        self.assertCountEqual([uuid for uuid, _ in self.off_cb_uuids], ["uuid1", "uuid2"])
+
+        self.source.edge(17, GPIO.HIGH)
+        time.sleep(0.1)
+        self.assertListEqual(self.on_cb_uuids, ["uuid2"])
+
+        self.source.edge(17, GPIO.LOW)
+        time.sleep(0.1)
+        self.assertEqual(self.off_cb_uuids[-1][0], "uuid2")
+
+    def test_short_pulse(self):
+        self.s.register(self._get_watcher(4, "uuid1"))
+        self.s.start()
+        time.sleep(0.1)
+
+        self.source.edge(4, GPIO.HIGH)
+        time.sleep(0.01)
+        self.source.edge(4, GPIO.LOW)
+        time.sleep(0.1)
+
+        self.assertListEqual(self.on_cb_uuids, ["uuid1"])
+        self.assertEqual(len(self.off_cb_uuids), 2)
+        self.assertLess(self.off_cb_uuids[-1][1], 0.1)
+
+    def test_short_pulse_within_debounce(self):
+        self.s.register(self._get_watcher(4, "uuid1", debounce=0.1))
+        self.s.start()
+        time.sleep(0.1)
+
+        self.source.edge(4, GPIO.HIGH)
+        time.sleep(0.01)
+        self.source.edge(4, GPIO.LOW)
+        time.sleep(0.3)
+
+        self.assertListEqual(self.on_cb_uuids, [])
+        self.assertEqual(len(self.off_cb_uuids), 1)
+
+    def test_edge_confirmed_after_debounce(self):
+        self.s.register(self._get_watcher(4, "uuid1", debounce=0.1))
+        self.s.start()
+        time.sleep(0.1)
+
+        self.source.edge(4, GPIO.HIGH)
+        time.sleep(0.05)
+        self.assertListEqual(self.on_cb_uuids, [])
+        time.sleep(0.1)
+        self.assertListEqual(self.on_cb_uuids, ["uuid1"])
+
+    def test_stop(self):
+        self.s.register(self._get_watcher(4, "uuid1"))
+        self.s.start()
+        time.sleep(0.1)
+
+        self.s.stop()
+        self.s.join(1.0)
+
+        self.assertFalse(self.s.is_alive())
+        self.assertEqual(len(self.source.closed), 1)
+
+
+class TestGpioAsyncEngine(unittest.TestCase):
+
+    def setUp(self):
+        logging.basicConfig(
+            level=LOG_LEVEL,
+            format="%(asctime)s %(name)s:%(lineno)d %(levelname)s : %(message)s",
+        )
+        self.session = session.TestSession(self)
+
+        self.outputs = Mock()
+        self.outputs.turn_on.return_value = True
+        self.outputs.turn_off.return_value = True
+        self.source = PipeEdgeSource()
+        self.e = None
+        self.on_cb_uuids = []
+        self.off_cb_uuids = []
+
+    def tearDown(self):
+        if self.e and self.e.is_alive():
+            self.e.stop()
+            self.e.join()
+        self.session.clean()
+
+    def __on_callback(self, uuid):
+        self.on_cb_uuids.append(uuid)
+
+    def __off_callback(self, uuid, duration):
+        self.off_cb_uuids.append(uuid)
+
+    def _init(self, source=None):
+        self.e = GpioAsyncEngine(self.outputs, source)
+        self.e.start()
+
+    def _get_watcher(self, line, uuid, level=GPIO.LOW, debounce=0):
+        w = GpioInputWatcher(
+            7, uuid, self.__on_callback, self.__off_callback, GPIO.HIGH, line=line
+        )
+        w._get_input_level = Mock(return_value=level)
+        w.debounce = debounce
+        w.period = 0.01
+        return w
+
+    def test_poll_inputs(self):
+        self._init()
+        w1 = self._get_watcher(4, "uuid1", GPIO.LOW)
+        w2 = self._get_watcher(17, "uuid2", GPIO.HIGH)
+
+        self.e.register(w1)
+        self.e.register(w2)
+        time.sleep(0.1)
+        self.assertListEqual(self.off_cb_uuids, ["uuid1"])
+        self.assertListEqual(self.on_cb_uuids, ["uuid2"])
+
+        w1._get_input_level.return_value = GPIO.HIGH
+        time.sleep(0.1)
+        self.assertListEqual(self.on_cb_uuids, ["uuid2", "uuid1"])
+        self.assertDictEqual(self.e.get_watchers(), {"uuid1": w1, "uuid2": w2})
+
+    def test_unregister(self):
+        self._init()
+        w1 = self._get_watcher(4, "uuid1", GPIO.LOW)
+        self.e.register(w1)
+        time.sleep(0.1)
+
+        self.assertEqual(self.e.unregister("uuid1"), w1)
+        self.assertIsNone(self.e.unregister("uuid1"))
+        time.sleep(0.05)
+        count = w1._get_input_level.call_count
+        time.sleep(0.1)
+
+        self.assertEqual(w1._get_input_level.call_count, count)
+
+    def test_edge_inputs(self):
+        self._init(self.source)
+        w1 = self._get_watcher(4, "uuid1", debounce=0.05)
+        w1._get_input_level.side_effect = Exception("Input must not be polled")
+
+        self.e.register(w1)
+        time.sleep(0.1)
+        self.assertListEqual(self.off_cb_uuids, ["uuid1"])
+
+        self.source.edge(4, GPIO.HIGH)
+        time.sleep(0.02)
+        self.assertListEqual(self.on_cb_uuids, [])
+        time.sleep(0.1)
+        self.assertListEqual(self.on_cb_uuids, ["uuid1"])
+
+        self.e.unregister("uuid1")
+        time.sleep(0.05)
+        self.assertEqual(len(self.source.closed), 1)
+
+    def test_edge_unavailable_fallback_to_polling(self):
+        self._init(self.source)
+        w1 = self._get_watcher(99, "uuid1", GPIO.HIGH)
+
+        self.e.register(w1)
+        time.sleep(0.1)
+
+        self.assertListEqual(self.on_cb_uuids, ["uuid1"])
+        self.assertGreater(w1._get_input_level.call_count, 1)
+
+    def test_turn_on_turn_off(self):
+        self._init()
+
+        self.assertTrue(self.e.submit(self.e.turn_on("uuid1")).result(1.0))
+        self.assertTrue(self.e.submit(self.e.turn_off("uuid1")).result(1.0))
+
+        self.outputs.turn_on.assert_called_with("uuid1")
+        self.outputs.turn_off.assert_called_with("uuid1")
+
+    def test_call_later(self):
+        self._init()
+        callback = Mock(return_value=42)
+
+        future = self.e.call_later(0.05, callback, "arg")
+
+        self.assertEqual(future.result(1.0), 42)
+        callback.assert_called_once_with("arg")
+
+    def test_call_later_cancel(self):
+        self._init()
+        callback = Mock()
+
+        future = self.e.call_later(0.05, callback)
+        future.cancel()
+        time.sleep(0.1)
+
+        callback.assert_not_called()
+
+    def test_stop(self):
+        self._init(self.source)
+        self.e.register(self._get_watcher(4, "uuid1"))
+        time.sleep(0.05)
+
+        self.e.stop()
+        self.e.join(1.0)
+
+        self.assertFalse(self.e.is_alive())
+        self.assertEqual(len(self.source.closed), 1)
+
+
+class TestGpioEventDispatcher(unittest.TestCase):
+
+    def setUp(self):
+        logging.basicConfig(
+            level=LOG_LEVEL,
+            format="%(asctime)s %(name)s:%(lineno)d %(levelname)s : %(message)s",
+        )
+        self.session = session.TestSession(self)
+
+        self.on_callback = Mock()
+        self.off_callback = Mock()
+        self.d = GpioEventDispatcher(self.on_callback, self.off_callback, depth=4)
+
+    def tearDown(self):
+        if self.d.is_alive():
+            self.d.stop()
+            self.d.join()
+        self.session.clean()
+
+    def test_dispatch(self):
+        self.d.start()
+
+        self.d.on("uuid1")
+        self.d.off("uuid1", 1.5)
+        time.sleep(0.1)
+
+        self.on_callback.assert_called_once_with("uuid1")
+        self.off_callback.assert_called_once_with("uuid1", 1.5)
+        self.assertEqual(self.d.get_stats()["dispatched"], 2)
+
+    def test_push_doesnt_wait_for_callbacks(self):
+        self.on_callback.side_effect = lambda uuid: time.sleep(0.5)
+        self.d.start()
+
+        started_at = time.monotonic()
+        for _ in range(4):
+            self.d.on("uuid1")
+
+        self.assertLess(time.monotonic() - started_at, 0.1)
+
+    def test_push_queue_full(self):
+        for _ in range(4):
+            self.assertTrue(self.d.push("uuid1", True))
+
+        self.assertFalse(self.d.push("uuid1", True))
+
+        self.assertDictEqual(
+            self.d.get_stats(),
+            {"depth": 4, "size": 4, "high_water": 4, "dropped": 1, "dispatched": 0},
+        )
+
+    def test_high_water(self):
+        self.d.push("uuid1", True)
+        self.d.push("uuid1", False, 1.0)
+        self.d.start()
+        time.sleep(0.1)
+
+        stats = self.d.get_stats()
+        self.assertEqual(stats["high_water"], 2)
+        self.assertEqual(stats["size"], 0)
+
+    def test_set_depth(self):
+        self.d.set_depth(16)
+
+        self.assertEqual(self.d.get_stats()["depth"], 16)
+
+    def test_callback_exception(self):
+        self.on_callback.side_effect = Exception("Test exception")
+        self.d.start()
+
+        self.d.on("uuid1")
+        self.d.off("uuid1", 1.0)
+        time.sleep(0.1)
+
+        self.off_callback.assert_called_once_with("uuid1", 1.0)
+
+    def test_stop(self):
+        self.d.start()
+        self.d.stop()
+        self.d.join(1.0)
+        self.assertFalse(self.d.is_alive())
+
+    def test_stop_queue_full(self):
+        self.on_callback.side_effect = lambda uuid: time.sleep(0.1)
+        self.d.start()
+        for _ in range(5):
+            self.d.on("uuid1")
+
+        self.d.stop()
+        self.d.join(1.0)
+
+        self.assertFalse(self.d.is_alive())
+        self.assertLess(self.on_callback.call_count, 5)
+
+
+class TestGpioDevicesIndex(unittest.TestCase):
+
+    def setUp(self):
+        logging.basicConfig(
+            level=LOG_LEVEL,
+            format="%(asctime)s %(name)s:%(lineno)d %(levelname)s : %(message)s",
+        )
+        self.session = session.TestSession(self)
+
+        self.i = GpioDevicesIndex()
+
+    def tearDown(self):
+        self.session.clean()
+
+    def get_device(self, uuid, name, gpio, pin, subtype="input"):
+        return {
+            "uuid": uuid,
+            "name": name,
+            "gpio": gpio,
+            "pin": pin,
+            "subtype": subtype,
+        }
+
+    def test_add(self):
+        self.i.add(self.get_device("uuid1", "name1", "GPIO18", 12))
+        self.i.add(self.get_device("uuid2", "name2", "GPIO17", 11))
+
+        self.assertListEqual(self.i.get("gpio", "GPIO18"), ["uuid1"])
+        self.assertListEqual(self.i.get("name", "name2"), ["uuid2"])
+        self.assertListEqual(self.i.get("pin", 11), ["uuid2"])
+        self.assertListEqual(self.i.get("subtype", "input"), ["uuid1", "uuid2"])
+        self.assertListEqual(self.i.get("gpio", "GPIO4"), [])
+
+    def test_add_existing_device(self):
+        self.i.add(self.get_device("uuid1", "name1", "GPIO18", 12))
+
+        self.i.add(self.get_device("uuid1", "newname", "GPIO18", 12, "output"))
+
+        self.assertListEqual(self.i.get("name", "name1"), [])
+        self.assertListEqual(self.i.get("name", "newname"), ["uuid1"])
+        self.assertListEqual(self.i.get("subtype", "input"), [])
+        self.assertListEqual(self.i.get("subtype", "output"), ["uuid1"])
+
+    def test_remove(self):
+        self.i.add(self.get_device("uuid1", "name1", "GPIO18", 12))
+
+        self.i.remove("uuid1")
+        self.i.remove("uuid1")
+
+        for key, value in (("gpio", "GPIO18"), ("name", "name1"), ("pin", 12)):
+            self.assertListEqual(self.i.get(key, value), [])
+
+    def test_rebuild(self):
+        self.i.add(self.get_device("uuid1", "name1", "GPIO18", 12))
+
+        self.i.rebuild({"uuid2": self.get_device("uuid2", "name2", "GPIO17", 11)})
+
+        self.assertListEqual(self.i.get("gpio", "GPIO18"), [])
+        self.assertListEqual(self.i.get("gpio", "GPIO17"), ["uuid2"])
+
+    def test_is_indexed(self):
+        self.assertTrue(self.i.is_indexed("gpio"))
+        self.assertFalse(self.i.is_indexed("mode"))
+
+
+class TestGpioStateWriter(unittest.TestCase):
+
+    def setUp(self):
+        logging.basicConfig(
+            level=LOG_LEVEL,
+            format="%(asctime)s %(name)s:%(lineno)d %(levelname)s : %(message)s",
+        )
+        self.session = session.TestSession(self)
+
+        self.write_callback = Mock(return_value=True)
+        self.w = GpioStateWriter(self.write_callback, interval=0.1, max_staleness=0.3)
+
+    def tearDown(self):
+        if self.w.is_alive():
+            self.w.stop()
+            self.w.join()
+        self.session.clean()
+
+    def test_flush(self):
+        self.w.mark("uuid1", True)
+        self.w.mark("uuid2", True)
+        self.w.mark("uuid1", False)
+
+        self.assertTrue(self.w.flush())
+
+        self.write_callback.assert_called_once_with({"uuid1": False, "uuid2": True})
+        stats = self.w.get_stats()
+        self.assertEqual(stats["pending"], 0)
+        self.assertEqual(stats["changes"], 3)
+        self.assertEqual(stats["writes"], 1)
+        self.assertEqual(stats["writes_saved"], 2)
+
+    def test_mark_states(self):
+        self.w.mark("uuid1", True)
+        self.w.mark_states({"uuid1": False, "uuid2": True, "uuid3": False})
+
+        self.assertDictEqual(
+            self.w.get_dirty(), {"uuid1": False, "uuid2": True, "uuid3": False}
+        )
+        self.assertEqual(self.w.get_stats()["changes"], 4)
+        self.assertIsNotNone(self.w.get_delay())
+
+    def test_flush_nothing_dirty(self):
+        self.assertTrue(self.w.flush())
+
+        self.write_callback.assert_not_called()
+
+    def test_flush_failed(self):
+        self.write_callback.return_value = False
+        self.w.mark("uuid1", True)
+
+        self.assertFalse(self.w.flush())
+
+        self.assertDictEqual(self.w.get_dirty(), {"uuid1": True})
+        self.assertEqual(self.w.get_stats()["failures"], 1)
+
+    def test_flush_failed_keeps_newer_states(self):
+        def write(states):
+            self.w.mark("uuid1", False)
+            return False
+
+        self.write_callback.side_effect = write
+        self.w.mark("uuid1", True)
+        self.w.mark("uuid2", True)
+
+        self.w.flush()
+
+        self.assertDictEqual(self.w.get_dirty(), {"uuid1": False, "uuid2": True})
+
+    def test_discard(self):
+        self.w.mark("uuid1", True)
+
+        self.w.discard("uuid1")
+
+        self.assertDictEqual(self.w.get_dirty(), {})
+
+    def test_get_delay(self):
+        self.assertIsNone(self.w.get_delay())
+
+        self.w.mark("uuid1", True)
+
+        self.assertGreater(self.w.get_delay(), 0.05)
+        self.assertLessEqual(self.w.get_delay(), 0.1)
+
+    def test_run_coalesces_burst(self):
+        self.w.start()
+
+        for i in range(10):
+            self.w.mark("uuid1", bool(i % 2))
+            time.sleep(0.01)
+        time.sleep(0.25)
+
+        self.write_callback.assert_called_once_with({"uuid1": True})
+        self.assertEqual(self.w.get_stats()["writes_saved"], 9)
+
+    def test_run_max_staleness(self):
+        self.w.start()
+
+        # state changes faster than interval during more than max staleness
+        started_at = time.monotonic()
+        while time.monotonic() - started_at < 0.5:
+            self.w.mark("uuid1", True)
+            time.sleep(0.02)
+
+        self.assertGreaterEqual(self.write_callback.call_count, 1)
+        self.assertLessEqual(self.write_callback.call_count, 2)
+
+    def test_configure(self):
+        self.w.configure(interval=0, max_staleness=1.0)
+        self.w.start()
+
+        self.w.mark("uuid1", True)
+        time.sleep(0.05)
+
+        self.write_callback.assert_called_once_with({"uuid1": True})
+        self.assertEqual(self.w.get_stats()["max_staleness"], 1.0)
+
+    def test_run_maintenance_without_state_change(self):
+        self.w.maintenance_callback = Mock(
+            side_effect=[Exception("Test exception")] + [None] * 10
+        )
+        self.w.maintenance_interval = 0.05
+        self.w.start()
+
+        time.sleep(0.18)
+
+        self.assertGreaterEqual(self.w.maintenance_callback.call_count, 2)
+        self.assertTrue(self.w.is_alive())
+        self.write_callback.assert_not_called()
+
+    def test_stop(self):
+        self.w.start()
+        self.w.mark("uuid1", True)
+
+        self.w.stop()
+        self.w.join(1.0)
+
+        self.assertFalse(self.w.is_alive())
+        self.write_callback.assert_not_called()
+
+
+class TestGpioStateStore(unittest.TestCase):
+
+    def setUp(self):
+        logging.basicConfig(
+            level=LOG_LEVEL,
+            format="%(asctime)s %(name)s:%(lineno)d %(levelname)s : %(message)s",
+        )
+        self.session = session.TestSession(self)
+
+        self.s = GpioStateStore()
+
+    def tearDown(self):
+        self.session.clean()
+
+    def test_set_get(self):
+        self.assertTrue(self.s.set("uuid1", True))
+        self.assertTrue(self.s.set("uuid2", False))
+
+        self.assertTrue(self.s.get("uuid1"))
+        self.assertFalse(self.s.get("uuid2"))
+        self.assertIsNone(self.s.get("uuid3"))
+        self.assertTrue(self.s.get("uuid3", True))
+
+    def test_set_unchanged(self):
+        self.s.set("uuid1", True)
+        generation = self.s.generation
+
+        self.assertFalse(self.s.set("uuid1", True))
+
+        self.assertEqual(self.s.generation, generation)
+
+    def test_mapping(self):
+        self.s["uuid1"] = True
+
+        self.assertTrue(self.s["uuid1"])
+        self.assertTrue("uuid1" in self.s)
+        self.assertEqual(len(self.s), 1)
+        with self.assertRaises(KeyError):
+            self.s["uuid2"]
+        del self.s["uuid1"]
+        self.assertFalse("uuid1" in self.s)
+
+    def test_get_mask(self):
+        self.s.set("uuid1", True)
+        self.s.set("uuid2", False)
+        self.s.set("uuid3", True)
+
+        mask, slots, generation = self.s.get_mask()
+
+        self.assertEqual(mask, 0b101)
+        self.assertDictEqual(slots, {"uuid1": 0, "uuid2": 1, "uuid3": 2})
+        self.assertEqual(generation, 3)
+
+    def test_get_states(self):
+        self.s.set("uuid1", True)
+        self.s.set("uuid2", False)
+        generation, states = self.s.get_states()
+        self.assertDictEqual(states, {"uuid1": True, "uuid2": False})
+
+        self.s.set("uuid2", True)
+        self.s.set("uuid3", False)
+
+        generation, states = self.s.get_states(generation)
+        self.assertDictEqual(states, {"uuid2": True, "uuid3": False})
+        self.assertDictEqual(self.s.get_states(generation)[1], {})
+
+    def test_forget_reuses_slot(self):
+        self.s.set("uuid1", True)
+        self.s.set("uuid2", True)
+
+        self.s.forget("uuid1")
+        self.s.forget("uuid1")
+        self.s.set("uuid3", False)
+
+        mask, slots, _ = self.s.get_mask()
+        self.assertDictEqual(slots, {"uuid2": 1, "uuid3": 0})
+        self.assertEqual(mask, 0b10)
+        self.assertIsNone(self.s.get("uuid1"))
+
+
+class TestGpioStateJournal(unittest.TestCase):
+
+    def setUp(self):
+        logging.basicConfig(
+            level=LOG_LEVEL,
+            format="%(asctime)s %(name)s:%(lineno)d %(levelname)s : %(message)s",
+        )
+        self.session = session.TestSession(self)
+
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, "gpios.journal")
+        self.j = GpioStateJournal(self.path, compact_records=4)
+
+    def tearDown(self):
+        self.j.close()
+        shutil.rmtree(self.dir)
+        self.session.clean()
+
+    def read_file(self):
+        with open(self.path) as journal:
+            return journal.read()
+
+    def test_append_read(self):
+        self.assertTrue(self.j.open())
+
+        self.assertTrue(self.j.append({"uuid1": True, "uuid2": False}))
+        self.assertTrue(self.j.append({"uuid1": False}))
+
+        self.assertEqual(self.read_file(), "uuid1 1\nuuid2 0\nuuid1 0\n")
+        self.assertDictEqual(self.j.read(), {"uuid1": False, "uuid2": False})
+        self.assertDictEqual(
+            self.j.get_stats(),
+            {"enabled": True, "records": 3, "appends": 2, "compactions": 0},
+        )
+
+    def test_append_not_opened(self):
+        self.assertFalse(self.j.append({"uuid1": True}))
+
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_read_no_journal(self):
+        self.assertDictEqual(self.j.read(), {})
+
+    def test_incomplete_record(self):
+        with open(self.path, "w") as journal:
+            journal.write("uuid1 1\nuuid2 1\nuuid3")
+
+        self.assertDictEqual(self.j.read(), {"uuid1": True, "uuid2": True})
+
+        self.j.open()
+        self.j.append({"uuid4": True})
+        self.assertDictEqual(
+            self.j.read(), {"uuid1": True, "uuid2": True, "uuid4": True}
+        )
+        self.assertEqual(self.j.get_stats()["records"], 3)
+
+    def test_needs_compaction(self):
+        self.j.open()
+        self.assertFalse(self.j.needs_compaction())
+
+        self.j.append({"uuid1": True, "uuid2": True, "uuid3": True})
+        self.assertFalse(self.j.needs_compaction())
+        self.j.append({"uuid1": False})
+        self.assertTrue(self.j.needs_compaction())
+
+    def test_needs_compaction_interval(self):
+        self.j = GpioStateJournal(self.path, compact_interval=0.05)
+        self.j.open()
+        self.j.append({"uuid1": True})
+        self.assertFalse(self.j.needs_compaction())
+
+        time.sleep(0.06)
+
+        self.assertTrue(self.j.needs_compaction())
+
+    def test_truncate(self):
+        self.j.open()
+        self.j.append({"uuid1": True})
+
+        self.assertTrue(self.j.truncate())
+        self.j.append({"uuid2": True})
+
+        self.assertEqual(self.read_file(), "uuid2 1\n")
+        stats = self.j.get_stats()
+        self.assertEqual(stats["records"], 1)
+        self.assertEqual(stats["compactions"], 1)
+
+    def test_truncate_closed_journal(self):
+        self.j.open()
+        self.j.append({"uuid1": True})
+        self.j.close()
+
+        self.assertTrue(self.j.truncate())
+
+        self.assertFalse(os.path.exists(self.path))
+        self.assertFalse(self.j.get_stats()["enabled"])
+
+    def test_open_invalid_path(self):
+        self.j = GpioStateJournal(os.path.join(self.dir, "dummy", "gpios.journal"))
+
+        self.assertFalse(self.j.open())
+        self.assertFalse(self.j.is_opened())
+
+
+class TestGpioDeviceLocks(unittest.TestCase):
+
+    def setUp(self):
+        logging.basicConfig(
+            level=LOG_LEVEL,
+            format="%(asctime)s %(name)s:%(lineno)d %(levelname)s : %(message)s",
+        )
+        self.session = session.TestSession(self)
+
+        self.l = GpioDeviceLocks(stripes=4)
+
+    def tearDown(self):
+        self.session.clean()
+
+    def test_same_device_same_lock(self):
+        self.assertEqual(len(self.l), 4)
+        self.assertIs(self.l.get("uuid1"), self.l.get("uuid1"))
+
+    def test_lock_is_reentrant(self):
+        with self.l.get("uuid1"):
+            with self.l.get("uuid1"):
+                pass
+
+    def test_hold_several_devices(self):
+        uuids = ["uuid%d" % i for i in range(10)]
+        acquired = []
+
+        def worker(device_uuid):
+            acquired.append(self.l.get(device_uuid).acquire(timeout=0.05))
+
+        with self.l.hold(uuids + uuids[:2]):
+            threads = [
+                threading.Thread(target=worker, args=(device_uuid,))
+                for device_uuid in uuids
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(acquired, [False] * len(uuids))
+        for device_uuid in uuids:
+            # all locks are released
+            lock = self.l.get(device_uuid)
+            self.assertTrue(lock.acquire(blocking=False))
+            lock.release()
+
+    def test_other_device_not_blocked(self):
+        uuids = ["uuid%d" % i for i in range(20)]
+        uuid1 = uuids[0]
+        uuid2 = next(
+            device_uuid
+            for device_uuid in uuids
+            if self.l.get(device_uuid) is not self.l.get(uuid1)
+        )
+        acquired = []
+
+        def worker(device_uuid):
+            lock = self.l.get(device_uuid)
+            acquired.append((device_uuid, lock.acquire(timeout=0.1)))
+
+        with self.l.get(uuid1):
+            threads = [
+                threading.Thread(target=worker, args=(device_uuid,))
+                for device_uuid in (uuid1, uuid2)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(sorted(acquired), [(uuid1, False), (uuid2, True)])
+
+
+class TestGpioTimerScheduler(unittest.TestCase):
+
+    def setUp(self):
+        logging.basicConfig(
+            level=LOG_LEVEL,
+            format="%(asctime)s %(name)s:%(lineno)d %(levelname)s : %(message)s",
+        )
+        self.session = session.TestSession(self)
+
+        self.s = GpioTimerScheduler()
+        self.fired = []
+        self.done = threading.Event()
+
+    def tearDown(self):
+        self.s.stop()
+        self.session.clean()
+
+    def callback(self, name, last=False):
+        self.fired.append(name)
+        if last:
+            self.done.set()
+
+    def test_timers_fired_in_deadline_order(self):
+        self.s.start()
+
+        self.s.schedule(0.06, self.callback, "third", True)
+        self.s.schedule(0.02, self.callback, "first")
+        self.s.schedule(0.04, self.callback, "second")
+
+        self.assertTrue(self.done.wait(1.0))
+        self.assertEqual(self.fired, ["first", "second", "third"])
+        stats = self.s.get_stats()
+        self.assertEqual(stats["pending"], 0)
+        self.assertEqual(stats["fired"], 3)
+        self.assertGreaterEqual(stats["max_lateness"], 0.0)
+
+    def test_cancel(self):
+        self.s.start()
+
+        timer_id = self.s.schedule(0.02, self.callback, "cancelled")
+        self.s.schedule(0.04, self.callback, "fired", True)
+
+        self.assertTrue(self.s.cancel(timer_id))
+        self.assertFalse(self.s.cancel(timer_id))
+        self.assertTrue(self.done.wait(1.0))
+        self.assertEqual(self.fired, ["fired"])
+        self.assertEqual(self.s.get_stats()["cancelled"], 1)
+
+    def test_cancel_compacts_heap(self):
+        timer_ids = [
+            self.s.schedule(60.0, self.callback, "timer")
+            for _ in range(GpioTimerScheduler.HEAP_COMPACT_SIZE * 2)
+        ]
+
+        for timer_id in timer_ids:
+            self.s.cancel(timer_id)
+
+        self.assertEqual(self.s.get_stats()["pending"], 0)
+        self.assertLessEqual(
+            len(self.s._GpioTimerScheduler__heap), GpioTimerScheduler.HEAP_COMPACT_SIZE
+        )
+
+    def test_earlier_timer_wakes_up_scheduler(self):
+        self.s.start()
+        self.s.schedule(60.0, self.callback, "late")
+        time.sleep(0.01)
+
+        self.s.schedule(0.01, self.callback, "early", True)
+
+        self.assertTrue(self.done.wait(1.0))
+        self.assertEqual(self.fired, ["early"])
+
+    def test_callback_exception_does_not_stop_scheduler(self):
+        self.s.start()
+
+        self.s.schedule(0.01, Mock(side_effect=Exception("Test exception")))
+        self.s.schedule(0.02, self.callback, "fired", True)
+
+        self.assertTrue(self.done.wait(1.0))
+        self.assertEqual(self.fired, ["fired"])
+
+    def test_stop(self):
+        self.s.start()
+        self.s.schedule(0.05, self.callback, "not fired")
+
+        self.s.stop()
+        self.s.join(1.0)
+
+        self.assertFalse(self.s.is_alive())
+        time.sleep(0.1)
+        self.assertEqual(self.fired, [])
+
+
+class TestGpioPwmEngine(unittest.TestCase):
+
+    def setUp(self):
+        logging.basicConfig(
+            level=LOG_LEVEL,
+            format="%(asctime)s %(name)s:%(lineno)d %(levelname)s : %(message)s",
+        )
+        self.session = session.TestSession(self)
+
+        self.writes = []
+        self.e = GpioPwmEngine(self.output)
+
+    def tearDown(self):
+        self.e.stop()
+        self.session.clean()
+
+    def output(self, pin, level):
+        self.writes.append((time.monotonic(), pin, level))
+
+    def get_high_ratio(self, pin):
+        writes = [(timestamp, level) for timestamp, p, level in self.writes if p == pin]
+        high = 0.0
+        for (timestamp, level), (next_timestamp, _) in zip(writes, writes[1:]):
+            if level:
+                high += next_timestamp - timestamp
+        return high / (writes[-1][0] - writes[0][0])
+
+    def test_pwm_signal(self):
+        self.e.start()
+
+        self.e.set_channel(12, 50, 25)
+        time.sleep(0.5)
+        self.e.stop()
+
+        levels = [level for _, pin, level in self.writes]
+        self.assertEqual(levels[0], 1)
+        self.assertTrue(all(levels[i] != levels[i + 1] for i in range(len(levels) - 1)))
+        # 50Hz during 0.5s: about 25 periods (2 edges per period)
+        self.assertGreater(len(levels), 40)
+        self.assertLess(len(levels), 60)
+        self.assertAlmostEqual(self.get_high_ratio(12), 0.25, delta=0.1)
+        stats = self.e.get_stats()
+        self.assertEqual(stats["channels"], 1)
+        self.assertEqual(stats["edges"], len(levels) - 1)
+        self.assertGreaterEqual(stats["max_jitter"], stats["mean_jitter"])
+        self.assertGreaterEqual(stats["mean_jitter"], 0.0)
+
+    def test_several_channels_single_thread(self):
+        threads = threading.active_count()
+        self.e.start()
+
+        self.e.set_channel(12, 50, 50)
+        self.e.set_channel(16, 20, 50, inverted=True)
+        time.sleep(0.3)
+
+        self.assertEqual(threading.active_count(), threads + 1)
+        pins = [pin for _, pin, _ in self.writes]
+        self.assertGreater(pins.count(12), pins.count(16))
+        self.assertEqual([level for _, pin, level in self.writes if pin == 16][0], 0)
+
+    def test_full_and_null_duty_cycles_hold_level(self):
+        self.e.start()
+
+        self.e.set_channel(12, 100, 100)
+        self.e.set_channel(16, 100, 0)
+        time.sleep(0.1)
+
+        self.assertEqual([(pin, level) for _, pin, level in self.writes], [(12, 1), (16, 0)])
+        self.assertEqual(self.e.get_stats()["edges"], 0)
+
+    def test_update_channel(self):
+        self.e.start()
+        self.e.set_channel(12, 100, 50)
+        time.sleep(0.05)
+
+        self.e.set_channel(12, 100, 100)
+        time.sleep(0.01)
+        self.writes.clear()
+        time.sleep(0.05)
+
+        self.assertEqual(self.writes, [])
+        self.assertDictEqual(
+            self.e.get_channels(), {12: {"frequency": 100, "duty": 100, "inverted": False}}
+        )
 
-    def test_initial_level_off(self):
-        w = GpioInputWatcher(
-            7, "123-456-789-123", self.__on_callback, self.__off_callback, GPIO.LOW
+    def test_remove_channel(self):
+        self.e.start()
+        self.e.set_channel(12, 100, 50)
+        time.sleep(0.05)
+
+        self.assertTrue(self.e.remove_channel(12))
+        self.writes.clear()
+        time.sleep(0.05)
+
+        self.assertEqual(self.writes, [])
+        self.assertFalse(self.e.remove_channel(12))
+        self.assertEqual(self.e.get_stats()["channels"], 0)
+
+    def test_resync_late_channel(self):
+        self.e.set_channel(12, 100, 50)
+        # engine starts late, many periods are missed
+        time.sleep(0.1)
+        self.e.start()
+        time.sleep(0.05)
+
+        stats = self.e.get_stats()
+        self.assertGreaterEqual(stats["resyncs"], 1)
+        # missed edges are not generated to catch up
+        self.assertLess(stats["edges"], 15)
+
+    def test_output_exception_removes_channel(self):
+        self.e.start()
+        self.e.set_channel(12, 100, 50)
+        self.e.set_channel(16, 100, 50)
+
+        def output(pin, level):
+            if pin == 16:
+                raise Exception("Test exception")
+
+        self.e.output_callback = Mock(side_effect=output)
+        time.sleep(0.05)
+
+        self.assertTrue(self.e.is_alive())
+        self.assertEqual(list(self.e.get_channels().keys()), [12])
+        self.assertEqual(
+            len([c for c in self.e.output_callback.call_args_list if c[0][0] == 16]), 1
         )
-        w._get_input_level = Mock(return_value=GPIO.HIGH)
-        w.start()
-        time.sleep(0.25)
-        self.assertEqual(self.on_cb_count, 0)
-        self.assertEqual(self.off_cb_count, 1)
-        w.stop()
-        w.join()
 
-    def test_callbacks(self):
-        self.w._get_input_level = Mock(return_value=GPIO.LOW)
-        self.w.start()
-        time.sleep(0.5)
-        self.assertEqual(self.on_cb_count, 1)
-        self.assertEqual(self.off_cb_count, 0)
+        self.e.output_callback = Mock(side_effect=Exception("Test exception"))
+        self.e.set_channel(18, 100, 50)
 
-        self.w._get_input_level.return_value = GPIO.HIGH
-        time.sleep(0.5)
-        self.assertEqual(self.on_cb_count, 1)
-        self.assertEqual(self.off_cb_count, 1)
+        self.assertNotIn(18, self.e.get_channels())
 
-        self.w._get_input_level.return_value = GPIO.LOW
-        time.sleep(0.5)
-        self.assertEqual(self.on_cb_count, 2)
-        self.assertEqual(self.off_cb_count, 1)
+    def test_stop(self):
+        self.e.start()
+        self.e.set_channel(12, 100, 50)
 
-        self.w._get_input_level.return_value = GPIO.HIGH
-        time.sleep(0.5)
-        self.assertEqual(self.on_cb_count, 2)
-        self.assertEqual(self.off_cb_count, 2)
+        self.e.stop()
+        self.e.join(1.0)
+
+        self.assertFalse(self.e.is_alive())
 
 
 class TestGpios(unittest.TestCase):
@@ -133,7 +1640,7 @@ class TestGpios(unittest.TestCase):
         self.assertTrue("gpio" in pin)
         self.assertTrue("label" in pin)
         if pin["label"].startswith("GPIO"):
-            self.assertTrue(type(pin["gpio"]) is dict)
+            self.assertTrue(isinstance(pin["gpio"], dict))
             self.assertTrue("assigned" in pin["gpio"])
             self.assertTrue("owner" in pin["gpio"])
 
@@ -174,6 +1681,362 @@ class TestGpios(unittest.TestCase):
         self.app._configure_gpio.assert_any_call(devices["456-789-123"])
         self.app._configure_gpio.assert_any_call(devices["789-123-456"])
 
+    def test__on_start_edge_scanner(self):
+        self.init(start=False, mock_on_start=False, mock_on_stop=False)
+        self.app.get_module_devices = Mock(return_value={})
+        edge_scanner = GpioEdgeScanner(PipeEdgeSource())
+        self.app._get_edge_scanner = Mock(return_value=edge_scanner)
+
+        self.session.start_module(self.app)
+
+        self.assertIs(self.app._edge_scanner, edge_scanner)
+        self.assertTrue(edge_scanner.is_alive())
+        self.app._on_stop()
+        self.assertFalse(edge_scanner.is_alive())
+
+    def test__on_start_with_gpio_memory(self):
+        self.init(start=False, mock_on_start=False)
+        self.app.get_module_devices = Mock(return_value={})
+        self.app._gpio_memory = Mock()
+        self.app._gpio_memory.open.return_value = True
+
+        self.session.start_module(self.app)
+
+        self.assertEqual(self.app._input_scanner.memory, self.app._gpio_memory)
+
+    def test__on_start_without_gpio_memory(self):
+        self.init(start=False, mock_on_start=False)
+        self.app.get_module_devices = Mock(return_value={})
+        self.app._gpio_memory = GpioMemory("/dummy/gpiomem")
+
+        self.session.start_module(self.app)
+
+        self.assertIsNone(self.app._input_scanner.memory)
+
+    def test__on_start_asyncio_engine(self):
+        self.init(start=False, mock_on_start=False, mock_on_stop=False)
+        self.app.set_input_engine("asyncio")
+        self.app._gpio_setup = Mock()
+        self.app._get_async_engine = Mock(return_value=GpioAsyncEngine(self.app))
+        self.app._get_edge_scanner = Mock()
+
+        self.session.start_module(self.app)
+        device = self.app.add_gpio("dummy", "GPIO18", "input", False, False, "test")
+
+        self.assertTrue(self.app._async_engine.is_alive())
+        self.assertFalse(self.app._input_scanner.is_alive())
+        # edge scanner (and its wakeup pipe) is not created
+        self.app._get_edge_scanner.assert_not_called()
+        self.assertIsNone(self.app._edge_scanner)
+        self.assertCountEqual(
+            self.app._async_engine.get_watchers().keys(), [device["uuid"]]
+        )
+        self.assertDictEqual(self.app._input_scanner.get_watchers(), {})
+
+        self.app._on_stop()
+        self.app._async_engine.join(1.0)
+        self.assertFalse(self.app._async_engine.is_alive())
+
+    def test_set_input_engine(self):
+        self.init()
+
+        self.assertTrue(self.app.set_input_engine("asyncio"))
+
+        self.assertEqual(self.app._get_config()["input_engine"], "asyncio")
+        with self.assertRaises(InvalidParameter) as cm:
+            self.app.set_input_engine("dummy")
+        self.assertEqual(
+            str(cm.exception), 'Parameter "engine" is invalid (specified="dummy")'
+        )
+
+    def test__on_start_dispatch_queue_depth(self):
+        self.init(start=False, mock_on_start=False)
+        self.app.get_module_devices = Mock(return_value={})
+        self.app.set_dispatch_queue_depth(32)
+
+        self.session.start_module(self.app)
+
+        self.assertTrue(self.app._event_dispatcher.is_alive())
+        self.assertEqual(self.app._event_dispatcher.get_stats()["depth"], 32)
+
+    def test_set_dispatch_queue_depth(self):
+        self.init()
+
+        self.assertTrue(self.app.set_dispatch_queue_depth(1024))
+
+        self.assertEqual(self.app._get_config()["dispatch_queue_depth"], 1024)
+        with self.assertRaises(InvalidParameter) as cm:
+            self.app.set_dispatch_queue_depth(0)
+        self.assertEqual(str(cm.exception), "Queue depth must be between 1 and 65536")
+
+    def test_input_callbacks_dispatched(self):
+        self.init(mock_on_start=False)
+        self.app._gpio_setup = Mock()
+        self.app._edge_scanner = None
+        self.app._input_scanner.stop()
+        device = self.app.add_gpio("dummy", "GPIO18", "input", False, False, "test")
+        watcher = self.app._input_watchers[device["uuid"]]
+
+        watcher.process(GPIO.HIGH, time.monotonic())
+        time.sleep(0.1)
+
+        self.assertEqual(self.session.event_call_count("gpios.gpio.off"), 1)
+        self.assertEqual(self.app._event_dispatcher.get_stats()["dispatched"], 1)
+
+    @patch("cleep.core.CleepModule.get_module_devices")
+    def test__on_start_rebuild_devices_index(self, cleep_get_module_devices_mock):
+        self.init(start=False, mock_on_start=False)
+        self.app._configure_gpio = Mock()
+        device = self.get_device()
+        cleep_get_module_devices_mock.return_value = {device["uuid"]: device}
+
+        self.session.start_module(self.app)
+
+        self.assertListEqual(
+            self.app._devices_index.get("gpio", "GPIO18"), [device["uuid"]]
+        )
+
+    @patch("cleep.core.CleepModule._search_device")
+    @patch("cleep.core.CleepModule._search_devices")
+    def test_search_device_indexed(self, search_devices_mock, search_device_mock):
+        self.init()
+        self.app._gpio_setup = Mock()
+        device = self.app.add_gpio("dummy", "GPIO18", "input", False, False, "test")
+        self.app.reserve_gpio("onewire", "GPIO4", "onewire", "test")
+
+        self.assertEqual(
+            self.app._search_device("name", "dummy")["uuid"], device["uuid"]
+        )
+        self.assertEqual(self.app._search_device("pin", 12)["uuid"], device["uuid"])
+        self.assertIsNone(self.app._search_device("gpio", "GPIO17"))
+        self.assertEqual(len(self.app.get_reserved_gpios("onewire")), 1)
+        self.assertTrue(self.app.is_reserved_gpio("GPIO4"))
+        search_device_mock.assert_not_called()
+        search_devices_mock.assert_not_called()
+
+    def test_search_device_index_updated(self):
+        self.init()
+        self.app._gpio_setup = Mock()
+        device = self.app.add_gpio("dummy", "GPIO18", "input", False, False, "test")
+
+        self.app.update_gpio(device["uuid"], "newname", False, False, "test")
+        self.assertIsNone(self.app._search_device("name", "dummy"))
+        self.assertEqual(
+            self.app._search_device("name", "newname")["uuid"], device["uuid"]
+        )
+
+        self.app.delete_gpio(device["uuid"], "test")
+        self.assertIsNone(self.app._search_device("name", "newname"))
+        self.assertListEqual(self.app._search_devices("subtype", "input"), [])
+
+    def test_search_device_not_indexed(self):
+        self.init()
+        self.app._gpio_setup = Mock()
+        device = self.app.add_gpio("dummy", "GPIO18", "input", False, False, "test")
+
+        self.assertEqual(
+            self.app._search_device("owner", "test")["uuid"], device["uuid"]
+        )
+
+    def test_turn_on_keep_state_write_behind(self):
+        self.init()
+        self.app._gpio_setup = Mock()
+        self.app._gpio_output = Mock()
+        device = self.app.add_gpio("dummy", "GPIO18", "output", True, False, "test")
+        self.app._update_config = Mock(return_value=True)
+
+        for _ in range(5):
+            self.app.turn_on(device["uuid"])
+            self.app.turn_off(device["uuid"])
+        self.app.turn_on(device["uuid"])
+
+        self.app._update_config.assert_not_called()
+        self.assertTrue(self.app.is_on(device["uuid"]))
+        self.assertTrue(self.app.get_module_devices()[device["uuid"]]["on"])
+        self.assertEqual(self.app._state_writer.get_stats()["pending"], 1)
+
+    def test__write_devices_states(self):
+        self.init()
+        self.app._gpio_setup = Mock()
+        self.app._gpio_output = Mock()
+        device1 = self.app.add_gpio("dummy1", "GPIO18", "output", True, False, "test")
+        device2 = self.app.add_gpio("dummy2", "GPIO17", "output", True, False, "test")
+        save_count = self.app.save_count
+
+        written = self.app._write_devices_states(
+            {device1["uuid"]: True, device2["uuid"]: True, "deleted-uuid": True}
+        )
+
+        self.assertTrue(written)
+        self.assertEqual(self.app.save_count, save_count + 1)
+        devices = self.app._get_config()["devices"]
+        self.assertTrue(devices[device1["uuid"]]["on"])
+        self.assertTrue(devices[device2["uuid"]]["on"])
+        self.assertFalse("deleted-uuid" in devices)
+
+    def test__on_stop_flush_states(self):
+        self.init(mock_on_stop=False)
+        self.app._gpio_setup = Mock()
+        self.app._gpio_output = Mock()
+        device = self.app.add_gpio("dummy", "GPIO18", "output", True, False, "test")
+        self.app.turn_on(device["uuid"])
+
+        self.app._on_stop()
+
+        self.assertTrue(self.app._get_config()["devices"][device["uuid"]]["on"])
+        self.assertEqual(self.app._state_writer.get_stats()["pending"], 0)
+
+    def test__on_start_state_persistence(self):
+        self.init(start=False, mock_on_start=False)
+        self.app.get_module_devices = Mock(return_value={})
+        self.app.set_state_persistence(500, 2000)
+
+        self.session.start_module(self.app)
+
+        self.assertTrue(self.app._state_writer.is_alive())
+        stats = self.app._state_writer.get_stats()
+        self.assertEqual(stats["interval"], 0.5)
+        self.assertEqual(stats["max_staleness"], 2.0)
+
+    def test_set_state_persistence(self):
+        self.init()
+
+        self.assertTrue(self.app.set_state_persistence(0, 1000))
+
+        config = self.app._get_config()
+        self.assertEqual(config["state_write_interval_ms"], 0)
+        self.assertEqual(config["state_max_staleness_ms"], 1000)
+        self.assertEqual(self.app._state_writer.get_stats()["interval"], 0)
+        with self.assertRaises(InvalidParameter) as cm:
+            self.app.set_state_persistence(-1, 1000)
+        self.assertEqual(
+            str(cm.exception), "Write interval must be between 0 and 60000 ms"
+        )
+        with self.assertRaises(InvalidParameter) as cm:
+            self.app.set_state_persistence(2000, 1000)
+        self.assertEqual(
+            str(cm.exception),
+            "Maximum staleness must be between write interval and 600000 ms",
+        )
+
+    def init_journal(self):
+        self.journal_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.journal_dir)
+        self.app._state_journal = GpioStateJournal(
+            os.path.join(self.journal_dir, "gpios.journal"), compact_records=3
+        )
+        self.addCleanup(self.app._state_journal.close)
+
+    def test_set_state_journal(self):
+        self.init()
+        self.init_journal()
+        self.app._gpio_setup = Mock()
+        self.app._gpio_output = Mock()
+        device = self.app.add_gpio("dummy", "GPIO18", "output", True, False, "test")
+        self.app._update_config = Mock(wraps=self.app._update_config)
+
+        self.assertTrue(self.app.set_state_journal(True))
+        self.app.turn_on(device["uuid"])
+        self.app._state_writer.flush()
+
+        self.assertEqual(self.app._update_config.call_count, 1)
+        self.assertTrue(self.app._get_config()["state_journal"])
+        self.assertFalse(self.app._get_config()["devices"][device["uuid"]]["on"])
+        self.assertDictEqual(self.app._state_journal.read(), {device["uuid"]: True})
+
+        self.assertTrue(self.app.set_state_journal(False))
+
+        self.assertFalse(self.app._state_journal.is_opened())
+        self.assertDictEqual(self.app._state_journal.read(), {})
+        self.assertTrue(self.app._get_config()["devices"][device["uuid"]]["on"])
+        self.assertFalse(self.app._get_config()["state_journal"])
+
+    def test_set_state_journal_compaction(self):
+        self.init()
+        self.init_journal()
+        self.app._gpio_setup = Mock()
+        self.app._gpio_output = Mock()
+        device = self.app.add_gpio("dummy", "GPIO18", "output", True, False, "test")
+        self.app.set_state_journal(True)
+
+        for _ in range(3):
+            self.app.turn_on(device["uuid"])
+            self.app._state_writer.flush()
+            self.app.turn_off(device["uuid"])
+            self.app._state_writer.flush()
+
+        stats = self.app.get_diagnostics()["journal"]
+        self.assertEqual(stats["appends"], 6)
+        self.assertEqual(stats["compactions"], 2)
+        self.assertEqual(stats["records"], 0)
+        self.assertFalse(self.app._get_config()["devices"][device["uuid"]]["on"])
+
+    def test_maintain_state_journal_compacts_old_records(self):
+        self.init()
+        self.init_journal()
+        self.app._gpio_setup = Mock()
+        self.app._gpio_output = Mock()
+        device = self.app.add_gpio("dummy", "GPIO18", "output", True, False, "test")
+        self.app.set_state_journal(True)
+        self.app.turn_on(device["uuid"])
+        self.app._state_writer.flush()
+
+        # records are not old enough
+        self.app._maintain_state_journal()
+        self.assertEqual(self.app.get_diagnostics()["journal"]["records"], 1)
+
+        # journal went quiet after records were appended
+        self.app._state_journal.compact_interval = 0.0
+        self.app._maintain_state_journal()
+
+        stats = self.app.get_diagnostics()["journal"]
+        self.assertEqual(stats["records"], 0)
+        self.assertEqual(stats["compactions"], 1)
+        self.assertTrue(self.app._get_config()["devices"][device["uuid"]]["on"])
+
+    def test_set_state_journal_failed(self):
+        self.init()
+        self.app._state_journal = GpioStateJournal("/dummy/dir/gpios.journal")
+
+        with self.assertRaises(CommandError) as cm:
+            self.app.set_state_journal(True)
+        self.assertEqual(cm.exception.message, "Unable to open states journal")
+        self.assertFalse(self.app._get_config()["state_journal"])
+        with self.assertRaises(MissingParameter):
+            self.app.set_state_journal(None)
+
+    def test__on_start_replays_state_journal(self):
+        self.init(start=False, mock_on_start=False)
+        self.init_journal()
+        self.app._configure_gpio = Mock()
+        device = self.app._add_device(self.get_device())
+        self.app._update_config({"state_journal": True})
+        with open(self.app._state_journal.path, "w") as journal:
+            journal.write("%s 0\nunknown 1\n" % device["uuid"])
+
+        self.session.start_module(self.app)
+
+        self.assertTrue(self.app._state_journal.is_opened())
+        self.assertDictEqual(self.app._state_journal.read(), {})
+        self.assertFalse(self.app._get_config()["devices"][device["uuid"]]["on"])
+        configured = self.app._configure_gpio.call_args[0][0]
+        self.assertFalse(configured["on"])
+
+    def test__on_stop_compacts_state_journal(self):
+        self.init(mock_on_stop=False)
+        self.init_journal()
+        self.app._gpio_setup = Mock()
+        self.app._gpio_output = Mock()
+        device = self.app.add_gpio("dummy", "GPIO18", "output", True, False, "test")
+        self.app.set_state_journal(True)
+        self.app.turn_on(device["uuid"])
+
+        self.app._on_stop()
+
+        self.assertFalse(self.app._state_journal.is_opened())
+        self.assertDictEqual(self.app._state_journal.read(), {})
+        self.assertTrue(self.app._get_config()["devices"][device["uuid"]]["on"])
+
     def test__on_stop(self):
         self.init(mock_on_stop=False)
         watcher1 = Mock()
@@ -187,6 +2050,48 @@ class TestGpios(unittest.TestCase):
 
         watcher1.stop.assert_called()
         watcher2.stop.assert_called()
+        self.assertFalse(self.app._input_scanner.continu)
+
+    def test__on_stop_joins_threads(self):
+        self.init(mock_on_start=False, mock_on_stop=False)
+        self.app._gpio_setup = Mock()
+        self.app._edge_scanner = None
+        self.app._input_scanner = GpioInputScanner()
+        self.app._input_scanner.start()
+        watcher = GpioInputWatcher(7, "123-456-789", Mock(), Mock())
+        watcher._get_input_level = Mock(return_value=GPIO.LOW)
+        watcher.period = 5.0
+        watcher.start()
+        self.app._input_watchers = {"123-456-789": watcher}
+        time.sleep(0.1)
+
+        started_at = time.monotonic()
+        self.app._on_stop()
+
+        self.assertLess(time.monotonic() - started_at, 0.5)
+        self.assertFalse(self.app._input_scanner.is_alive())
+        self.assertFalse(watcher.is_alive())
+
+    def test__stop_input_threads_shares_timeout(self):
+        self.init()
+        self.app.STOP_TIMEOUT = 0.2
+        self.app._edge_scanner = None
+        stuck_threads = []
+        for _ in range(3):
+            thread = threading.Thread(target=time.sleep, args=(1.0,), daemon=True)
+            thread.stop = Mock()
+            thread.start()
+            stuck_threads.append(thread)
+        self.app._input_watchers = {
+            str(index): thread for index, thread in enumerate(stuck_threads)
+        }
+
+        duration = self.app._stop_input_threads()
+
+        self.assertGreaterEqual(duration, 0.2)
+        self.assertLess(duration, 0.4)
+        for thread in stuck_threads:
+            thread.stop.assert_called()
 
     @patch("backend.gpios.GPIO_setup")
     def test__gpio_setup_input(self, gpio_setup_mock):
@@ -249,6 +2154,196 @@ class TestGpios(unittest.TestCase):
             devices.get(device_uuid).get("on"), self.app.gpios_on_states[device_uuid]
         )
 
+    def test_get_module_devices_returns_same_snapshot_while_unchanged(self):
+        self.init()
+        device = self.app._add_device(self.get_device())
+
+        devices = self.app.get_module_devices()
+
+        self.assertIs(self.app.get_module_devices(), devices)
+        self.assertEqual(devices[device["uuid"]]["name"], "dummy")
+
+    def test_get_module_devices_snapshot_is_read_only(self):
+        self.init()
+        device = self.app._add_device(self.get_device())
+
+        devices = self.app.get_module_devices()
+
+        with self.assertRaises(TypeError):
+            devices[device["uuid"]]["on"] = False
+        with self.assertRaises(TypeError):
+            del devices[device["uuid"]]
+        self.assertEqual(json.loads(json.dumps(devices))[device["uuid"]]["on"], True)
+
+    def test_get_module_devices_snapshot_version_bumped_on_change(self):
+        self.init()
+        device1 = self.app._add_device(self.get_device())
+        device2 = self.app._add_device(dict(self.get_device(), name="other"))
+        devices = self.app.get_module_devices()
+
+        self.app.gpios_on_states[device1["uuid"]] = False
+        devices_state = self.app.get_module_devices()
+        self.app._update_device(device2["uuid"], dict(device2, name="renamed"))
+        devices_update = self.app.get_module_devices()
+
+        self.assertEqual(devices_state.version, devices.version + 1)
+        self.assertFalse(devices_state[device1["uuid"]]["on"])
+        self.assertIs(devices_state[device2["uuid"]], devices[device2["uuid"]])
+        self.assertEqual(devices_update.version, devices.version + 2)
+        self.assertEqual(devices_update[device2["uuid"]]["name"], "renamed")
+        self.assertIs(devices_update[device1["uuid"]], devices_state[device1["uuid"]])
+        # previous snapshots are untouched
+        self.assertTrue(devices[device1["uuid"]]["on"])
+        self.assertEqual(devices_state[device2["uuid"]]["name"], "other")
+
+    def test_get_module_devices_since(self):
+        self.init()
+        device1 = self.app._add_device(self.get_device())
+        device2 = self.app._add_device(dict(self.get_device(), name="other"))
+        first = self.app.get_module_devices_since(0)
+
+        self.app.gpios_on_states[device1["uuid"]] = False
+        self.app._delete_device(device2["uuid"])
+        device3 = self.app._add_device(dict(self.get_device(), name="new"))
+        second = self.app.get_module_devices_since(first["version"])
+        third = self.app.get_module_devices_since(second["version"])
+
+        self.assertEqual(
+            sorted(first["devices"].keys()), sorted([device1["uuid"], device2["uuid"]])
+        )
+        self.assertEqual(first["deleted"], [])
+        self.assertEqual(
+            sorted(second["devices"].keys()),
+            sorted([device1["uuid"], device3["uuid"]]),
+        )
+        self.assertFalse(second["devices"][device1["uuid"]]["on"])
+        self.assertEqual(second["deleted"], [device2["uuid"]])
+        self.assertEqual(third["version"], second["version"])
+        self.assertEqual(third["devices"], {})
+        self.assertEqual(third["deleted"], [])
+
+    def test_get_module_devices_since_empty_snapshot(self):
+        self.init()
+        empty = self.app.get_module_devices()
+        self.assertEqual(len(empty), 0)
+
+        device = self.app._add_device(self.get_device())
+        since = self.app.get_module_devices_since(empty.version)
+
+        self.assertGreater(since["version"], empty.version)
+        self.assertEqual(list(since["devices"].keys()), [device["uuid"]])
+
+        # all devices deleted, then snapshot invalidated
+        self.app._delete_device(device["uuid"])
+        version = self.app.get_module_devices().version
+        self.app._invalidate_devices_snapshot()
+        device = self.app._add_device(dict(self.get_device(), name="other"))
+        since = self.app.get_module_devices_since(version)
+
+        self.assertGreater(since["version"], version)
+        self.assertEqual(list(since["devices"].keys()), [device["uuid"]])
+
+    def test_get_module_devices_since_unknown_version(self):
+        self.init()
+        device = self.app._add_device(self.get_device())
+        version = self.app.get_module_devices().version
+
+        result = self.app.get_module_devices_since(version + 10)
+
+        self.assertEqual(result["version"], version)
+        self.assertEqual(list(result["devices"].keys()), [device["uuid"]])
+
+    def test_get_module_devices_since_invalid_parameters(self):
+        self.init()
+
+        with self.assertRaises(InvalidParameter):
+            self.app.get_module_devices_since(-1)
+        with self.assertRaises(InvalidParameter):
+            self.app.get_module_devices_since("1")
+
+    def test_concurrent_access_no_lost_updates(self):
+        self.init()
+        outputs = {}
+        events = {}
+        history_lock = threading.Lock()
+
+        def gpio_output(pin, level):
+            with history_lock:
+                outputs.setdefault(pin, []).append(level == GPIO.HIGH)
+            # let other threads run between output and state update
+            time.sleep(0.0001)
+
+        def send_event(on):
+            def send(params, device_id):
+                with history_lock:
+                    events.setdefault(device_id, []).append(on)
+
+            return send
+
+        self.app._gpio_output = gpio_output
+        self.app.gpios_gpio_on.send = send_event(True)
+        self.app.gpios_gpio_off.send = send_event(False)
+        devices = [
+            self.app._add_device(
+                dict(self.get_device(), name="dummy%d" % i, pin=pin, keep=True)
+            )
+            for i, pin in enumerate([11, 12, 13, 15])
+        ]
+        toggles = 100
+        errors = []
+
+        def toggle(device_uuid, offset):
+            try:
+                for i in range(toggles):
+                    if (i + offset) % 2:
+                        self.app.turn_off(device_uuid)
+                    else:
+                        self.app.turn_on(device_uuid)
+            except Exception as error:  # pragma: no cover
+                errors.append(error)
+
+        def rename(device_uuid):
+            try:
+                for i in range(20):
+                    self.app.update_gpio(
+                        device_uuid, "name%d" % i, True, False, "unittest"
+                    )
+                    self.app._state_writer.flush()
+            except Exception as error:  # pragma: no cover
+                errors.append(error)
+
+        threads = []
+        for device in devices:
+            threads += [
+                threading.Thread(target=toggle, args=(device["uuid"], offset))
+                for offset in range(4)
+            ]
+            threads.append(threading.Thread(target=rename, args=(device["uuid"],)))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.app._state_writer.flush()
+
+        self.assertEqual(errors, [])
+        config_devices = self.app._get_config()["devices"]
+        stats = self.app.get_diagnostics()["outputs"]
+        self.assertEqual(
+            stats["writes"] + stats["skipped_writes"],
+            len(devices) * 4 * toggles,
+        )
+        self.assertEqual(
+            sum(len(levels) for levels in outputs.values()), stats["writes"]
+        )
+        for device in devices:
+            on = self.app.gpios_on_states[device["uuid"]]
+            # hardware levels and events are in same order, none is lost
+            self.assertEqual(outputs[device["pin"]], events[device["uuid"]])
+            # hardware level, volatile state and persisted state agree
+            self.assertEqual(outputs[device["pin"]][-1], on)
+            self.assertEqual(config_devices[device["uuid"]]["on"], on)
+            self.assertEqual(config_devices[device["uuid"]]["name"], "name19")
+
     @patch("backend.gpios.GPIO_output")
     def test_gpio_output(self, mock_gpio_output):
         self.init()
@@ -285,7 +2380,7 @@ class TestGpios(unittest.TestCase):
         result = self.app._configure_gpio(device)
 
         self.assertTrue(result)
-        self.app.turn_on.assert_called_with(device["uuid"])
+        self.app.turn_on.assert_called_with(device["uuid"], force=True)
         self.app.turn_off.assert_not_called()
         self.app._gpio_setup.assert_called_with(12, GPIO.OUT)
         self.session.assert_event_called_with(
@@ -308,7 +2403,7 @@ class TestGpios(unittest.TestCase):
         result = self.app._configure_gpio(device)
 
         self.assertTrue(result)
-        self.app.turn_off.assert_called_with(device["uuid"])
+        self.app.turn_off.assert_called_with(device["uuid"], force=True)
         self.app.turn_on.assert_not_called()
         self.app._gpio_setup.assert_called_with(12, GPIO.OUT)
         self.session.assert_event_called_with(
@@ -356,26 +2451,45 @@ class TestGpios(unittest.TestCase):
         device["mode"] = "input"
         device["on"] = False
 
-        self.assertFalse(self.app._configure_gpio(device))
-        self.assertFalse(self.session.event_called("gpios.gpio.off"))
-        self.assertFalse(self.session.event_called("gpios.gpio.on"))
-        self.assertFalse(self.app._Gpios__launch_input_watcher.called)
+        self.assertFalse(self.app._configure_gpio(device))
+        self.assertFalse(self.session.event_called("gpios.gpio.off"))
+        self.assertFalse(self.session.event_called("gpios.gpio.on"))
+        self.assertFalse(self.app._Gpios__launch_input_watcher.called)
+
+    def test__reconfigure_gpio_ok(self):
+        self.init()
+        self.app._gpio_setup = Mock()
+        device = self.app.add_gpio("dummy", "GPIO18", "input", False, False, "test")
+        watcher = self.app._input_watchers[device["uuid"]]
+        self.app._input_scanner.reschedule = Mock()
+        device["debounce_ms"] = 50
+        device["poll_ms"] = 20
+
+        result = self.app._reconfigure_gpio(device)
+
+        self.assertTrue(result)
+        self.assertIs(self.app._input_watchers[device["uuid"]], watcher)
+        self.assertEqual(watcher.debounce, 0.05)
+        self.assertEqual(watcher.period, 0.02)
+        self.app._input_scanner.reschedule.assert_called_with(device["uuid"])
 
-    def test__reconfigure_gpio_ok(self):
+    def test__reconfigure_gpio_output(self):
         device = self.get_device()
+        device["inverted"] = True
         self.init()
-        self.app._deconfigure_gpio = Mock(return_value=True)
         self.app._Gpios__launch_input_watcher = Mock()
+        self.app._gpio_output = Mock()
 
         result = self.app._reconfigure_gpio(device)
 
         self.assertTrue(result)
-        self.app._Gpios__launch_input_watcher.assert_called_with(device)
+        self.app._Gpios__launch_input_watcher.assert_not_called()
+        self.app._gpio_output.assert_called_once_with(12, GPIO.LOW)
 
     def test__reconfigure_gpio_ko(self):
         device = self.get_device()
+        device["mode"] = "input"
         self.init()
-        self.app._deconfigure_gpio = Mock(return_value=False)
         self.app._Gpios__launch_input_watcher = Mock()
 
         result = self.app._reconfigure_gpio(device)
@@ -401,19 +2515,21 @@ class TestGpios(unittest.TestCase):
         device = self.get_device()
         device["keep"] = True
         self.app._get_device = Mock(return_value=device)
-        self.app._update_device = Mock()
+        self.app._state_writer = Mock()
 
         self.app._Gpios__input_on_callback(device["uuid"])
 
-        self.app._update_device.assert_called_with(device.get("uuid"), device)
+        self.app._state_writer.mark.assert_called_with(device["uuid"], True)
+        self.assertEqual(self.app.gpios_on_states[device["uuid"]], True)
 
     def test_input_on_callback_invalid_params(self):
         self.init()
         self.app._get_device = Mock(return_value=None)
 
-        with self.assertRaises(Exception) as cm:
-            self.app._Gpios__input_on_callback("123456789")
-        self.assertEqual(str(cm.exception), 'Device "123456789" not found')
+        # device deleted while its input record was queued
+        self.app._Gpios__input_on_callback("123456789")
+
+        self.assertNotIn("123456789", self.app.gpios_on_states)
         self.assertFalse(self.session.event_called("gpios.gpio.on"))
 
     def test_input_off_callback(self):
@@ -434,19 +2550,21 @@ class TestGpios(unittest.TestCase):
         device = self.get_device()
         device["keep"] = True
         self.app._get_device = Mock(return_value=device)
-        self.app._update_device = Mock()
+        self.app._state_writer = Mock()
 
         self.app._Gpios__input_off_callback(device["uuid"], 666)
 
-        self.app._update_device.assert_called_with(device.get("uuid"), device)
+        self.app._state_writer.mark.assert_called_with(device["uuid"], False)
+        self.assertEqual(self.app.gpios_on_states[device["uuid"]], False)
 
     def test_input_off_callback_invalid_params(self):
         self.init()
         self.app._get_device = Mock(return_value=None)
 
-        with self.assertRaises(Exception) as cm:
-            self.app._Gpios__input_off_callback("123456789", 666)
-        self.assertEqual(str(cm.exception), 'Device "123456789" not found')
+        # device deleted while its input record was queued
+        self.app._Gpios__input_off_callback("123456789", 666)
+
+        self.assertNotIn("123456789", self.app.gpios_on_states)
         self.assertFalse(self.session.event_called("gpios.gpio.off"))
 
     def test_get_module_config(self):
@@ -470,11 +2588,12 @@ class TestGpios(unittest.TestCase):
         usage = self.app.get_pins_usage()
         # logging.info(usage)
         self.assertTrue(
-            type(usage) is dict, "get_pins_usage returns invalid type, dict awaited"
+            isinstance(usage, dict), "get_pins_usage returns invalid type, dict awaited"
         )
 
         config = self.app.get_module_config()
         self.app._get_revision = Mock(return_value=3)
+        self.app._configure()
         usage = self.app.get_pins_usage()
         self.assertEqual(len(usage), 40, "Number of pins usage is invalid, 40 awaited")
         for pin in usage.values():
@@ -482,6 +2601,7 @@ class TestGpios(unittest.TestCase):
 
         config = self.app.get_module_config()
         self.app._get_revision = Mock(return_value=2)
+        self.app._configure()
         usage = self.app.get_pins_usage()
         self.assertEqual(len(usage), 26, "Number of pins usage is invalid, 26 awaited")
         for pin in usage.values():
@@ -489,6 +2609,7 @@ class TestGpios(unittest.TestCase):
 
         config = self.app.get_module_config()
         self.app._get_revision = Mock(return_value=1)
+        self.app._configure()
         usage = self.app.get_pins_usage()
         self.assertEqual(len(usage), 26, "Number of pins usage is invalid, 26 awaited")
         for pin in usage.values():
@@ -499,12 +2620,13 @@ class TestGpios(unittest.TestCase):
         usage = self.app.get_pins_usage()
         # logging.info(usage)
         self.assertTrue(
-            type(usage) is dict, "get_pins_usage returns invalid type, dict awaited"
+            isinstance(usage, dict), "get_pins_usage returns invalid type, dict awaited"
         )
         self.app.add_gpio("test", "GPIO18", "input", False, False, "testmod")
 
         config = self.app.get_module_config()
         self.app._get_revision = Mock(return_value=3)
+        self.app._configure()
         usage = self.app.get_pins_usage()
         # logging.debug('Usage: %s' % usage)
 
@@ -514,6 +2636,57 @@ class TestGpios(unittest.TestCase):
         self.assertEqual(gpio18["gpio"]["assigned"], True)
         self.assertEqual(gpio18["gpio"]["owner"], "testmod")
 
+    def test_get_pins_usage_cached(self):
+        self.init()
+        self.app._gpio_setup = Mock()
+        usage = self.app.get_pins_usage()
+        version = self.app.get_pins_usage_version()
+
+        self.assertIs(self.app.get_pins_usage(), usage)
+        self.assertEqual(self.app.get_pins_usage_version(), version)
+        with self.assertRaises(TypeError):
+            usage[12]["gpio"] = None
+
+    def test_get_pins_usage_updated(self):
+        self.init()
+        self.app._gpio_setup = Mock()
+        self.app._gpio_output = Mock()
+        usage = self.app.get_pins_usage()
+        version = self.app.get_pins_usage_version()
+
+        device = self.app.add_gpio("test", "GPIO18", "output", True, False, "testmod")
+        self.assertEqual(self.app.get_pins_usage_version(), version + 1)
+        new_usage = self.app.get_pins_usage()
+        self.assertDictEqual(
+            new_usage[12]["gpio"], {"assigned": True, "owner": "testmod"}
+        )
+        # previous usage is not modified
+        self.assertDictEqual(usage[12]["gpio"], {"assigned": False, "owner": None})
+
+        # device update and state change don't change pins usage
+        self.app.update_gpio(device["uuid"], "newname", True, False, "testmod")
+        self.app.turn_on(device["uuid"])
+        self.assertEqual(self.app.get_pins_usage_version(), version + 1)
+        self.assertIs(self.app.get_pins_usage(), new_usage)
+
+        self.app.reserve_gpio("onewire", "GPIO4", "onewire", "testmod")
+        self.assertEqual(self.app.get_pins_usage_version(), version + 2)
+        self.assertTrue(self.app.get_pins_usage()[7]["gpio"]["assigned"])
+
+        self.app.delete_gpio(device["uuid"], "testmod")
+        self.assertEqual(self.app.get_pins_usage_version(), version + 3)
+        self.assertDictEqual(
+            self.app.get_pins_usage()[12]["gpio"], {"assigned": False, "owner": None}
+        )
+
+    @patch("cleep.core.CleepModule.get_module_devices")
+    def test_get_pins_usage_doesnt_iterate_devices(self, cleep_get_module_devices_mock):
+        self.init()
+
+        self.app.get_pins_usage()
+
+        cleep_get_module_devices_mock.assert_not_called()
+
     def test_get_assigned_gpios(self):
         self.init()
         gpios = self.app.get_assigned_gpios()
@@ -534,20 +2707,24 @@ class TestGpios(unittest.TestCase):
 
         # rev 1
         self.app._get_revision.return_value = 1
+        self.app._configure()
         self.assertDictEqual(self.app.get_raspi_gpios(), self.app.GPIOS_REV1)
 
         # rev 2
         self.app._get_revision.return_value = 2
+        self.app._configure()
         self.assertDictEqual(self.app.get_raspi_gpios(), self.app.GPIOS_REV2)
 
         # rev 3
         self.app._get_revision.return_value = 3
+        self.app._configure()
         gpios = copy.deepcopy(self.app.GPIOS_REV2)
         gpios.update(self.app.GPIOS_REV3)
         self.assertDictEqual(self.app.get_raspi_gpios(), gpios)
 
         # invalid rev
         self.app._get_revision.return_value = 4
+        self.app._configure()
         self.assertDictEqual(self.app.get_raspi_gpios(), {})
 
     def test_get_pins_number(self):
@@ -556,20 +2733,64 @@ class TestGpios(unittest.TestCase):
 
         # rev 1
         self.app._get_revision.return_value = 1
+        self.app._configure()
         self.assertEqual(self.app.get_pins_number(), 26)
 
         # rev 2
         self.app._get_revision.return_value = 2
+        self.app._configure()
         self.assertEqual(self.app.get_pins_number(), 26)
 
         # rev 3
         self.app._get_revision.return_value = 3
+        self.app._configure()
         self.assertEqual(self.app.get_pins_number(), 40)
 
         # invalid rev
         self.app._get_revision.return_value = 4
+        self.app._configure()
         self.assertEqual(self.app.get_pins_number(), 0)
 
+    def test_board_profile(self):
+        self.init()
+        self.app._get_revision = Mock(return_value=3)
+        self.app._configure()
+
+        profile = self.app._get_board_profile()
+
+        self.assertEqual(profile.revision, 3)
+        self.assertEqual(profile.pins_number, 40)
+        self.assertEqual(profile.gpios["GPIO18"], 12)
+        self.assertEqual(profile.pins[12], "GPIO18")
+        self.assertEqual(profile.pwm_pins, frozenset([12, 32, 33, 35]))
+        self.assertEqual(len(profile.reservable_pins), len(profile.gpios))
+        self.assertFalse(1 in profile.reservable_pins)
+
+    def test_board_profile_built_once(self):
+        self.init()
+        self.app._get_revision = Mock(return_value=3)
+        self.app._configure()
+        self.app._get_revision.reset_mock()
+
+        gpios = self.app.get_raspi_gpios()
+        self.app.get_pins_number()
+        self.app.get_pins_usage()
+        self.app.get_module_config()
+
+        self.assertIs(self.app.get_raspi_gpios(), gpios)
+        self.app._get_revision.assert_not_called()
+
+    def test_get_raspi_gpios_readonly(self):
+        self.init()
+        gpios = self.app.get_raspi_gpios()
+
+        with self.assertRaises(TypeError):
+            gpios["GPIO99"] = 99
+        with self.assertRaises(TypeError):
+            gpios.pop("GPIO18")
+        self.assertDictEqual(copy.deepcopy(gpios), gpios)
+        self.assertEqual(json.loads(json.dumps(gpios))["GPIO18"], 12)
+
     def test_reserve_gpio(self):
         self.init()
         data = {"name": "dummy", "gpio": "GPIO18", "usage": "test", "owner": "unittest"}
@@ -776,6 +2997,134 @@ class TestGpios(unittest.TestCase):
             device["pin"], GPIO.IN, pull_mode=GPIO.PUD_UP
         )
 
+    def test_add_gpio_input_registered_to_scanner(self):
+        self.init()
+        self.app._gpio_setup = Mock()
+
+        device1 = self.app.add_gpio("dummy1", "GPIO18", "input", False, False, "test")
+        device2 = self.app.add_gpio("dummy2", "GPIO19", "input", False, False, "test")
+
+        watchers = self.app._input_scanner.get_watchers()
+        self.assertCountEqual(watchers.keys(), [device1["uuid"], device2["uuid"]])
+        self.assertFalse(watchers[device1["uuid"]].is_alive())
+        self.assertFalse(watchers[device2["uuid"]].is_alive())
+
+    def test_add_gpio_input_registered_to_edge_scanner(self):
+        self.init()
+        self.app._gpio_setup = Mock()
+        self.app._edge_scanner = GpioEdgeScanner(PipeEdgeSource())
+
+        device1 = self.app.add_gpio("dummy1", "GPIO18", "input", False, False, "test")
+
+        self.assertCountEqual(
+            self.app._edge_scanner.get_watchers().keys(), [device1["uuid"]]
+        )
+        self.assertDictEqual(self.app._input_scanner.get_watchers(), {})
+        self.assertEqual(self.app._input_watchers[device1["uuid"]].line, 18)
+
+    def test_add_gpio_input_edge_scanner_fallback(self):
+        self.init()
+        self.app._gpio_setup = Mock()
+        self.app._edge_scanner = Mock()
+        self.app._edge_scanner.register.return_value = False
+
+        device1 = self.app.add_gpio("dummy1", "GPIO18", "input", False, False, "test")
+
+        self.assertCountEqual(
+            self.app._input_scanner.get_watchers().keys(), [device1["uuid"]]
+        )
+
+    def test_deconfigure_gpio_input_unregistered_from_scanner(self):
+        self.init()
+        self.app._gpio_setup = Mock()
+        device = self.app.add_gpio("dummy", "GPIO18", "input", False, False, "test")
+
+        self.assertTrue(self.app._deconfigure_gpio(device))
+
+        self.assertDictEqual(self.app._input_scanner.get_watchers(), {})
+        self.assertFalse(device["uuid"] in self.app._input_watchers)
+
+    def test_deconfigure_gpio_input_no_callback_after_unregister(self):
+        self.init()
+        self.app._gpio_setup = Mock()
+        device = self.app.add_gpio("dummy", "GPIO18", "input", False, False, "test")
+        watcher = self.app._input_watchers[device["uuid"]]
+        watcher.on_callback = Mock()
+        watcher.off_callback = Mock()
+
+        self.app._deconfigure_gpio(device)
+        # sample taken by scanner before unregistration completes
+        watcher.process(GPIO.HIGH, time.monotonic())
+
+        watcher.on_callback.assert_not_called()
+        watcher.off_callback.assert_not_called()
+
+    def test_add_gpio_input_settings(self):
+        self.init()
+        self.app._gpio_setup = Mock()
+
+        device = self.app.add_gpio(
+            "dummy", "GPIO18", "input", False, False, "test", debounce_ms=10, poll_ms=5
+        )
+
+        self.assertEqual(device["debounce_ms"], 10)
+        self.assertEqual(device["poll_ms"], 5)
+        watcher = self.app._input_watchers[device["uuid"]]
+        self.assertEqual(watcher.debounce, 0.01)
+        self.assertEqual(watcher.period, 0.005)
+
+    def test_add_gpio_input_adaptive_settings(self):
+        self.init()
+        self.app._gpio_setup = Mock()
+
+        device = self.app.add_gpio(
+            "dummy", "GPIO18", "input", False, False, "test", poll_max_ms=2000
+        )
+
+        self.assertEqual(device["poll_max_ms"], 2000)
+        watcher = self.app._input_watchers[device["uuid"]]
+        self.assertEqual(watcher.max_period, 2.0)
+
+        device = self.app.update_gpio(
+            device["uuid"], "dummy", False, False, "test", poll_max_ms=0
+        )
+        self.assertIsNone(device["poll_max_ms"])
+        watcher = self.app._input_watchers[device["uuid"]]
+        self.assertIsNone(watcher.max_period)
+
+    def test_add_gpio_input_default_settings(self):
+        self.init()
+        self.app._gpio_setup = Mock()
+
+        device = self.app.add_gpio("dummy", "GPIO18", "input", False, False, "test")
+
+        self.assertIsNone(device["debounce_ms"])
+        self.assertIsNone(device["poll_ms"])
+        watcher = self.app._input_watchers[device["uuid"]]
+        self.assertEqual(watcher.debounce, GpioInputWatcher.DEBOUNCE)
+        self.assertEqual(watcher.period, GpioInputWatcher.PERIOD)
+
+    def test_add_gpio_input_invalid_settings(self):
+        self.init()
+
+        with self.assertRaises(InvalidParameter) as cm:
+            self.app.add_gpio(
+                "dummy", "GPIO18", "input", False, False, "test", debounce_ms=-1
+            )
+        self.assertEqual(str(cm.exception), "Debounce must be between 0 and 10000 ms")
+
+        with self.assertRaises(InvalidParameter) as cm:
+            self.app.add_gpio("dummy", "GPIO18", "input", False, False, "test", poll_ms=0)
+        self.assertEqual(
+            str(cm.exception), "Sampling period must be between 1 and 60000 ms"
+        )
+
+        with self.assertRaises(InvalidParameter) as cm:
+            self.app.add_gpio(
+                "dummy", "GPIO18", "input", False, False, "test", poll_ms="10"
+            )
+        self.assertEqual(str(cm.exception), 'Parameter "poll_ms" must be of type "int"')
+
     def test_add_gpio_input_inverted(self):
         self.init()
         data = {
@@ -1085,6 +3434,143 @@ class TestGpios(unittest.TestCase):
         )
         self.assertEqual(device["owner"], "gpios", "Device owner is invalid")
 
+    def get_gpios_batch(self):
+        """
+        Return add_gpios batch
+        """
+        return [
+            {
+                "name": "out1",
+                "gpio": "GPIO18",
+                "mode": Gpios.MODE_OUTPUT,
+                "keep": True,
+                "inverted": False,
+            },
+            {
+                "name": "out2",
+                "gpio": "GPIO23",
+                "mode": Gpios.MODE_OUTPUT,
+                "keep": False,
+                "inverted": True,
+            },
+            {
+                "name": "in1",
+                "gpio": "GPIO24",
+                "mode": Gpios.MODE_INPUT,
+                "keep": False,
+                "inverted": False,
+                "debounce_ms": 50,
+            },
+        ]
+
+    def test_add_gpios(self):
+        self.init()
+        self.app._configure_gpio = Mock()
+        self.app._update_config = Mock(wraps=self.app._update_config)
+        batch = self.get_gpios_batch()
+
+        devices = self.app.add_gpios(batch, "unittest")
+
+        self.assertEqual(
+            [device["name"] for device in devices], ["out1", "out2", "in1"]
+        )
+        self.assertEqual(devices[0]["pin"], 12)
+        self.assertEqual(devices[1]["inverted"], True)
+        self.assertEqual(devices[2]["subtype"], Gpios.MODE_INPUT)
+        self.assertEqual(devices[2]["debounce_ms"], 50)
+        self.assertEqual(devices[2]["poll_ms"], None)
+        self.assertTrue(all(device["owner"] == "unittest" for device in devices))
+        self.assertEqual(len(set(device["uuid"] for device in devices)), 3)
+        self.app._update_config.assert_called_once()
+        self.assertEqual(len(self.app.get_module_devices()), 3)
+        self.assertEqual(self.app._search_device("gpio", "GPIO23")["name"], "out2")
+        self.assertEqual(
+            self.app.get_pins_usage()[16]["gpio"],
+            {"assigned": True, "owner": "unittest"},
+        )
+        self.assertEqual(self.app._configure_gpio.call_count, 3)
+
+    def test_add_gpios_fix_owner(self):
+        self.init()
+        self.app._configure_gpio = Mock()
+
+        devices = self.app.add_gpios(self.get_gpios_batch()[:1], "rpcserver")
+
+        self.assertEqual(devices[0]["owner"], "gpios")
+
+    def test_add_gpios_conflict_within_batch(self):
+        self.init()
+        self.app._configure_gpio = Mock()
+        batch = self.get_gpios_batch()
+        batch[2]["name"] = "out1"
+
+        with self.assertRaises(InvalidParameter) as cm:
+            self.app.add_gpios(batch, "unittest")
+        self.assertEqual(cm.exception.message, 'Name "out1" is already used')
+
+        batch = self.get_gpios_batch()
+        batch[2]["gpio"] = "GPIO18"
+        with self.assertRaises(InvalidParameter) as cm:
+            self.app.add_gpios(batch, "unittest")
+        self.assertEqual(
+            cm.exception.message, 'Gpio "GPIO18" is specified several times'
+        )
+
+        self.assertEqual(len(self.app.get_module_devices()), 0)
+        self.app._configure_gpio.assert_not_called()
+
+    def test_add_gpios_conflict_with_existing_device(self):
+        self.init()
+        self.app.add_gpio("dummy", "GPIO24", "output", False, False, "unittest")
+        self.app._configure_gpio = Mock()
+
+        with self.assertRaises(InvalidParameter) as cm:
+            self.app.add_gpios(self.get_gpios_batch(), "unittest")
+        self.assertEqual(
+            cm.exception.message, 'Gpio "GPIO24" is already used by other application'
+        )
+
+        self.assertEqual(len(self.app.get_module_devices()), 1)
+        self.app._configure_gpio.assert_not_called()
+
+    def test_add_gpios_invalid_parameters(self):
+        self.init()
+        self.app._configure_gpio = Mock()
+
+        with self.assertRaises(MissingParameter):
+            self.app.add_gpios(None, "unittest")
+        with self.assertRaises(InvalidParameter):
+            self.app.add_gpios([], "unittest")
+        with self.assertRaises(InvalidParameter):
+            self.app.add_gpios(["GPIO18"], "unittest")
+        batch = self.get_gpios_batch()
+        batch[1]["dummy"] = 1
+        with self.assertRaises(InvalidParameter) as cm:
+            self.app.add_gpios(batch, "unittest")
+        self.assertEqual(cm.exception.message, 'Unknown gpio parameters "dummy"')
+        batch = self.get_gpios_batch()
+        del batch[1]["keep"]
+        with self.assertRaises(MissingParameter):
+            self.app.add_gpios(batch, "unittest")
+        batch = self.get_gpios_batch()
+        batch[2]["mode"] = "reserved"
+        with self.assertRaises(InvalidParameter):
+            self.app.add_gpios(batch, "unittest")
+
+        self.assertEqual(len(self.app.get_module_devices()), 0)
+
+    def test_add_gpios_ko_update_config(self):
+        self.init()
+        self.app._configure_gpio = Mock()
+        self.app._update_config = Mock(return_value=False)
+
+        with self.assertRaises(CommandError) as cm:
+            self.app.add_gpios(self.get_gpios_batch(), "unittest")
+        self.assertEqual(cm.exception.message, "Unable to add devices")
+
+        self.assertEqual(len(self.app.get_module_devices()), 0)
+        self.app._configure_gpio.assert_not_called()
+
     def test_delete_gpio_input(self):
         self.init()
         data = {
@@ -1214,6 +3700,84 @@ class TestGpios(unittest.TestCase):
             self.app.delete_gpio("123-456-789", "dummy")
         self.assertEqual(str(cm.exception), 'Failed to delete device "123-456-789"')
 
+    def test_delete_gpios(self):
+        self.init()
+        self.app._gpio_setup = Mock()
+        devices = self.app.add_gpios(self.get_gpios_batch(), "unittest")
+        self.app._update_config = Mock(wraps=self.app._update_config)
+        watcher = self.app._input_watchers[devices[2]["uuid"]]
+
+        result = self.app.delete_gpios(
+            [devices[1]["uuid"], devices[2]["uuid"], devices[2]["uuid"]], "unittest"
+        )
+
+        self.assertTrue(result)
+        self.app._update_config.assert_called_once()
+        self.assertEqual(
+            list(self.app.get_module_devices().keys()), [devices[0]["uuid"]]
+        )
+        self.assertEqual(self.app._input_watchers, {})
+        self.assertFalse(watcher.continu)
+        self.assertIsNone(self.app._search_device("gpio", "GPIO24"))
+        self.assertIsNone(self.app.get_pins_usage()[16]["gpio"]["owner"])
+
+    def test_delete_gpios_all_or_nothing(self):
+        self.init()
+        self.app._configure_gpio = Mock()
+        self.app._deconfigure_gpio = Mock()
+        devices = self.app.add_gpios(self.get_gpios_batch(), "unittest")
+        other = self.app.add_gpio("other", "GPIO25", "output", False, False, "other")
+
+        with self.assertRaises(InvalidParameter) as cm:
+            self.app.delete_gpios([devices[0]["uuid"], "123-456-789"], "unittest")
+        self.assertEqual(cm.exception.message, 'Device "123-456-789" does not exist')
+        with self.assertRaises(Unauthorized):
+            self.app.delete_gpios([devices[0]["uuid"], other["uuid"]], "unittest")
+        self.app._update_config = Mock(return_value=False)
+        with self.assertRaises(CommandError) as cm:
+            self.app.delete_gpios([devices[0]["uuid"]], "unittest")
+        self.assertEqual(cm.exception.message, "Failed to delete devices")
+
+        self.assertEqual(len(self.app.get_module_devices()), 4)
+        self.app._deconfigure_gpio.assert_not_called()
+
+    def test_delete_gpios_check_parameters(self):
+        self.init()
+
+        with self.assertRaises(MissingParameter):
+            self.app.delete_gpios(None, "unittest")
+        with self.assertRaises(InvalidParameter):
+            self.app.delete_gpios([], "unittest")
+        with self.assertRaises(InvalidParameter):
+            self.app.delete_gpios([1], "unittest")
+
+    def test_delete_gpios_stops_watchers_in_parallel(self):
+        self.init()
+        self.app._gpio_setup = Mock()
+        batch = [
+            {
+                "name": "in%d" % i,
+                "gpio": gpio,
+                "mode": Gpios.MODE_INPUT,
+                "keep": False,
+                "inverted": False,
+            }
+            for i, gpio in enumerate(["GPIO23", "GPIO24", "GPIO25"])
+        ]
+        devices = self.app.add_gpios(batch, "unittest")
+        watchers = list(self.app._input_watchers.values())
+        for watcher in watchers:
+            watcher.is_alive = Mock(return_value=True)
+            watcher.join = Mock()
+
+        self.app.delete_gpios([device["uuid"] for device in devices], "unittest")
+
+        for watcher in watchers:
+            # all watchers are stopped before first one is waited
+            self.assertFalse(watcher.continu)
+            watcher.join.assert_called_once()
+            self.assertLessEqual(watcher.join.call_args[0][0], Gpios.STOP_TIMEOUT)
+
     def test_update_gpio(self):
         self.init()
         data = {
@@ -1269,6 +3833,98 @@ class TestGpios(unittest.TestCase):
             cm.exception.message, 'Failed to update device "%s"' % device["uuid"]
         )
 
+    def test_update_gpio_input_settings(self):
+        self.init()
+        self.app._gpio_setup = Mock()
+        device = self.app.add_gpio(
+            "dummy", "GPIO18", "input", False, False, "test", debounce_ms=10, poll_ms=5
+        )
+
+        device = self.app.update_gpio(
+            device["uuid"], "dummy", False, False, "test", poll_ms=500
+        )
+
+        self.assertEqual(device["debounce_ms"], 10)
+        self.assertEqual(device["poll_ms"], 500)
+        watcher = self.app._input_watchers[device["uuid"]]
+        self.assertEqual(watcher.debounce, 0.01)
+        self.assertEqual(watcher.period, 0.5)
+
+    def test_update_gpio_name_only(self):
+        self.init()
+        self.app._gpio_setup = Mock()
+        device = self.app.add_gpio("dummy", "GPIO18", "input", False, False, "test")
+        self.app._reconfigure_gpio = Mock()
+
+        self.app.update_gpio(device["uuid"], "newname", True, False, "test")
+        self.app.update_gpio(
+            device["uuid"], "newname", True, False, "test", debounce_ms=200
+        )
+
+        self.app._reconfigure_gpio.assert_not_called()
+
+    def test_update_gpio_inverted_in_place(self):
+        self.init()
+        self.app._gpio_setup = Mock()
+        device = self.app.add_gpio("dummy", "GPIO18", "input", False, False, "test")
+        watcher = self.app._input_watchers[device["uuid"]]
+        self.app._event_dispatcher.start()
+        watcher.process(GPIO.HIGH, time.monotonic())
+        time.sleep(0.1)
+        self.assertEqual(self.session.event_call_count("gpios.gpio.off"), 1)
+
+        self.app.update_gpio(device["uuid"], "dummy", False, True, "test")
+        time.sleep(0.1)
+
+        self.assertIs(self.app._input_watchers[device["uuid"]], watcher)
+        self.assertEqual(watcher.level, GPIO.HIGH)
+        self.assertEqual(self.session.event_call_count("gpios.gpio.off"), 1)
+        self.assertEqual(self.session.event_call_count("gpios.gpio.on"), 1)
+
+    def test_update_gpio_doesnt_persist_state_without_keep(self):
+        self.init()
+        self.app._gpio_setup = Mock()
+        self.app._gpio_output = Mock()
+        device = self.app.add_gpio("dummy", "GPIO18", "output", False, False, "test")
+        self.app.turn_on(device["uuid"])
+
+        self.app.update_gpio(device["uuid"], "newname", False, False, "test")
+
+        config_device = self.app._get_config()["devices"][device["uuid"]]
+        self.assertEqual(config_device["name"], "newname")
+        self.assertFalse(config_device["on"])
+        self.assertTrue(self.app.is_on(device["uuid"]))
+
+    def test_update_gpio_persists_keep_state(self):
+        self.init()
+        self.app._gpio_setup = Mock()
+        self.app._gpio_output = Mock()
+        device = self.app.add_gpio("dummy", "GPIO18", "output", True, False, "test")
+        self.app.turn_on(device["uuid"])
+
+        self.app.update_gpio(device["uuid"], "newname", True, False, "test")
+
+        self.assertTrue(self.app._get_config()["devices"][device["uuid"]]["on"])
+
+    def test_update_gpio_inverted_output(self):
+        self.init()
+        self.app._gpio_setup = Mock()
+        self.app._gpio_output = Mock()
+        device = self.app.add_gpio("dummy", "GPIO18", "output", False, False, "test")
+        self.app.turn_on(device["uuid"])
+        self.app._gpio_output.reset_mock()
+
+        self.app.update_gpio(device["uuid"], "dummy", False, True, "test")
+
+        # output is still on with new polarity
+        self.app._gpio_output.assert_called_once_with(12, GPIO.LOW)
+        self.assertTrue(self.app.is_on(device["uuid"]))
+        self.app.turn_off(device["uuid"])
+        self.app.turn_on(device["uuid"])
+        self.app._gpio_output.assert_called_with(12, GPIO.LOW)
+        self.assertEqual(self.app._gpio_output.call_count, 3)
+        self.assertEqual(self.app.get_diagnostics()["outputs"]["skipped_writes"], 0)
+
     def test_update_gpio_fix_owner(self):
         self.init()
         data = {
@@ -1303,6 +3959,92 @@ class TestGpios(unittest.TestCase):
             self.app.update_gpio("123-456-789", "updatedname", False, False, "dummy")
         self.assertEqual(str(cm.exception), 'Failed to update device "123-456-789"')
 
+    def test_update_gpios(self):
+        self.init()
+        self.app._gpio_setup = Mock()
+        devices = self.app.add_gpios(self.get_gpios_batch(), "unittest")
+        self.app._update_config = Mock(wraps=self.app._update_config)
+        self.app._reconfigure_gpio = Mock()
+        self.app.gpios_on_states[devices[0]["uuid"]] = True
+
+        updated = self.app.update_gpios(
+            {
+                devices[0]["uuid"]: {"keep": False},
+                devices[2]["uuid"]: {"name": "renamed", "poll_ms": 20},
+            },
+            "unittest",
+        )
+
+        self.app._update_config.assert_called_once()
+        self.assertEqual(
+            [device["uuid"] for device in updated],
+            [devices[0]["uuid"], devices[2]["uuid"]],
+        )
+        self.assertFalse(updated[0]["keep"])
+        self.assertEqual(updated[0]["name"], "out1")
+        # keep flag removed, volatile state is not persisted
+        self.assertFalse(updated[0]["on"])
+        self.assertEqual(updated[1]["name"], "renamed")
+        self.assertEqual(updated[1]["poll_ms"], 20)
+        self.assertEqual(updated[1]["debounce_ms"], 50)
+        devices_snapshot = self.app.get_module_devices()
+        self.assertFalse(devices_snapshot[devices[0]["uuid"]]["keep"])
+        self.assertEqual(devices_snapshot[devices[2]["uuid"]]["name"], "renamed")
+        self.assertEqual(self.app._search_device("name", "renamed")["gpio"], "GPIO24")
+        # only input with changed settings is reconfigured
+        self.app._reconfigure_gpio.assert_called_once_with(updated[1])
+
+    def test_update_gpios_all_or_nothing(self):
+        self.init()
+        self.app._configure_gpio = Mock()
+        self.app._reconfigure_gpio = Mock()
+        devices = self.app.add_gpios(self.get_gpios_batch(), "unittest")
+        other = self.app.add_gpio("other", "GPIO25", "output", False, False, "other")
+
+        with self.assertRaises(InvalidParameter) as cm:
+            self.app.update_gpios(
+                {devices[0]["uuid"]: {"name": "new"}, "123-456-789": {"keep": True}},
+                "unittest",
+            )
+        self.assertEqual(cm.exception.message, 'Device "123-456-789" does not exist')
+        with self.assertRaises(Unauthorized):
+            self.app.update_gpios(
+                {devices[0]["uuid"]: {"name": "new"}, other["uuid"]: {"keep": True}},
+                "unittest",
+            )
+        with self.assertRaises(InvalidParameter):
+            self.app.update_gpios(
+                {
+                    devices[0]["uuid"]: {"name": "new"},
+                    devices[2]["uuid"]: {"poll_ms": 0},
+                },
+                "unittest",
+            )
+        self.app._update_config = Mock(return_value=False)
+        with self.assertRaises(CommandError) as cm:
+            self.app.update_gpios({devices[0]["uuid"]: {"name": "new"}}, "unittest")
+        self.assertEqual(cm.exception.message, "Failed to update devices")
+
+        self.assertEqual(self.app._get_device(devices[0]["uuid"])["name"], "out1")
+        self.app._reconfigure_gpio.assert_not_called()
+
+    def test_update_gpios_check_parameters(self):
+        self.init()
+        self.app._configure_gpio = Mock()
+        device = self.app.add_gpio("dummy", "GPIO18", "output", False, False, "test")
+
+        with self.assertRaises(MissingParameter):
+            self.app.update_gpios(None, "test")
+        with self.assertRaises(InvalidParameter):
+            self.app.update_gpios({}, "test")
+        with self.assertRaises(InvalidParameter):
+            self.app.update_gpios({device["uuid"]: "name"}, "test")
+        with self.assertRaises(InvalidParameter) as cm:
+            self.app.update_gpios({device["uuid"]: {"gpio": "GPIO19"}}, "test")
+        self.assertEqual(cm.exception.message, 'Unknown gpio parameters "gpio"')
+        with self.assertRaises(InvalidParameter):
+            self.app.update_gpios({device["uuid"]: {"keep": 1}}, "test")
+
     def test_update_gpio_check_parameters(self):
         self.init()
         data = {
@@ -1423,6 +4165,165 @@ class TestGpios(unittest.TestCase):
             "gpios.gpio.on", {"gpio": "GPIO18", "init": False}
         )
 
+    def test_set_outputs(self):
+        self.init()
+        self.app._gpio_setup = Mock()
+        self.app._gpio_outputs = Mock()
+        devices = self.app.add_gpios(
+            [
+                {
+                    "name": "out%d" % i,
+                    "gpio": gpio,
+                    "mode": Gpios.MODE_OUTPUT,
+                    "keep": i != 1,
+                    "inverted": i == 2,
+                }
+                for i, gpio in enumerate(["GPIO18", "GPIO23", "GPIO24"])
+            ],
+            "unittest",
+        )
+        outputs = {
+            devices[0]["uuid"]: True,
+            devices[1]["uuid"]: True,
+            devices[2]["uuid"]: True,
+        }
+        self.app.turn_on = Mock()
+        self.app.turn_off = Mock()
+        self.app._state_writer.mark_states = Mock()
+
+        self.assertTrue(self.app.set_outputs(outputs))
+
+        # all levels applied at once
+        self.app._gpio_outputs.assert_called_once_with(
+            {12: GPIO.HIGH, 16: GPIO.HIGH, 18: GPIO.LOW}
+        )
+        self.app.turn_on.assert_not_called()
+        self.app.turn_off.assert_not_called()
+        self.assertDictEqual(self.app.get_states()["states"], outputs)
+        self.app._state_writer.mark_states.assert_called_once_with(
+            {devices[0]["uuid"]: True, devices[2]["uuid"]: True}
+        )
+        self.assertEqual(self.session.event_call_count("gpios.gpio.on"), 3)
+
+        self.app.set_outputs({devices[0]["uuid"]: False, devices[2]["uuid"]: False})
+
+        self.app._gpio_outputs.assert_called_with({12: GPIO.LOW, 18: GPIO.HIGH})
+        self.assertFalse(self.app.is_on(devices[0]["uuid"]))
+        self.assertTrue(self.app.is_on(devices[1]["uuid"]))
+        self.session.assert_event_called_with(
+            "gpios.gpio.off", {"gpio": "GPIO24", "init": False, "duration": 0}
+        )
+
+    def test_gpio_outputs_with_gpio_memory(self):
+        self.init()
+        fd, path = tempfile.mkstemp()
+        os.write(fd, bytes(GpioMemory.BLOCK_SIZE))
+        os.close(fd)
+        self.addCleanup(os.remove, path)
+        self.app._gpio_memory = GpioMemory(path)
+        self.addCleanup(self.app._gpio_memory.close)
+        self.app._gpio_memory.open()
+
+        self.app._gpio_output = Mock()
+
+        self.app._gpio_outputs({12: GPIO.HIGH, 16: GPIO.HIGH, 18: GPIO.LOW})
+
+        self.app._gpio_output.assert_not_called()
+        with open(path, "rb") as fd:
+            registers = fd.read(GpioMemory.GPCLR0 + 4)
+        # pins 12, 16 and 18 are GPIO18, GPIO23 and GPIO24
+        self.assertEqual(
+            struct.unpack_from("<I", registers, GpioMemory.GPSET0)[0],
+            (1 << 18) | (1 << 23),
+        )
+        self.assertEqual(
+            struct.unpack_from("<I", registers, GpioMemory.GPCLR0)[0], 1 << 24
+        )
+        self.assertEqual(self.app.get_diagnostics()["outputs"]["backend"], "gpiomem")
+
+    def test_gpio_outputs_without_gpio_memory(self):
+        self.init()
+        self.app._gpio_memory = GpioMemory("/dummy/gpiomem")
+        self.app._gpio_output = Mock()
+
+        self.app._gpio_outputs({12: GPIO.HIGH, 18: GPIO.LOW})
+
+        self.app._gpio_output.assert_has_calls([call(12, GPIO.HIGH), call(18, GPIO.LOW)])
+        self.assertEqual(self.app.get_diagnostics()["outputs"]["backend"], "rpigpio")
+
+    def test_set_outputs_skip_redundant_outputs(self):
+        self.init()
+        self.app._gpio_setup = Mock()
+        self.app._gpio_outputs = Mock()
+        device1 = self.app.add_gpio("out1", "GPIO18", "output", False, False, "test")
+        device2 = self.app.add_gpio("out2", "GPIO23", "output", False, False, "test")
+        off_calls = self.session.event_call_count("gpios.gpio.off")
+
+        self.app.set_outputs({device1["uuid"]: True, device2["uuid"]: False})
+        self.app.set_outputs({device1["uuid"]: True, device2["uuid"]: False})
+        self.app.set_outputs({device1["uuid"]: True}, force=True)
+
+        self.assertEqual(
+            self.app._gpio_outputs.call_args_list,
+            [call({12: GPIO.HIGH}), call({12: GPIO.HIGH})],
+        )
+        self.assertEqual(self.session.event_call_count("gpios.gpio.off"), off_calls)
+        stats = self.app.get_diagnostics()["outputs"]
+        self.assertEqual(stats["skipped_writes"], 3)
+
+    def test_set_outputs_persist_once(self):
+        self.init()
+        self.app._gpio_setup = Mock()
+        self.app._gpio_outputs = Mock()
+        devices = self.app.add_gpios(
+            [
+                {
+                    "name": "out%d" % i,
+                    "gpio": gpio,
+                    "mode": Gpios.MODE_OUTPUT,
+                    "keep": True,
+                    "inverted": False,
+                }
+                for i, gpio in enumerate(["GPIO18", "GPIO23", "GPIO24"])
+            ],
+            "unittest",
+        )
+        self.app._update_config = Mock(wraps=self.app._update_config)
+
+        self.app.set_outputs({device["uuid"]: True for device in devices})
+        self.app._state_writer.flush()
+
+        self.app._update_config.assert_called_once()
+        config_devices = self.app._get_config()["devices"]
+        self.assertTrue(all(config_devices[device["uuid"]]["on"] for device in devices))
+
+    def test_set_outputs_check_parameters(self):
+        self.init()
+        self.app._gpio_setup = Mock()
+        self.app._gpio_outputs = Mock()
+        output = self.app.add_gpio("out", "GPIO18", "output", False, False, "test")
+        input_device = self.app.add_gpio("in", "GPIO23", "input", False, False, "test")
+
+        with self.assertRaises(MissingParameter):
+            self.app.set_outputs(None)
+        with self.assertRaises(InvalidParameter):
+            self.app.set_outputs({})
+        with self.assertRaises(InvalidParameter):
+            self.app.set_outputs({output["uuid"]: 1})
+        with self.assertRaises(CommandError) as cm:
+            self.app.set_outputs({output["uuid"]: True, "123-456-789": True})
+        self.assertEqual(cm.exception.message, 'Device "123-456-789" not found')
+        with self.assertRaises(CommandError) as cm:
+            self.app.set_outputs({output["uuid"]: True, input_device["uuid"]: False})
+        self.assertEqual(
+            cm.exception.message,
+            'Gpio "GPIO23" configured as "input" cannot be turned off',
+        )
+
+        self.app._gpio_outputs.assert_not_called()
+        self.assertFalse(self.app.is_on(output["uuid"]))
+        self.assertFalse(self.session.event_called("gpios.gpio.on"))
+
     def test_turn_on_check_parameters(self):
         self.init()
 
@@ -1464,6 +4365,7 @@ class TestGpios(unittest.TestCase):
             data["owner"],
         )
 
+        self.app.turn_on(device["uuid"])
         calls = self.session.event_call_count("gpios.gpio.off")
         self.app.turn_off(device["uuid"])
 
@@ -1471,6 +4373,400 @@ class TestGpios(unittest.TestCase):
             "gpios.gpio.off", {"gpio": "GPIO18", "init": False, "duration": 0}
         )
 
+    def test_turn_on_turn_off_skip_redundant_commands(self):
+        self.init()
+        self.app._gpio_setup = Mock()
+        self.app._gpio_output = Mock()
+        device = self.app.add_gpio("dummy", "GPIO18", "output", True, False, "test")
+        self.app._state_writer.mark = Mock()
+        self.app._gpio_output.reset_mock()
+        on_calls = self.session.event_call_count("gpios.gpio.on")
+        off_calls = self.session.event_call_count("gpios.gpio.off")
+
+        self.assertTrue(self.app.turn_off(device["uuid"]))
+        self.assertTrue(self.app.turn_on(device["uuid"]))
+        self.assertTrue(self.app.turn_on(device["uuid"]))
+        self.assertTrue(self.app.turn_on(device["uuid"]))
+
+        self.app._gpio_output.assert_called_once_with(12, GPIO.HIGH)
+        self.app._state_writer.mark.assert_called_once_with(device["uuid"], True)
+        self.assertEqual(self.session.event_call_count("gpios.gpio.on"), on_calls + 1)
+        self.assertEqual(self.session.event_call_count("gpios.gpio.off"), off_calls)
+        stats = self.app.get_diagnostics()["outputs"]
+        # output is written once when configured
+        self.assertEqual(stats["writes"], 2)
+        self.assertEqual(stats["skipped_writes"], 3)
+
+    def test_turn_on_turn_off_force(self):
+        self.init()
+        self.app._gpio_setup = Mock()
+        self.app._gpio_output = Mock()
+        device = self.app.add_gpio("dummy", "GPIO18", "output", False, False, "test")
+        self.app._gpio_output.reset_mock()
+        off_calls = self.session.event_call_count("gpios.gpio.off")
+
+        self.assertTrue(self.app.turn_off(device["uuid"], force=True))
+        self.app.turn_on(device["uuid"])
+        self.assertTrue(self.app.turn_on(device["uuid"], force=True))
+
+        self.assertEqual(self.app._gpio_output.call_count, 3)
+        self.assertEqual(self.session.event_call_count("gpios.gpio.off"), off_calls + 1)
+        self.assertEqual(self.app.get_diagnostics()["outputs"]["skipped_writes"], 0)
+        with self.assertRaises(InvalidParameter):
+            self.app.turn_on(device["uuid"], force=1)
+
+    def test_pulse(self):
+        self.init()
+        self.app._gpio_setup = Mock()
+        self.app._gpio_output = Mock()
+        device = self.app.add_gpio("dummy", "GPIO18", "output", True, False, "test")
+        self.app._state_writer.mark = Mock()
+        self.app._gpio_output.reset_mock()
+        self.app._timer_scheduler.start()
+        off_calls = self.session.event_call_count("gpios.gpio.off")
+
+        self.assertTrue(self.app.pulse(device["uuid"], 50))
+
+        self.app._gpio_output.assert_called_once_with(12, GPIO.HIGH)
+        self.assertTrue(self.app.is_on(device["uuid"]))
+        time.sleep(0.2)
+        self.assertFalse(self.app.is_on(device["uuid"]))
+        self.app._gpio_output.assert_called_with(12, GPIO.LOW)
+        self.assertEqual(self.session.event_call_count("gpios.gpio.off"), off_calls + 1)
+        # timed on state is not persisted, off state is
+        self.app._state_writer.mark.assert_called_once_with(device["uuid"], False)
+        self.assertEqual(self.app.get_diagnostics()["timers"]["fired"], 1)
+
+    def test_pulse_cancelled_by_new_command(self):
+        self.init()
+        self.app._gpio_setup = Mock()
+        self.app._gpio_output = Mock()
+        device = self.app.add_gpio("dummy", "GPIO18", "output", False, False, "test")
+        self.app._timer_scheduler.start()
+
+        self.app.pulse(device["uuid"], 50)
+        self.app.turn_on(device["uuid"])
+        time.sleep(0.15)
+        self.assertTrue(self.app.is_on(device["uuid"]))
+
+        self.app.pulse(device["uuid"], 50)
+        self.app.set_outputs({device["uuid"]: True})
+        time.sleep(0.15)
+        self.assertTrue(self.app.is_on(device["uuid"]))
+
+        self.app.pulse(device["uuid"], 50)
+        self.app.turn_off(device["uuid"])
+        self.app.turn_on(device["uuid"])
+        time.sleep(0.15)
+        self.assertTrue(self.app.is_on(device["uuid"]))
+
+        stats = self.app.get_diagnostics()["timers"]
+        self.assertEqual(stats["fired"], 0)
+        self.assertEqual(stats["cancelled"], 3)
+
+    def test_pulse_cancelled_by_new_command_persists_keep_state(self):
+        self.init()
+        self.app._gpio_setup = Mock()
+        self.app._gpio_output = Mock()
+        device = self.app.add_gpio("dummy", "GPIO18", "output", True, False, "test")
+        self.app._state_writer.flush()
+
+        self.app.pulse(device["uuid"], 50)
+        self.app.turn_on(device["uuid"])
+        self.app._state_writer.flush()
+
+        self.assertTrue(self.app.is_on(device["uuid"]))
+        self.assertTrue(self.app._get_config()["devices"][device["uuid"]]["on"])
+
+        self.app.turn_off(device["uuid"])
+        self.app.pulse(device["uuid"], 50)
+        self.app._state_writer.flush()
+        self.assertFalse(self.app._get_config()["devices"][device["uuid"]]["on"])
+        self.app.set_outputs({device["uuid"]: True})
+        self.app._state_writer.flush()
+
+        self.assertTrue(self.app.is_on(device["uuid"]))
+        self.assertTrue(self.app._get_config()["devices"][device["uuid"]]["on"])
+        self.assertEqual(self.app.get_diagnostics()["timers"]["pending"], 0)
+
+    def test_pulse_replaces_pending_pulse(self):
+        self.init()
+        self.app._gpio_setup = Mock()
+        self.app._gpio_output = Mock()
+        device = self.app.add_gpio("dummy", "GPIO18", "output", False, False, "test")
+        self.app._timer_scheduler.start()
+
+        self.app.pulse(device["uuid"], 50)
+        self.app.pulse(device["uuid"], 200)
+        time.sleep(0.1)
+        self.assertTrue(self.app.is_on(device["uuid"]))
+        time.sleep(0.2)
+        self.assertFalse(self.app.is_on(device["uuid"]))
+
+        stats = self.app.get_diagnostics()["timers"]
+        self.assertEqual(stats["fired"], 1)
+        self.assertEqual(stats["cancelled"], 1)
+
+    def test_pulse_cancelled_by_device_deletion(self):
+        self.init()
+        self.app._gpio_setup = Mock()
+        self.app._gpio_output = Mock()
+        device = self.app.add_gpio("dummy", "GPIO18", "output", False, False, "test")
+
+        self.app.pulse(device["uuid"], 50)
+        self.app.delete_gpio(device["uuid"], "test")
+
+        self.assertEqual(self.app.get_diagnostics()["timers"]["pending"], 0)
+
+    def test_pulse_check_parameters(self):
+        self.init()
+        self.app._gpio_setup = Mock()
+        self.app._gpio_output = Mock()
+        device = self.app.add_gpio("dummy", "GPIO18", "output", False, False, "test")
+
+        with self.assertRaises(InvalidParameter) as cm:
+            self.app.pulse(device["uuid"], 0)
+        self.assertEqual(
+            cm.exception.message, "Duration must be between 1 and 3600000 ms"
+        )
+        with self.assertRaises(InvalidParameter) as cm:
+            self.app.pulse(device["uuid"], 3600001)
+        self.assertEqual(
+            cm.exception.message, "Duration must be between 1 and 3600000 ms"
+        )
+        with self.assertRaises(InvalidParameter):
+            self.app.pulse(device["uuid"], 1.5)
+        with self.assertRaises(InvalidParameter) as cm:
+            self.app.turn_on(device["uuid"], auto_off_ms=0)
+        self.assertEqual(
+            cm.exception.message, "Auto off delay must be between 1 and 3600000 ms"
+        )
+        with self.assertRaises(CommandError) as cm:
+            self.app.pulse("123-456-789", 50)
+        self.assertEqual(str(cm.exception), "Device not found")
+        self.assertEqual(self.app.get_diagnostics()["timers"]["pending"], 0)
+
+    def test_add_gpio_pwm(self):
+        self.init()
+        self.app._gpio_setup = Mock()
+        self.app._gpio_output = Mock()
+
+        device = self.app.add_gpio(
+            "dummy", "GPIO18", "output", False, False, "test", pwm_hz=100
+        )
+
+        self.assertEqual(device["pwm_hz"], 100)
+        self.assertEqual(device["duty"], 100)
+        self.assertFalse(device["on"])
+        device = self.app.add_gpio("dummy2", "GPIO23", "output", False, False, "test")
+        self.assertIsNone(device["pwm_hz"])
+        self.assertIsNone(device["duty"])
+
+    def test_add_gpio_pwm_check_parameters(self):
+        self.init()
+        self.app._gpio_setup = Mock()
+
+        with self.assertRaises(InvalidParameter) as cm:
+            self.app.add_gpio("dummy", "GPIO18", "input", False, False, "test", pwm_hz=100)
+        self.assertEqual(cm.exception.message, "Pwm is only available for output gpio")
+        with self.assertRaises(InvalidParameter) as cm:
+            self.app.add_gpio("dummy", "GPIO18", "output", False, False, "test", pwm_hz=0)
+        self.assertEqual(
+            cm.exception.message, "Pwm frequency must be between 1 and 1000 Hz"
+        )
+        with self.assertRaises(InvalidParameter):
+            self.app.add_gpio(
+                "dummy", "GPIO18", "output", False, False, "test", pwm_hz=1001
+            )
+        with self.assertRaises(InvalidParameter):
+            self.app.add_gpios(
+                [
+                    {
+                        "name": "dummy",
+                        "gpio": "GPIO18",
+                        "mode": "input",
+                        "keep": False,
+                        "inverted": False,
+                        "pwm_hz": 100,
+                    }
+                ],
+                "test",
+            )
+
+    def test_turn_on_turn_off_pwm_output(self):
+        self.init()
+        self.app._gpio_setup = Mock()
+        self.app._gpio_output = Mock()
+        self.app._pwm_engine = Mock()
+        device = self.app.add_gpio(
+            "dummy", "GPIO18", "output", True, True, "test", pwm_hz=100
+        )
+        self.app.set_duty(device["uuid"], 30)
+        self.app._state_writer.mark = Mock()
+        self.app._gpio_output.reset_mock()
+        self.app._pwm_engine.reset_mock()
+        on_calls = self.session.event_call_count("gpios.gpio.on")
+        off_calls = self.session.event_call_count("gpios.gpio.off")
+
+        self.app.turn_on(device["uuid"])
+
+        self.app._pwm_engine.set_channel.assert_called_once_with(12, 100, 30, True)
+        self.app._gpio_output.assert_not_called()
+        self.app._state_writer.mark.assert_called_once_with(device["uuid"], True)
+        self.assertEqual(self.session.event_call_count("gpios.gpio.on"), on_calls + 1)
+
+        self.app.turn_off(device["uuid"])
+
+        self.app._pwm_engine.remove_channel.assert_called_once_with(12)
+        self.app._gpio_output.assert_called_once_with(12, GPIO.HIGH)
+        self.app._state_writer.mark.assert_called_with(device["uuid"], False)
+        self.assertEqual(self.session.event_call_count("gpios.gpio.off"), off_calls + 1)
+
+    def test_set_outputs_pwm_output(self):
+        self.init()
+        self.app._gpio_setup = Mock()
+        self.app._gpio_outputs = Mock()
+        self.app._gpio_output = Mock()
+        self.app._pwm_engine = Mock()
+        pwm = self.app.add_gpio(
+            "dummy", "GPIO18", "output", False, False, "test", pwm_hz=100
+        )
+        out = self.app.add_gpio("dummy2", "GPIO23", "output", False, False, "test")
+        self.app._pwm_engine.reset_mock()
+
+        self.app.set_outputs({pwm["uuid"]: True, out["uuid"]: True})
+
+        self.app._gpio_outputs.assert_called_once_with({16: GPIO.HIGH})
+        self.app._pwm_engine.set_channel.assert_called_once_with(12, 100, 100, False)
+
+        self.app._gpio_outputs.reset_mock()
+        self.app.set_outputs({pwm["uuid"]: False, out["uuid"]: False})
+
+        self.app._pwm_engine.remove_channel.assert_called_once_with(12)
+        self.app._gpio_outputs.assert_called_once_with({12: GPIO.LOW, 16: GPIO.LOW})
+
+    def test_set_duty(self):
+        self.init()
+        self.app._gpio_setup = Mock()
+        self.app._gpio_output = Mock()
+        self.app._pwm_engine = Mock()
+        device = self.app.add_gpio(
+            "dummy", "GPIO18", "output", False, False, "test", pwm_hz=100
+        )
+
+        # duty cycle is saved in background but not applied while output is off
+        self.assertTrue(self.app.set_duty(device["uuid"], 40))
+        self.app._pwm_engine.set_channel.assert_not_called()
+        self.assertEqual(self.app.get_module_devices()[device["uuid"]]["duty"], 40)
+        self.app._duty_writer.flush()
+        self.assertEqual(self.app._get_device(device["uuid"])["duty"], 40)
+
+        # applied immediately while output is on
+        self.app.turn_on(device["uuid"])
+        self.app.set_duty(device["uuid"], 60)
+        self.app._pwm_engine.set_channel.assert_called_with(12, 100, 60, False)
+        self.assertTrue(self.app.is_on(device["uuid"]))
+        # state of device without keep flag is not persisted
+        self.assertFalse(self.app._get_device(device["uuid"])["on"])
+
+        # same duty cycle is not applied again
+        self.app._pwm_engine.reset_mock()
+        self.app.set_duty(device["uuid"], 60)
+        self.app._pwm_engine.set_channel.assert_not_called()
+
+    def test_set_duty_write_behind(self):
+        self.init()
+        self.app._gpio_setup = Mock()
+        self.app._gpio_output = Mock()
+        self.app._pwm_engine = Mock()
+        device = self.app.add_gpio(
+            "dummy", "GPIO18", "output", False, False, "test", pwm_hz=100
+        )
+        self.app._update_config = Mock(wraps=self.app._update_config)
+
+        self.app.turn_on(device["uuid"])
+        for percent in (10, 20, 30):
+            self.app.set_duty(device["uuid"], percent)
+        self.app._pwm_engine.set_channel.assert_called_with(12, 100, 30, False)
+        self.app._update_config.assert_not_called()
+        self.assertEqual(self.app.get_module_devices()[device["uuid"]]["duty"], 30)
+
+        # burst of duty changes is written once
+        self.app._duty_writer.flush()
+        self.assertEqual(self.app._update_config.call_count, 1)
+        self.assertEqual(self.app._get_device(device["uuid"])["duty"], 30)
+
+    def test_set_duty_not_overwritten_by_device_update(self):
+        self.init()
+        self.app._gpio_setup = Mock()
+        self.app._gpio_output = Mock()
+        self.app._pwm_engine = Mock()
+        device = self.app.add_gpio(
+            "dummy", "GPIO18", "output", False, False, "test", pwm_hz=100
+        )
+
+        self.app.set_duty(device["uuid"], 40)
+        self.app.update_gpio(device["uuid"], "renamed", False, False, "test")
+
+        self.assertEqual(self.app._get_device(device["uuid"])["duty"], 40)
+
+    def test_set_duty_check_parameters(self):
+        self.init()
+        self.app._gpio_setup = Mock()
+        self.app._gpio_output = Mock()
+        device = self.app.add_gpio("dummy", "GPIO18", "output", False, False, "test")
+
+        with self.assertRaises(InvalidParameter) as cm:
+            self.app.set_duty(device["uuid"], 101)
+        self.assertEqual(cm.exception.message, "Duty cycle must be between 0 and 100")
+        with self.assertRaises(InvalidParameter):
+            self.app.set_duty(device["uuid"], -1)
+        with self.assertRaises(CommandError) as cm:
+            self.app.set_duty("123-456-789", 50)
+        self.assertEqual(str(cm.exception), "Device not found")
+        with self.assertRaises(CommandError) as cm:
+            self.app.set_duty(device["uuid"], 50)
+        self.assertEqual(
+            str(cm.exception), 'Gpio "GPIO18" is not configured as pwm output'
+        )
+
+    def test_pwm_output_driven_by_engine(self):
+        self.init()
+        self.app._gpio_setup = Mock()
+        self.app._gpio_output = Mock()
+        device = self.app.add_gpio(
+            "dummy", "GPIO18", "output", False, False, "test", pwm_hz=100
+        )
+        self.app.set_duty(device["uuid"], 50)
+        self.app._pwm_engine.start()
+
+        self.app.turn_on(device["uuid"])
+        time.sleep(0.1)
+        self.app.turn_off(device["uuid"])
+        self.app._gpio_output.reset_mock()
+        time.sleep(0.05)
+
+        self.app._gpio_output.assert_not_called()
+        stats = self.app.get_diagnostics()["pwm"]
+        self.assertEqual(stats["channels"], 0)
+        self.assertGreater(stats["edges"], 10)
+        self.app._pwm_engine.stop()
+
+    def test_delete_gpio_stops_pwm_output(self):
+        self.init()
+        self.app._gpio_setup = Mock()
+        self.app._gpio_output = Mock()
+        self.app._pwm_engine = Mock()
+        device = self.app.add_gpio(
+            "dummy", "GPIO18", "output", False, False, "test", pwm_hz=100
+        )
+        self.app.turn_on(device["uuid"])
+        self.app._pwm_engine.reset_mock()
+
+        self.app.delete_gpio(device["uuid"], "test")
+
+        self.app._pwm_engine.remove_channel.assert_called_once_with(12)
+
     def test_turn_off_check_parameters(self):
         self.init()
 
@@ -1560,6 +4856,90 @@ class TestGpios(unittest.TestCase):
             str(cm.exception), 'Parameter "gpio" is invalid (specified="hello")'
         )
 
+    def test_get_diagnostics(self):
+        self.init()
+        self.app._gpio_setup = Mock()
+        self.app._edge_scanner = None
+        device = self.app.add_gpio(
+            "dummy", "GPIO18", "input", False, False, "test", poll_ms=10, debounce_ms=0
+        )
+
+        diagnostics = self.app.get_diagnostics()
+
+        self.assertDictEqual(
+            diagnostics["inputs"],
+            {device["uuid"]: {"scanner": "poll", "period": 0.01, "debounce": 0.0}},
+        )
+
+    def test_get_diagnostics_dispatcher(self):
+        self.init()
+
+        diagnostics = self.app.get_diagnostics()
+
+        self.assertDictEqual(
+            diagnostics["dispatcher"],
+            {"depth": 256, "size": 0, "high_water": 0, "dropped": 0, "dispatched": 0},
+        )
+
+    def test_get_diagnostics_edge_scanner(self):
+        self.init()
+        self.app._gpio_setup = Mock()
+        self.app._edge_scanner = GpioEdgeScanner(PipeEdgeSource())
+        device = self.app.add_gpio("dummy", "GPIO18", "input", False, False, "test")
+
+        diagnostics = self.app.get_diagnostics()
+
+        self.assertEqual(diagnostics["inputs"][device["uuid"]]["scanner"], "edge")
+        self.assertIsNone(diagnostics["inputs"][device["uuid"]]["period"])
+
+    def test_get_states(self):
+        self.init()
+        self.app._gpio_setup = Mock()
+        self.app._gpio_output = Mock()
+        device1 = self.app.add_gpio("dummy1", "GPIO18", "output", False, False, "test")
+        device2 = self.app.add_gpio("dummy2", "GPIO17", "output", False, False, "test")
+        self.app.turn_on(device1["uuid"])
+        self.app.turn_off(device2["uuid"])
+
+        states = self.app.get_states()
+        self.assertDictEqual(
+            states["states"], {device1["uuid"]: True, device2["uuid"]: False}
+        )
+
+        self.app.turn_on(device2["uuid"])
+        changes = self.app.get_states(states["generation"])
+        self.assertDictEqual(changes["states"], {device2["uuid"]: True})
+        self.assertGreater(changes["generation"], states["generation"])
+
+        with self.assertRaises(InvalidParameter):
+            self.app.get_states(-1)
+
+    def test_delete_gpio_forget_state(self):
+        self.init()
+        self.app._gpio_setup = Mock()
+        self.app._gpio_output = Mock()
+        device = self.app.add_gpio("dummy", "GPIO18", "output", False, False, "test")
+        self.app.turn_on(device["uuid"])
+
+        self.app.delete_gpio(device["uuid"], "test")
+
+        self.assertFalse(device["uuid"] in self.app.gpios_on_states)
+
+    def test_reset_gpios_doesnt_copy_devices(self):
+        self.init()
+        self.app._gpio_setup = Mock()
+        self.app._gpio_output = Mock()
+        device = self.app.add_gpio("dummy", "GPIO18", "output", False, False, "test")
+        self.app.add_gpio("dummy2", "GPIO17", "input", False, False, "test")
+        self.app.turn_on(device["uuid"])
+        self.app.get_module_devices = Mock()
+        self.app.turn_off = Mock()
+
+        self.app.reset_gpios()
+
+        self.app.get_module_devices.assert_not_called()
+        self.app.turn_off.assert_called_once_with(device["uuid"])
+
     def test_reset_gpios(self):
         self.init()
         data = {